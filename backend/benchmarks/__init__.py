@@ -0,0 +1,3 @@
+"""
+Benchmarks for the backend. Run from backend/ with python -m benchmarks.<name>
+"""
@@ -0,0 +1,70 @@
+"""
+Compare two benchmark result files (from benchmarks.run) and flag regressions.
+
+Compares the mean/p50/p95 timings and the throughput numbers present in both
+files. Exits with status 1 if any of them got worse by more than --threshold
+percent, so it can gate a CI job.
+
+Run from backend/:  python -m benchmarks.compare before.json after.json [--threshold 10]
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict
+
+# Leaf keys that are compared; throughput is better when higher, timings when lower
+TIMING_KEYS = {"mean", "p50", "p95"}
+THROUGHPUT_KEYS = {"requests_per_s"}
+
+
+def flatten(results: dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, path))
+        elif isinstance(value, (int, float)) and (key in TIMING_KEYS or key in THROUGHPUT_KEYS):
+            flat[path] = value
+    return flat
+
+
+def compare(before: dict, after: dict, threshold: float) -> list:
+    """(metric, before, after, change %, regressed) for every metric in both files"""
+    old, new = flatten(before), flatten(after)
+    rows = []
+    for path in sorted(old.keys() & new.keys()):
+        if path.startswith("meta."):
+            continue
+        a, b = old[path], new[path]
+        change = (b - a) / a * 100 if a else 0.0
+        worse = -change if path.rsplit(".", 1)[-1] in THROUGHPUT_KEYS else change
+        rows.append((path, a, b, change, worse > threshold))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent change counted as a regression")
+    parser.add_argument("--all", action="store_true", help="also list metrics that did not regress")
+    args = parser.parse_args()
+
+    with open(args.before, encoding="utf-8") as f:
+        before = json.load(f)
+    with open(args.after, encoding="utf-8") as f:
+        after = json.load(f)
+
+    print(f"before: {before.get('meta', {}).get('commit')}  after: {after.get('meta', {}).get('commit')}")
+    rows = compare(before, after, args.threshold)
+    regressions = [row for row in rows if row[4]]
+    for path, a, b, change, regressed in rows:
+        if regressed or args.all:
+            print(f"{'REGRESSION' if regressed else '':10} {path:70} {a:>12.3f} -> {b:>12.3f}  {change:+7.1f}%")
+    print(f"{len(rows)} metrics compared, {len(regressions)} regressed by more than {args.threshold}%")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Synthetic benchmark corpus: German-like text, PDFs and audio clips.
+
+Everything is generated from a seed, so two runs (and two commits) measure
+the same inputs. The audio is speech-shaped (voiced syllables with pauses,
+16 kHz mono) rather than real speech: good enough for decoder timing, not
+for transcription quality.
+
+Run from backend/:  python -m benchmarks.corpus --out /tmp/corpus
+"""
+
+import argparse
+import array
+import io
+import math
+import os
+import random
+import wave
+from typing import Dict, List
+
+WORDS = (
+    "der die das und ist nicht ein eine mit auf für von zu im den dem sich auch "
+    "Haus Schule Lehrer Straße Wörterbuch Arbeit Zeit Stadt Familie Freund Übung "
+    "Bahnhof Frühstück Mädchen Brötchen Geschäft Gemüse Verkäufer Prüfung Ärztin "
+    "gehen kommen machen sagen sehen lernen sprechen schreiben lesen fahren "
+    "heute morgen gestern immer oft manchmal schnell langsam groß klein schön "
+    "Nahverkehrs-Verbindung Kinder-Garten Dativ Akkusativ Präposition"
+).split()
+ABBREVIATIONS = ["z.B.", "usw.", "Dr.", "ca.", "d.h."]
+MONTHS = ["Januar", "März", "Mai", "Juli", "Oktober"]
+
+SAMPLE_RATE = 16000
+
+
+def make_sentence(rng: random.Random) -> str:
+    words = rng.choices(WORDS, k=rng.randint(5, 18))
+    roll = rng.random()
+    if roll < 0.1:
+        words.insert(rng.randrange(len(words)), rng.choice(ABBREVIATIONS))
+    elif roll < 0.15:
+        words.insert(rng.randrange(len(words)), f"{rng.randint(1, 28)}. {rng.choice(MONTHS)}")
+    end = rng.choice([".", ".", ".", "?", "!"])
+    return " ".join(words).capitalize() + end
+
+
+def make_text(seed: int, sentences: int) -> str:
+    rng = random.Random(seed)
+    paragraphs = []
+    while sentences > 0:
+        n = min(sentences, rng.randint(3, 8))
+        paragraphs.append(" ".join(make_sentence(rng) for _ in range(n)))
+        sentences -= n
+    return "\n\n".join(paragraphs)
+
+
+def _pdf_escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _wrap(text: str, width: int = 90) -> List[str]:
+    lines = []
+    for paragraph in text.split("\n"):
+        line = ""
+        for word in paragraph.split():
+            if len(line) + len(word) + 1 > width:
+                lines.append(line)
+                line = word
+            else:
+                line = f"{line} {word}" if line else word
+        lines.append(line)
+    return lines
+
+
+def make_pdf(seed: int, pages: int, lines_per_page: int = 52) -> bytes:
+    """A minimal valid PDF (Helvetica, WinAnsi) with wrapped text on every page"""
+    lines = _wrap(make_text(seed, pages * 25))
+    objects: List[bytes] = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    add(b"<< /Type /Catalog /Pages 2 0 R >>")
+    add(b"")  # Pages, filled in once the kids are known
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    kids = []
+    for page in range(pages):
+        page_lines = lines[page * lines_per_page:(page + 1) * lines_per_page] or [""]
+        stream = "BT /F1 10 Tf 14 TL 50 800 Td " + " ".join(
+            f"({_pdf_escape(line)}) Tj T*" for line in page_lines
+        ) + " ET"
+        data = stream.encode("cp1252", errors="replace")
+        contents = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(data), data))
+        kids.append(add(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (font, contents)
+        ))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % k for k in kids), len(kids)
+    )
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def make_wav(seed: int, seconds: float) -> bytes:
+    """16 kHz mono 16-bit WAV of voiced, syllable-like bursts separated by pauses"""
+    rng = random.Random(seed)
+    total = int(seconds * SAMPLE_RATE)
+    samples = array.array("h")
+    while len(samples) < total:
+        # A syllable: a few harmonics of a gliding pitch under a smooth envelope
+        length = int(SAMPLE_RATE * rng.uniform(0.12, 0.3))
+        pitch = rng.uniform(100, 240)
+        glide = rng.uniform(-0.3, 0.3)
+        phase = 0.0
+        for i in range(length):
+            t = i / length
+            phase += 2 * math.pi * pitch * (1 + glide * t) / SAMPLE_RATE
+            voiced = math.sin(phase) + 0.5 * math.sin(2 * phase) + 0.25 * math.sin(3 * phase)
+            envelope = math.sin(math.pi * t)
+            samples.append(int(6000 * envelope * voiced + rng.gauss(0, 150)))
+        # Pause between syllables, longer ones between "words"
+        pause = int(SAMPLE_RATE * (rng.uniform(0.25, 0.6) if rng.random() < 0.25 else rng.uniform(0.02, 0.08)))
+        samples.extend(int(rng.gauss(0, 150)) for _ in range(pause))
+    del samples[total:]
+
+    out = io.BytesIO()
+    with wave.open(out, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(SAMPLE_RATE)
+        w.writeframes(samples.tobytes())
+    return out.getvalue()
+
+
+def build_corpus(clip_seconds=(3, 10, 30), pdf_pages=(1, 10, 50), text_sentences=(50, 500)) -> Dict[str, bytes]:
+    """filename -> content for the whole corpus"""
+    corpus = {}
+    for seconds in clip_seconds:
+        corpus[f"clip_{seconds}s.wav"] = make_wav(seconds, seconds)
+    for pages in pdf_pages:
+        corpus[f"document_{pages}p.pdf"] = make_pdf(pages, pages)
+    for sentences in text_sentences:
+        corpus[f"text_{sentences}.txt"] = make_text(sentences, sentences).encode("utf-8")
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--out", required=True, help="directory to write the corpus to")
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    for filename, content in build_corpus().items():
+        with open(os.path.join(args.out, filename), "wb") as f:
+            f.write(content)
+        print(f"{filename}: {len(content)} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark: document storage size and per-turn content read cost.
+
+Compares the old layout (plain text in documents.content, read on every
+document-mode turn) with compressed blobs read through get_document_content
+(cold = LRU cleared before every read, warm = active chat hitting the cache).
+
+Run from backend/:  python -m benchmarks.document_storage [--docs 200] [--turns 2000]
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+WORKDIR = tempfile.mkdtemp(prefix="lt-bench-")
+os.environ["DATABASE_PATH"] = os.path.join(WORKDIR, "compressed.db")
+os.environ.setdefault("AUDIO_UPLOAD_DIR", os.path.join(WORKDIR, "audio"))
+
+from core.compression import compress_text  # noqa: E402
+from core.database import init_db, get_db, content_hash  # noqa: E402
+from services import document_service  # noqa: E402
+
+VOCABULARY = (
+    "der die das und ist nicht ein eine mit auf für von zu im den dem "
+    "Haus Schule Lehrer Straße Wörterbuch Arbeit Zeit Stadt Familie Freund "
+    "gehen kommen machen sagen sehen lernen sprechen schreiben lesen fahren "
+    "heute morgen gestern immer oft manchmal schnell langsam groß klein schön"
+).split()
+
+
+def make_text(rng: random.Random, sentences: int) -> str:
+    parts = []
+    for _ in range(sentences):
+        words = rng.choices(VOCABULARY, k=rng.randint(6, 16))
+        parts.append(" ".join(words).capitalize() + ".")
+    return " ".join(parts)
+
+
+def timed_reads(read, doc_ids, turns: int, before_each=None) -> float:
+    """Mean microseconds per read over `turns` reads cycling through doc_ids"""
+    total = 0.0
+    for i in range(turns):
+        if before_each:
+            before_each()
+        start = time.perf_counter()
+        read(doc_ids[i % len(doc_ids)])
+        total += time.perf_counter() - start
+    return total / turns * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--sentences", type=int, default=400, help="sentences per document")
+    parser.add_argument("--turns", type=int, default=2000)
+    parser.add_argument("--active", type=int, default=8, help="documents used by active chats")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    texts = [make_text(rng, args.sentences) for _ in range(args.docs)]
+    doc_ids = [f"doc-{i}" for i in range(args.docs)]
+
+    # Old layout: full text inline in documents
+    legacy_path = os.path.join(WORKDIR, "inline.db")
+    legacy = sqlite3.connect(legacy_path)
+    legacy.execute("CREATE TABLE documents (id TEXT PRIMARY KEY, filename TEXT NOT NULL, content TEXT NOT NULL)")
+    legacy.executemany(
+        "INSERT INTO documents (id, filename, content) VALUES (?, ?, ?)",
+        [(doc_id, f"{doc_id}.txt", text) for doc_id, text in zip(doc_ids, texts)]
+    )
+    legacy.commit()
+    legacy.execute("VACUUM")
+    legacy.close()
+
+    def legacy_read(doc_id):
+        conn = sqlite3.connect(legacy_path)
+        conn.row_factory = sqlite3.Row
+        conn.execute("SELECT content FROM documents WHERE id = ?", (doc_id,)).fetchone()["content"]
+        conn.close()
+
+    # New layout: compressed blobs
+    init_db()
+    conn = get_db()
+    for doc_id, text in zip(doc_ids, texts):
+        blob_id = content_hash(text.encode("utf-8"))
+        data, codec = compress_text(text)
+        conn.execute(
+            "INSERT INTO document_blobs (id, data, codec, size, ref_count) VALUES (?, ?, ?, ?, 1)",
+            (blob_id, data, codec, len(text))
+        )
+        conn.execute(
+            "INSERT INTO documents (id, filename, content, blob_id) VALUES (?, ?, '', ?)",
+            (doc_id, f"{doc_id}.txt", blob_id)
+        )
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+
+    active = doc_ids[:args.active]
+
+    def clear():
+        document_service._cached_blob_content.cache_clear()
+
+    clear()
+    results = {
+        "docs": args.docs,
+        "avg_chars": sum(map(len, texts)) // len(texts),
+        "db_bytes": {
+            "inline": os.path.getsize(legacy_path),
+            "compressed": os.path.getsize(os.environ["DATABASE_PATH"]),
+        },
+        "read_us": {
+            "inline": timed_reads(legacy_read, active, args.turns),
+            "compressed_cold": timed_reads(document_service.get_document_content, active, args.turns, clear),
+            "compressed_warm": timed_reads(document_service.get_document_content, active, args.turns),
+        },
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Shared helpers for the benchmark suite: isolated environment, timing, JSON results.
+
+`setup_env()` has to run before anything from core/ or services/ is imported,
+because configuration is read at import time.
+"""
+
+import json
+import os
+import platform
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+WORKDIR: Optional[str] = None
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def setup_env() -> str:
+    """Point the app at a throwaway database and the local LLM stand-in (idempotent)"""
+    global WORKDIR
+    if WORKDIR is None:
+        WORKDIR = tempfile.mkdtemp(prefix="lt-bench-")
+        os.environ["DATABASE_PATH"] = os.path.join(WORKDIR, "bench.db")
+        os.environ["AUDIO_UPLOAD_DIR"] = os.path.join(WORKDIR, "audio")
+        os.environ["TRACE_STORE_ENABLED"] = "false"
+        os.environ["PROFILING_ENABLED"] = "false"
+        os.environ["PROFILE_BACKGROUND_ENABLED"] = "false"
+        port = os.environ.setdefault("MOCK_LLM_PORT", str(_free_port()))
+        mock_url = f"http://127.0.0.1:{port}"
+        os.environ["OLLAMA_BASE_URL"] = mock_url
+        os.environ["ANTHROPIC_BASE_URL"] = mock_url
+        os.environ["GEMINI_BASE_URL"] = mock_url
+    return WORKDIR
+
+
+def mock_url() -> str:
+    return f"http://127.0.0.1:{os.environ['MOCK_LLM_PORT']}"
+
+
+def percentile(values: List[float], pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def summarize(samples: List[float], digits: int = 3) -> Dict[str, float]:
+    """mean/p50/p95/p99/max of a list of samples"""
+    if not samples:
+        return {"n": 0}
+    return {
+        "n": len(samples),
+        "mean": round(statistics.fmean(samples), digits),
+        "p50": round(statistics.median(samples), digits),
+        "p95": round(percentile(samples, 0.95), digits),
+        "p99": round(percentile(samples, 0.99), digits),
+        "max": round(max(samples), digits),
+    }
+
+
+def bench(fn: Callable[[], object], number: int = 100, repeat: int = 20, setup: Callable[[], None] = None) -> dict:
+    """
+    Microseconds per call of `fn`.
+
+    Every sample times `number` back-to-back calls; the stats are over `repeat` samples.
+    """
+    fn()  # warm-up (caches, lazy imports)
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number * 1e6)
+    return {"us": summarize(samples), "number": number}
+
+
+def environment() -> dict:
+    """Where the numbers came from, so result files can be compared sensibly"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def write_results(results: dict, path: Optional[str]) -> None:
+    text = json.dumps(results, indent=2, ensure_ascii=False)
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"Results written to {path}", file=sys.stderr)
+    else:
+        print(text)
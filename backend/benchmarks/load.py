@@ -0,0 +1,234 @@
+"""
+End-to-end load scenarios against the FastAPI app.
+
+Requests go through the full ASGI stack (middleware, routers, services,
+SQLite) in-process; LLM calls go over HTTP to benchmarks/mock_llm.py,
+started as a subprocess so its sleeping threads don't compete with the app.
+
+Scenarios:
+  chat_turns           concurrent chats, sequential turns each, per provider
+  chat_throughput      many concurrent chats (--throughput-chats, default 50) without grammar
+                       checks, so the message write path rather than the LLM sets the pace
+  document_chat_turns  the same in document mode (document content in every prompt)
+  document_upload      concurrent uploads of generated PDFs/text files
+  transcribe_and_send  generated audio clips through local Whisper (needs faster-whisper)
+
+Run from backend/:  python -m benchmarks.load [--chats 10] [--turns 5] [--output load.json]
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import os
+import random
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import List, Optional
+
+from benchmarks.harness import setup_env, mock_url, summarize, environment, write_results
+
+setup_env()
+
+import httpx  # noqa: E402
+
+from main import app  # noqa: E402
+from core.config import LLMConfig  # noqa: E402
+from core.runtime_config import update_llm_config  # noqa: E402
+from benchmarks.corpus import build_corpus, make_sentence  # noqa: E402
+from benchmarks.mock_llm import MockSettings  # noqa: E402
+
+PROVIDERS = {
+    "ollama": "llama3.2",
+    "openai": "gpt-4o-mini",
+    "anthropic": "claude-3-5-haiku-latest",
+    "gemini": "gemini-2.0-flash-lite",
+}
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@contextmanager
+def mock_llm(settings: MockSettings):
+    """Run the provider stand-in for the duration of the block"""
+    port = os.environ["MOCK_LLM_PORT"]
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.mock_llm", "--port", port,
+         "--ttft-ms", str(settings.ttft_ms), "--jitter-ms", str(settings.jitter_ms),
+         "--tokens-per-s", str(settings.tokens_per_s), "--reply-tokens", str(settings.reply_tokens),
+         "--grammar-rate", str(settings.grammar_rate)],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL
+    )
+    try:
+        deadline = time.monotonic() + 10
+        while True:
+            try:
+                httpx.get(f"{mock_url()}/api/tags", timeout=0.5)
+                break
+            except httpx.TransportError:
+                if time.monotonic() > deadline or process.poll() is not None:
+                    raise RuntimeError("Mock LLM server did not start")
+                time.sleep(0.05)
+        yield
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def use_provider(provider: str) -> None:
+    update_llm_config(LLMConfig(
+        provider=provider, model=PROVIDERS[provider], base_url=mock_url(), api_key="benchmark"
+    ))
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.started = time.perf_counter()
+
+    async def timed(self, request) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        response = await request
+        self.latencies.append((time.perf_counter() - start) * 1000)
+        if response.status_code >= 400:
+            self.errors += 1
+        return response
+
+    def result(self, **extra) -> dict:
+        wall = time.perf_counter() - self.started
+        return {
+            "latency_ms": summarize(self.latencies, 1),
+            "requests_per_s": round(len(self.latencies) / wall, 2) if wall else None,
+            "errors": self.errors,
+            **extra,
+        }
+
+
+async def chat_turns(client: httpx.AsyncClient, chats: int, turns: int,
+                     mode: str = "free_talk", document_id: Optional[str] = None, detect_grammar: bool = True) -> dict:
+    chat_ids = []
+    for i in range(chats):
+        r = await client.post("/api/chats", json={"title": f"Load {i}", "mode": mode, "document_id": document_id})
+        r.raise_for_status()
+        chat_ids.append(r.json()["id"])
+
+    recorder = Recorder()
+
+    async def converse(chat_id: str, seed: int):
+        rng = random.Random(seed)
+        for _ in range(turns):
+            content = make_sentence(rng)
+            await recorder.timed(client.post(
+                f"/api/chats/{chat_id}/messages",
+                json={"chat_id": chat_id, "content": content, "detect_grammar": detect_grammar}
+            ))
+
+    await asyncio.gather(*(converse(chat_id, i) for i, chat_id in enumerate(chat_ids)))
+    return recorder.result(chats=chats, turns=turns)
+
+
+async def document_upload(client: httpx.AsyncClient, files: dict, concurrency: int, repeat: int) -> dict:
+    recorder = Recorder()
+    semaphore = asyncio.Semaphore(concurrency)
+    names = [name for name in files for _ in range(repeat)]
+
+    async def upload(name: str):
+        async with semaphore:
+            await recorder.timed(client.post("/api/documents/upload", files={"file": (name, files[name])}))
+
+    await asyncio.gather(*(upload(name) for name in names))
+    return recorder.result(files=sorted(files), concurrency=concurrency)
+
+
+async def transcribe_and_send(client: httpx.AsyncClient, clips: dict, concurrency: int) -> dict:
+    r = await client.post("/api/chats", json={"title": "Voice", "mode": "free_talk"})
+    chat_id = r.json()["id"]
+    recorder = Recorder()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(name: str):
+        async with semaphore:
+            await recorder.timed(client.post(
+                "/api/audio/transcribe-and-send",
+                files={"audio": (name, clips[name], "audio/wav")},
+                data={"chat_id": chat_id, "correct": "true"}
+            ))
+
+    await asyncio.gather(*(send(name) for name in clips))
+    return recorder.result(clips=sorted(clips), concurrency=concurrency)
+
+
+async def run_scenarios(args, corpus: dict) -> dict:
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        for provider in args.providers:
+            use_provider(provider)
+            results[f"chat_turns_{provider}"] = await chat_turns(client, args.chats, args.turns)
+
+        use_provider(args.providers[0])
+        results["chat_throughput"] = await chat_turns(
+            client, args.throughput_chats, args.turns, detect_grammar=False
+        )
+        text = corpus["text_500.txt"]
+        r = await client.post("/api/documents/upload", files={"file": ("lesson.txt", text)})
+        r.raise_for_status()
+        results["document_chat_turns"] = await chat_turns(
+            client, args.chats, args.turns, mode="document", document_id=r.json()["id"]
+        )
+
+        uploads = {name: data for name, data in corpus.items() if name.endswith(".txt")}
+        if importlib.util.find_spec("PyPDF2"):
+            uploads.update({name: data for name, data in corpus.items() if name.endswith(".pdf")})
+        else:
+            results["document_upload_pdf"] = {"skipped": "PyPDF2 not installed"}
+        results["document_upload"] = await document_upload(client, uploads, args.concurrency, args.upload_repeat)
+
+        if importlib.util.find_spec("faster_whisper") and not args.skip_audio:
+            clips = {name: data for name, data in corpus.items() if name.endswith(".wav")}
+            results["transcribe_and_send"] = await transcribe_and_send(client, clips, args.concurrency)
+        else:
+            results["transcribe_and_send"] = {
+                "skipped": "disabled with --skip-audio" if args.skip_audio else "faster-whisper not installed"
+            }
+    return results
+
+
+def run(args) -> dict:
+    settings = MockSettings()
+    settings.ttft_ms = args.ttft_ms
+    settings.tokens_per_s = args.tokens_per_s
+    settings.reply_tokens = args.reply_tokens
+    corpus = build_corpus(clip_seconds=(3, 10), pdf_pages=(1, 10), text_sentences=(50, 500))
+    with mock_llm(settings):
+        results = asyncio.run(run_scenarios(args, corpus))
+    results["mock"] = {"ttft_ms": settings.ttft_ms, "tokens_per_s": settings.tokens_per_s,
+                       "reply_tokens": settings.reply_tokens}
+    return results
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--chats", type=int, default=10, help="concurrent chats per chat scenario")
+    parser.add_argument("--turns", type=int, default=5, help="sequential turns per chat")
+    parser.add_argument("--throughput-chats", type=int, default=50, help="concurrent chats in chat_throughput")
+    parser.add_argument("--concurrency", type=int, default=4, help="concurrent uploads/transcriptions")
+    parser.add_argument("--upload-repeat", type=int, default=3)
+    parser.add_argument("--providers", nargs="+", default=list(PROVIDERS), choices=list(PROVIDERS))
+    parser.add_argument("--ttft-ms", type=float, default=MockSettings.ttft_ms)
+    parser.add_argument("--tokens-per-s", type=float, default=MockSettings.tokens_per_s)
+    parser.add_argument("--reply-tokens", type=int, default=MockSettings.reply_tokens)
+    parser.add_argument("--skip-audio", action="store_true")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    add_arguments(parser)
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+    write_results({"meta": environment(), "load": run(args)}, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Micro-benchmarks: vocabulary extraction, grammar tag parsing and the core/database.py helpers.
+
+Run from backend/:  python -m benchmarks.micro [--quick] [--output micro.json]
+"""
+
+import argparse
+import sqlite3
+import uuid
+
+from benchmarks.harness import setup_env, bench, environment, write_results
+
+setup_env()
+
+from core import database  # noqa: E402
+from services.chat_service import extract_grammar_detection  # noqa: E402
+from services.document_service import extract_vocabulary  # noqa: E402
+from benchmarks.corpus import make_text, WORDS  # noqa: E402
+from benchmarks.mock_llm import GRAMMAR_TAGS  # noqa: E402
+
+TEXT_SIZES = {"1k": 10, "10k": 100, "100k": 1000}  # label -> sentences (~100 chars each)
+
+
+def bench_vocabulary(scale: float) -> dict:
+    results = {}
+    for label, sentences in TEXT_SIZES.items():
+        text = make_text(sentences, sentences)
+        number = max(1, int(2000 / sentences * scale))
+        results[f"extract_vocabulary_{label}"] = {**bench(lambda: extract_vocabulary(text), number, 10), "chars": len(text)}
+    return results
+
+
+def bench_grammar(scale: float) -> dict:
+    reply = " ".join(WORDS[:60])
+    cases = {
+        "no_tag": reply,
+        "tag": f"{reply} {GRAMMAR_TAGS[0]}",
+        "tag_long_reply": f"{reply * 20} {GRAMMAR_TAGS[1]}",
+        "malformed_tag": f"{reply} [GRAMMAR_DETECTED: Dativ ohne Erklärung]",
+    }
+    number = int(5000 * scale) or 1
+    return {f"grammar_{name}": bench(lambda: extract_grammar_detection(text), number) for name, text in cases.items()}
+
+
+def bench_database(scale: float) -> dict:
+    database.init_db()
+    chat_id = str(uuid.uuid4())
+    database.execute_write("INSERT INTO chats (id, title, mode) VALUES (?, 'Bench', 'free_talk')", (chat_id,))
+    message_id = str(uuid.uuid4())
+    database.execute_write(
+        "INSERT INTO messages (id, chat_id, role, content) VALUES (?, ?, 'user', 'Hallo')", (message_id, chat_id)
+    )
+    select_message = ("SELECT * FROM messages WHERE id = ?", (message_id,))
+
+    conn = database.get_db()
+    row = conn.execute(*select_message).fetchone()
+    plain = sqlite3.connect(database.DB_PATH)
+
+    def insert_message():
+        database.execute_write(
+            "INSERT INTO messages (id, chat_id, role, content) VALUES (?, ?, 'user', 'Hallo')",
+            (str(uuid.uuid4()), chat_id)
+        )
+
+    def insert_message_returning():
+        new_id = str(uuid.uuid4())
+        database.execute_write_returning(
+            "INSERT INTO messages (id, chat_id, role, content) VALUES (?, ?, 'user', 'Hallo')", (new_id, chat_id),
+            "SELECT * FROM messages WHERE id = ?", (new_id,)
+        )
+
+    def get_db_close():
+        database.get_db().close()
+
+    text = make_text(3, 1000)
+    data = text.encode("utf-8")
+    number = int(500 * scale) or 1
+    results = {
+        "init_db_existing": bench(database.init_db, max(1, number // 50), 5),
+        "get_db_close": bench(get_db_close, number),
+        "dict_from_row": bench(lambda: database.dict_from_row(row), number * 20),
+        "execute_query_by_pk": bench(lambda: database.execute_query(*select_message), number),
+        "execute_write_insert": bench(insert_message, max(1, number // 5), 10),
+        "execute_write_returning_insert": bench(insert_message_returning, max(1, number // 5), 10),
+        "normalize_text_100k": {**bench(lambda: database.normalize_text(text), max(1, number // 10)), "chars": len(text)},
+        "content_hash_100k": {**bench(lambda: database.content_hash(data), number), "bytes": len(data)},
+        # Per-statement overhead of the metrics/tracing connection wrapper
+        "timed_connection_select": bench(lambda: conn.execute(*select_message).fetchone(), number * 10),
+        "plain_connection_select": bench(lambda: plain.execute(*select_message).fetchone(), number * 10),
+    }
+    conn.close()
+    plain.close()
+    return results
+
+
+def run(quick: bool = False) -> dict:
+    scale = 0.1 if quick else 1.0
+    return {
+        "vocabulary": bench_vocabulary(scale),
+        "grammar": bench_grammar(scale),
+        "database": bench_database(scale),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--quick", action="store_true", help="fewer iterations (smoke run)")
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+    write_results({"meta": environment(), "micro": run(args.quick)}, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""
+Local stand-in for the LLM providers, for load tests without real models.
+
+Speaks enough of each API for services/llm_service.py:
+  Ollama     POST /api/chat (NDJSON when "stream": true), POST /api/generate (preload only), GET /api/tags
+  OpenAI     POST /v1/chat/completions (SSE when "stream": true)
+  Anthropic  POST /v1/messages (SSE when "stream": true)
+  Gemini     POST /v1beta/models/{model}:generateContent / :streamGenerateContent
+
+Replies are German filler text. Latency is modelled as time to first token
+plus a per-token rate, the same way for streamed and non-streamed replies,
+and when the prompt asks for [GRAMMAR_DETECTED: ...] tags a share of the
+replies carries one. Requests
+asking for JSON (the separate grammar analysis) get an {"issue": ...} object,
+reporting an issue at the same rate. Like Ollama, the mock (re)loads a model
+when a request asks for a different num_ctx than it is loaded with, which
+costs --load-ms and shows in the reply's load_duration; keep_alive 0 unloads it.
+
+Run from backend/:  python -m benchmarks.mock_llm --port 11500 --ttft-ms 250 --tokens-per-s 60
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.corpus import WORDS
+
+GRAMMAR_ISSUES = [
+    ("Dativ nach mit", "Nach 'mit' steht immer der Dativ"),
+    ("Perfekt mit sein", "Verben der Bewegung bilden das Perfekt mit 'sein'"),
+    ("Verbposition im Nebensatz", "Im Nebensatz steht das Verb am Ende"),
+]
+GRAMMAR_TAGS = [f"[GRAMMAR_DETECTED: {rule} | {explanation}]" for rule, explanation in GRAMMAR_ISSUES]
+
+_GEMINI_PATH_RE = re.compile(r"/v1beta/models/([^:/]+):(generateContent|streamGenerateContent)")
+
+
+class MockSettings:
+    ttft_ms = 250.0
+    jitter_ms = 50.0
+    tokens_per_s = 60.0
+    reply_tokens = 80
+    grammar_rate = 0.3
+    load_ms = 0.0
+    seed = 1
+
+
+class Reply:
+    """One generated reply and the timing it should be delivered with"""
+
+    def __init__(self, settings: MockSettings, prompt_chars: int, rng: random.Random,
+                 json_output: bool = False, grammar_tags: bool = False):
+        if json_output:
+            issue = {"issue": False}
+            if rng.random() < settings.grammar_rate:
+                rule, explanation = rng.choice(GRAMMAR_ISSUES)
+                issue = {"issue": True, "rule_name": rule, "explanation": explanation}
+            self.tokens = [w + " " for w in json.dumps(issue, ensure_ascii=False).split(" ")]
+        else:
+            self.tokens = [w + " " for w in rng.choices(WORDS, k=settings.reply_tokens)]
+            if grammar_tags and rng.random() < settings.grammar_rate:
+                self.tokens.append(rng.choice(GRAMMAR_TAGS))
+        self.prompt_tokens = max(1, prompt_chars // 4)
+        self.ttft = max(0.0, rng.gauss(settings.ttft_ms, settings.jitter_ms)) / 1000
+        self.token_delay = 1 / settings.tokens_per_s if settings.tokens_per_s > 0 else 0.0
+
+    @property
+    def text(self) -> str:
+        return "".join(self.tokens).strip()
+
+    def wait_full(self) -> None:
+        time.sleep(self.ttft + self.token_delay * len(self.tokens))
+
+    def stream(self):
+        """Yield tokens at the modelled pace"""
+        time.sleep(self.ttft)
+        for i, token in enumerate(self.tokens):
+            if i:
+                time.sleep(self.token_delay)
+            yield token
+
+
+class Handler(BaseHTTPRequestHandler):
+    settings = MockSettings()
+    _rng = random.Random(MockSettings.seed)
+    _rng_lock = threading.Lock()
+    # Ollama model -> num_ctx it is loaded with
+    _loaded = {}
+    _load_lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, raw: bytes, body: dict) -> Reply:
+        with self._rng_lock:
+            rng = random.Random(self._rng.random())
+        json_output = (
+            body.get("format") == "json"
+            or (body.get("response_format") or {}).get("type") == "json_object"
+            or (body.get("generationConfig") or {}).get("responseMimeType") == "application/json"
+            # Anthropic has no JSON mode; the prompt asks for it
+            or b"Reply with JSON only" in raw
+        )
+        return Reply(self.settings, len(raw), rng, json_output, grammar_tags=b"[GRAMMAR_DETECTED:" in raw)
+
+    def _load(self, body: dict) -> float:
+        """Load the requested model with its num_ctx unless already loaded that way; returns the seconds spent"""
+        model = body.get("model")
+        num_ctx = (body.get("options") or {}).get("num_ctx", 2048)
+        with self._load_lock:
+            if body.get("keep_alive") in (0, "0"):
+                self._loaded.pop(model, None)
+                return 0.0
+            if self._loaded.get(model) == num_ctx:
+                return 0.0
+            self._loaded[model] = num_ctx
+            time.sleep(self.settings.load_ms / 1000)
+        return self.settings.load_ms / 1000
+
+    def _send_json(self, payload: dict, status: int = 200) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _start_stream(self, content_type: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+    def _write(self, chunk: str) -> None:
+        self.wfile.write(chunk.encode("utf-8"))
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json({"models": [{"name": "llama3.2:latest", "model": "llama3.2:latest", "size": 2019393189}]})
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        try:
+            body = json.loads(raw or b"{}")
+        except json.JSONDecodeError:
+            self._send_json({"error": "invalid JSON"}, 400)
+            return
+        reply = self._reply(raw, body)
+        path = self.path.split("?", 1)[0]
+
+        if path == "/api/chat":
+            self._ollama(body, reply)
+        elif path == "/api/generate" and not body.get("prompt"):
+            # Model preload (or unload, with keep_alive 0) request
+            load = self._load(body)
+            self._send_json({"model": body.get("model"), "response": "", "done": True,
+                             "done_reason": "unload" if body.get("keep_alive") in (0, "0") else "load",
+                             "load_duration": int(load * 1e9)})
+        elif path == "/v1/chat/completions":
+            self._openai(body, reply)
+        elif path == "/v1/messages":
+            self._anthropic(body, reply)
+        elif _GEMINI_PATH_RE.fullmatch(path):
+            self._gemini(_GEMINI_PATH_RE.fullmatch(path).group(2) == "streamGenerateContent", reply)
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def _ollama(self, body: dict, reply: Reply) -> None:
+        model = body.get("model", "llama3.2")
+        started = time.perf_counter()
+        load = self._load(body)
+        timing = lambda: {
+            "total_duration": int((time.perf_counter() - started) * 1e9),
+            "load_duration": int(load * 1e9),
+            "prompt_eval_count": reply.prompt_tokens,
+            "prompt_eval_duration": int(reply.ttft * 1e9),
+            "eval_count": len(reply.tokens),
+            "eval_duration": int(reply.token_delay * len(reply.tokens) * 1e9),
+        }
+        if body.get("stream", True):
+            self._start_stream("application/x-ndjson")
+            for token in reply.stream():
+                self._write(json.dumps({"model": model, "message": {"role": "assistant", "content": token}, "done": False}) + "\n")
+            self._write(json.dumps({"model": model, "message": {"role": "assistant", "content": ""},
+                                    "done": True, "done_reason": "stop", **timing()}) + "\n")
+            return
+        reply.wait_full()
+        self._send_json({"model": model, "message": {"role": "assistant", "content": reply.text},
+                         "done": True, "done_reason": "stop", **timing()})
+
+    def _openai(self, body: dict, reply: Reply) -> None:
+        model = body.get("model", "gpt-4o-mini")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        usage = {"prompt_tokens": reply.prompt_tokens, "completion_tokens": len(reply.tokens),
+                 "total_tokens": reply.prompt_tokens + len(reply.tokens)}
+        if body.get("stream"):
+            self._start_stream("text/event-stream")
+            for token in reply.stream():
+                chunk = {"id": completion_id, "object": "chat.completion.chunk", "model": model,
+                         "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}
+                self._write(f"data: {json.dumps(chunk)}\n\n")
+            final = {"id": completion_id, "object": "chat.completion.chunk", "model": model,
+                     "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": usage}
+            self._write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n")
+            return
+        reply.wait_full()
+        self._send_json({
+            "id": completion_id, "object": "chat.completion", "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": reply.text}, "finish_reason": "stop"}],
+            "usage": usage,
+        })
+
+    def _anthropic(self, body: dict, reply: Reply) -> None:
+        model = body.get("model", "claude-3-5-haiku-latest")
+        message_id = f"msg_{uuid.uuid4().hex[:16]}"
+        if body.get("stream"):
+            self._start_stream("text/event-stream")
+            start = {"type": "message_start", "message": {
+                "id": message_id, "type": "message", "role": "assistant", "model": model, "content": [],
+                "usage": {"input_tokens": reply.prompt_tokens, "output_tokens": 0}}}
+            self._write(f"event: message_start\ndata: {json.dumps(start)}\n\n")
+            self._write('event: content_block_start\ndata: {"type": "content_block_start", "index": 0, '
+                        '"content_block": {"type": "text", "text": ""}}\n\n')
+            for token in reply.stream():
+                delta = {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": token}}
+                self._write(f"event: content_block_delta\ndata: {json.dumps(delta)}\n\n")
+            self._write('event: content_block_stop\ndata: {"type": "content_block_stop", "index": 0}\n\n')
+            end = {"type": "message_delta", "delta": {"stop_reason": "end_turn"}, "usage": {"output_tokens": len(reply.tokens)}}
+            self._write(f"event: message_delta\ndata: {json.dumps(end)}\n\n")
+            self._write('event: message_stop\ndata: {"type": "message_stop"}\n\n')
+            return
+        reply.wait_full()
+        self._send_json({
+            "id": message_id, "type": "message", "role": "assistant", "model": model,
+            "content": [{"type": "text", "text": reply.text}], "stop_reason": "end_turn",
+            "usage": {"input_tokens": reply.prompt_tokens, "output_tokens": len(reply.tokens)},
+        })
+
+    def _gemini(self, stream: bool, reply: Reply) -> None:
+        def chunk(text, finished, output_tokens):
+            candidate = {"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}
+            if finished:
+                candidate["finishReason"] = "STOP"
+            return {"candidates": [candidate], "usageMetadata": {
+                "promptTokenCount": reply.prompt_tokens, "candidatesTokenCount": output_tokens,
+                "totalTokenCount": reply.prompt_tokens + output_tokens}}
+
+        if stream:
+            self._start_stream("text/event-stream")
+            for i, token in enumerate(reply.stream(), 1):
+                self._write(f"data: {json.dumps(chunk(token, i == len(reply.tokens), i))}\n\n")
+            return
+        reply.wait_full()
+        self._send_json(chunk(reply.text, True, len(reply.tokens)))
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--ttft-ms", type=float, default=MockSettings.ttft_ms)
+    parser.add_argument("--jitter-ms", type=float, default=MockSettings.jitter_ms)
+    parser.add_argument("--tokens-per-s", type=float, default=MockSettings.tokens_per_s)
+    parser.add_argument("--reply-tokens", type=int, default=MockSettings.reply_tokens)
+    parser.add_argument("--grammar-rate", type=float, default=MockSettings.grammar_rate)
+    parser.add_argument("--load-ms", type=float, default=MockSettings.load_ms,
+                        help="time an Ollama model (re)load takes")
+    parser.add_argument("--seed", type=int, default=MockSettings.seed)
+    args = parser.parse_args()
+
+    settings = MockSettings()
+    for name in ("ttft_ms", "jitter_ms", "tokens_per_s", "reply_tokens", "grammar_rate", "load_ms", "seed"):
+        setattr(settings, name, getattr(args, name))
+    Handler.settings = settings
+    Handler._rng = random.Random(settings.seed)
+    server = MockServer(("127.0.0.1", args.port), Handler)
+    print(f"Mock LLM listening on http://127.0.0.1:{args.port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
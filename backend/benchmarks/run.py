@@ -0,0 +1,42 @@
+"""
+Run the benchmark suite and write one JSON result file.
+
+Run from backend/:  python -m benchmarks.run --output results.json [--only micro] [--quick]
+Compare two runs:   python -m benchmarks.compare before.json after.json
+"""
+
+import argparse
+
+from benchmarks.harness import setup_env, environment, write_results
+
+setup_env()
+
+from benchmarks import micro, load, startup, serialization  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--only", choices=["micro", "load", "startup", "serialization"], help="run a single part of the suite")
+    parser.add_argument("--quick", action="store_true", help="fewer iterations and a smaller load (smoke run)")
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    load.add_arguments(parser)
+    args = parser.parse_args()
+
+    if args.quick:
+        args.chats, args.turns, args.upload_repeat, args.throughput_chats = 3, 2, 1, 10
+        args.ttft_ms, args.reply_tokens = 20.0, 10
+
+    results = {"meta": {**environment(), "args": vars(args)}}
+    if args.only in (None, "micro"):
+        results["micro"] = micro.run(args.quick)
+    if args.only in (None, "load"):
+        results["load"] = load.run(args)
+    if args.only in (None, "startup"):
+        results["startup"] = startup.run(runs=2 if args.quick else 5)
+    if args.only in (None, "serialization"):
+        results["serialization"] = serialization.run(repeat=3 if args.quick else 10)
+    write_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
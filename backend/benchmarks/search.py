@@ -0,0 +1,119 @@
+"""
+Benchmark: /api/search latency on a large database.
+
+Fills a fresh database with synthetic chats (100k messages by default) and
+measures search_service.search for a few queries, compared with the LIKE
+scan a client-side or naive server-side search would need.
+
+Run from backend/:  python -m benchmarks.search [--messages 100000] [--repeat 50]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+
+WORKDIR = tempfile.mkdtemp(prefix="lt-bench-")
+os.environ["DATABASE_PATH"] = os.path.join(WORKDIR, "search.db")
+os.environ.setdefault("AUDIO_UPLOAD_DIR", os.path.join(WORKDIR, "audio"))
+
+from core.database import init_db, get_db  # noqa: E402
+from services.search_service import search  # noqa: E402
+
+WORDS = (
+    "ich du er sie wir ihr habe hast hat haben gehe gehst geht gehen mit nach aus bei "
+    "von zu seit dem der den die das einem einer Dativ Akkusativ Genitiv Nominativ "
+    "Präposition Verb Adjektiv Endung Übung Beispiel Satz Frage Antwort richtig falsch "
+    "Schule Arbeit Freund Familie Wochenende Urlaub Stadt Bahnhof Straße Wörterbuch "
+    "heute morgen gestern immer oft gern schnell langsam schön gut besser am besten"
+).split()
+
+# Zipf-like word frequencies, as in natural text
+WEIGHTS = [1 / (rank + 1) for rank in range(len(WORDS))]
+
+QUERIES = ["Dativ", "Präposition mit", "wörterbuch", "Urlaub Bahnhof gestern", "zzzz"]
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def populate(messages: int, per_chat: int):
+    rng = random.Random(7)
+    conn = get_db()
+    for chat_index in range(messages // per_chat):
+        chat_id = str(uuid.uuid4())
+        conn.execute(
+            "INSERT INTO chats (id, title, mode) VALUES (?, ?, 'free_talk')",
+            (chat_id, " ".join(rng.choices(WORDS, WEIGHTS, k=3)).capitalize())
+        )
+        conn.executemany(
+            "INSERT INTO messages (id, chat_id, role, content) VALUES (?, ?, ?, ?)",
+            [
+                (str(uuid.uuid4()), chat_id, "user" if i % 2 == 0 else "assistant",
+                 " ".join(rng.choices(WORDS, WEIGHTS, k=rng.randint(8, 40))))
+                for i in range(per_chat)
+            ]
+        )
+        if chat_index % 100 == 0:
+            conn.commit()
+    conn.commit()
+    conn.close()
+
+
+def measure(fn, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "p50_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(percentile(samples, 0.95), 3),
+    }
+
+
+def like_scan(q: str):
+    conn = get_db()
+    conn.execute(
+        "SELECT id FROM messages WHERE content LIKE ? LIMIT 21",
+        (f"%{q}%",)
+    ).fetchall()
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--per-chat", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    init_db()
+    start = time.perf_counter()
+    populate(args.messages, args.per_chat)
+    populate_s = time.perf_counter() - start
+
+    results = {
+        "messages": args.messages,
+        "populate_s": round(populate_s, 2),
+        "db_bytes": os.path.getsize(os.environ["DATABASE_PATH"]),
+        "queries": {},
+    }
+    for q in QUERIES:
+        results["queries"][q] = {
+            "fts_all_scopes": measure(lambda: search(q), args.repeat),
+            "fts_messages_page_3": measure(lambda: search(q, ["messages"], 20, 40), args.repeat),
+            "like_scan": measure(lambda: like_scan(q), max(1, args.repeat // 5)),
+            "hits_first_page": len(search(q)["results"]),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
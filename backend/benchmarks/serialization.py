@@ -0,0 +1,121 @@
+"""
+Benchmark: chat detail serialization for 1k/10k-message chats.
+
+Compares the previous path (dict rows through jsonable_encoder and the
+standard JSONResponse) with the typed response model + FastJSONResponse
+path the chat endpoints use now, and measures the full GET /api/chats/{id}
+request with and without compression.
+
+Run from backend/:  python -m benchmarks.serialization [--sizes 1000 10000] [--repeat 10]
+"""
+
+import argparse
+import asyncio
+import random
+import time
+import uuid
+
+from benchmarks.harness import setup_env, summarize, environment, write_results
+
+setup_env()
+
+import httpx  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+from core.database import init_db, get_db  # noqa: E402
+from core.responses import FastJSONResponse, orjson, brotli  # noqa: E402
+from models import ChatDetail  # noqa: E402
+from services.chat_service import get_chat  # noqa: E402
+from benchmarks.corpus import make_sentence  # noqa: E402
+
+
+def create_chat(messages: int) -> str:
+    rng = random.Random(messages)
+    chat_id = str(uuid.uuid4())
+    conn = get_db()
+    conn.execute("INSERT INTO chats (id, title, mode) VALUES (?, ?, 'free_talk')", (chat_id, f"{messages} messages"))
+    conn.executemany(
+        "INSERT INTO messages (id, chat_id, role, content, created_at) VALUES (?, ?, ?, ?, ?)",
+        [
+            (str(uuid.uuid4()), chat_id, "user" if i % 2 == 0 else "assistant",
+             " ".join(make_sentence(rng) for _ in range(1 if i % 2 == 0 else 4)),
+             f"2024-01-01 {i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}")
+            for i in range(messages)
+        ]
+    )
+    conn.commit()
+    conn.close()
+    return chat_id
+
+
+def timed(fn, repeat: int) -> dict:
+    fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+async def request_sizes(client: httpx.AsyncClient, chat_id: str, repeat: int) -> dict:
+    results = {}
+    encodings = ["identity", "gzip"] + (["br"] if brotli else [])
+    for encoding in encodings:
+        samples = []
+        size = 0
+        for _ in range(repeat + 1):
+            start = time.perf_counter()
+            response = await client.get(f"/api/chats/{chat_id}", headers={"Accept-Encoding": encoding})
+            samples.append((time.perf_counter() - start) * 1000)
+            size = len(response.content) if encoding == "identity" else int(response.headers.get("content-length", 0))
+        results[encoding] = {"ms": summarize(samples[1:]), "bytes": size}
+    return results
+
+
+async def end_to_end(chat_ids: dict, repeat: int) -> dict:
+    from main import app
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        return {size: await request_sizes(client, chat_id, repeat) for size, chat_id in chat_ids.items()}
+
+
+def run(sizes=(1000, 10000), repeat: int = 10) -> dict:
+    init_db()
+    adapter = TypeAdapter(ChatDetail)
+    chat_ids = {}
+    results = {"orjson": orjson is not None, "brotli": brotli is not None, "chats": {}}
+    for size in sizes:
+        chat_id = chat_ids[f"{size}_messages"] = create_chat(size)
+        chat, messages = get_chat(chat_id)
+        content = {"chat": chat, "messages": messages}
+
+        def default_path():
+            JSONResponse(jsonable_encoder(content))
+
+        def typed_path():
+            FastJSONResponse(adapter.dump_python(adapter.validate_python(content), mode="json"))
+
+        results["chats"][f"{size}_messages"] = {
+            "db_load_ms": timed(lambda: get_chat(chat_id), repeat),
+            "serialize_default_ms": timed(default_path, repeat),
+            "serialize_typed_fast_ms": timed(typed_path, repeat),
+        }
+    for size, measured in asyncio.run(end_to_end(chat_ids, repeat)).items():
+        results["chats"][size]["request"] = measured
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+    write_results({"meta": environment(), "serialization": run(args.sizes, args.repeat)}, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark: backend startup - import time per module and time until /health reports ready.
+
+Each run is a fresh interpreter, so nothing is cached in sys.modules.
+`python -X importtime` provides the per-module numbers.
+
+Run from backend/:  python -m benchmarks.startup [--runs 5] [--top 15]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List
+
+from benchmarks.harness import setup_env, summarize, environment, write_results
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIRST_PARTY = ("main", "core", "services", "routers", "models")
+
+# Imports the app, runs the lifespan and waits for the warm-up to finish
+READY_SCRIPT = """
+import asyncio, json, time
+start = time.perf_counter()
+from main import app
+from services.warmup_service import is_ready, warmup_status
+imported = time.perf_counter()
+
+async def main():
+    async with app.router.lifespan_context(app):
+        started = time.perf_counter()
+        while not is_ready():
+            await asyncio.sleep(0.005)
+        ready = time.perf_counter()
+    print(json.dumps({
+        "import_ms": (imported - start) * 1000,
+        "lifespan_ms": (started - imported) * 1000,
+        "ready_ms": (ready - start) * 1000,
+        "warmup": warmup_status()["steps"],
+    }))
+
+asyncio.run(main())
+"""
+
+
+def _env() -> dict:
+    setup_env()
+    # Nothing to preload against here; Whisper is preloaded if it is installed
+    return {**os.environ, "WARMUP_OLLAMA": "false"}
+
+
+def parse_importtime(stderr: str) -> List[dict]:
+    """Rows of `-X importtime` output as {module, self_us, cumulative_us}"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append({"module": name.strip(), "self_us": int(self_us), "cumulative_us": int(cumulative_us)})
+    return modules
+
+
+def import_profile(runs: int, top: int) -> dict:
+    totals = []
+    per_module: Dict[str, List[int]] = {}
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import main"],
+            cwd=BACKEND_DIR, env=_env(), capture_output=True, text=True, check=True
+        )
+        for row in parse_importtime(proc.stderr):
+            if row["module"] == "main":
+                totals.append(row["cumulative_us"] / 1000)
+            per_module.setdefault(row["module"], []).append(row["cumulative_us"])
+
+    def median_ms(values):
+        return round(sorted(values)[len(values) // 2] / 1000, 2)
+
+    first_party = {m: median_ms(v) for m, v in per_module.items() if m.split(".")[0] in FIRST_PARTY}
+    third_party = {m: median_ms(v) for m, v in per_module.items()
+                   if "." not in m and m.split(".")[0] not in FIRST_PARTY}
+    return {
+        "import_main_ms": summarize(totals, 1),
+        "first_party_cumulative_ms": dict(sorted(first_party.items(), key=lambda kv: -kv[1])[:top]),
+        "top_level_packages_cumulative_ms": dict(sorted(third_party.items(), key=lambda kv: -kv[1])[:top]),
+    }
+
+
+def time_to_ready(runs: int) -> dict:
+    samples = []
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-c", READY_SCRIPT],
+            cwd=BACKEND_DIR, env=_env(), capture_output=True, text=True, check=True
+        )
+        samples.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    return {
+        "import_ms": summarize([s["import_ms"] for s in samples], 1),
+        "lifespan_ms": summarize([s["lifespan_ms"] for s in samples], 1),
+        "ready_ms": summarize([s["ready_ms"] for s in samples], 1),
+        "warmup": samples[-1]["warmup"],
+    }
+
+
+def run(runs: int = 5, top: int = 15) -> dict:
+    return {"imports": import_profile(runs, top), "time_to_ready": time_to_ready(runs)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="modules listed per category")
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+    write_results({"meta": environment(), "startup": run(args.runs, args.top)}, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,8 @@
 from core.config import (
-    llm_config, 
-    whisper_config, 
-    update_llm_config, 
-    update_whisper_config,
     LLMConfig,
     WhisperConfig,
     DB_PATH,
     AUDIO_UPLOAD_DIR
 )
 from core.database import init_db, get_db, dict_from_row, execute_query, execute_write
+from core.runtime_config import get_llm_config, get_whisper_config, update_llm_config, update_whisper_config
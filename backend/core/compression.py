@@ -0,0 +1,32 @@
+"""
+Text compression for stored document content
+"""
+
+import zlib
+from typing import Tuple
+
+from core.config import DOCUMENT_CODEC
+
+
+def compress_text(text: str, codec: str = DOCUMENT_CODEC) -> Tuple[bytes, str]:
+    """Compress text, returning the data and the codec actually used"""
+    raw = text.encode("utf-8")
+    if codec == "zstd":
+        try:
+            import zstandard
+            return zstandard.ZstdCompressor(level=9).compress(raw), "zstd"
+        except ImportError:
+            print("zstandard not installed, falling back to zlib. Run: pip install zstandard")
+    return zlib.compress(raw, 6), "zlib"
+
+
+def decompress_text(data: bytes, codec: str) -> str:
+    """Decompress text stored with compress_text"""
+    if codec == "zstd":
+        import zstandard
+        raw = zstandard.ZstdDecompressor().decompress(data)
+    elif codec == "zlib":
+        raw = zlib.decompress(data)
+    else:
+        raise ValueError(f"Unknown codec: {codec}")
+    return raw.decode("utf-8")
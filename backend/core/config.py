@@ -13,12 +13,129 @@ DB_PATH = os.getenv("DATABASE_PATH", "language_teacher.db")
 AUDIO_UPLOAD_DIR = os.getenv("AUDIO_UPLOAD_DIR", "./audio_uploads")
 MAX_AUDIO_SIZE_MB = 25
 
-os.makedirs(AUDIO_UPLOAD_DIR, exist_ok=True)
+# Number of decompressed document texts kept in memory for document-mode chats
+DOCUMENT_CACHE_SIZE = int(os.getenv("DOCUMENT_CACHE_SIZE", "32"))
+# Codec for stored document content: "zlib" (built in) or "zstd" (needs zstandard)
+DOCUMENT_CODEC = os.getenv("DOCUMENT_CODEC", "zlib")
+
+# Responses at least this large are compressed (brotli if installed and accepted, else gzip)
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+
+# Request tracing: recent traces are kept in memory; set TRACE_STORE_ENABLED=true
+# to also persist them in a separate SQLite file for TRACE_RETENTION_HOURS
+TRACE_STORE_ENABLED = os.getenv("TRACE_STORE_ENABLED", "false").lower() == "true"
+TRACE_DB_PATH = os.getenv("TRACE_DB_PATH", "traces.db")
+TRACE_RETENTION_HOURS = float(os.getenv("TRACE_RETENTION_HOURS", "24"))
+
+# Worker threads for blocking Whisper decoding and document ingest (PDF/OCR extraction, indexing)
+WHISPER_WORKERS = int(os.getenv("WHISPER_WORKERS", "1"))
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "2"))
+
+# Sampling profiler (off by default). PROFILING_ENABLED lets requests sent with
+# ?profile=1 or an "X-Profile: 1" header plus a matching X-Profile-Token be profiled;
+# PROFILE_BACKGROUND_ENABLED periodically samples the event loop and worker pools.
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_BACKGROUND_ENABLED = os.getenv("PROFILE_BACKGROUND_ENABLED", "false").lower() == "true"
+PROFILE_BACKGROUND_INTERVAL_MS = float(os.getenv("PROFILE_BACKGROUND_INTERVAL_MS", "100"))
+PROFILE_BACKGROUND_WINDOW_S = int(os.getenv("PROFILE_BACKGROUND_WINDOW_S", "60"))
+PROFILE_BACKGROUND_WINDOWS = int(os.getenv("PROFILE_BACKGROUND_WINDOWS", "10"))
+
+# Warm-up after startup (services/warmup_service.py): load the Whisper model, ask
+# Ollama to load the chat model, prime document caches. /health reports readiness.
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+WARMUP_WHISPER = os.getenv("WARMUP_WHISPER", "true").lower() == "true"
+WARMUP_OLLAMA = os.getenv("WARMUP_OLLAMA", "true").lower() == "true"
+WARMUP_CACHES = os.getenv("WARMUP_CACHES", "true").lower() == "true"
+# How long Ollama keeps the model loaded after a request ("30m", or seconds; -1 = forever); sent with
+# every request. OLLAMA_KEEP_ALIVE_MODELS overrides it per model: "qwen2.5:0.5b=10m,llama3.2=-1"
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_KEEP_ALIVE_MODELS = dict(
+    item.strip().rsplit("=", 1) for item in os.getenv("OLLAMA_KEEP_ALIVE_MODELS", "").split(",") if "=" in item
+)
+
+# Ollama context sizes (services/context_planner.py): a request gets the smallest of OLLAMA_CTX_BUCKETS
+# that fits its estimated prompt plus OLLAMA_REPLY_TOKENS, but keeps a model's loaded size when that is
+# big enough, so sizes don't alternate and force reloads. Warm-up loads the chat model with OLLAMA_PRELOAD_CTX.
+OLLAMA_CTX_BUCKETS = sorted(int(size) for size in os.getenv("OLLAMA_CTX_BUCKETS", "2048,8192,32768").split(","))
+OLLAMA_PRELOAD_CTX = int(os.getenv("OLLAMA_PRELOAD_CTX", "8192"))
+OLLAMA_REPLY_TOKENS = int(os.getenv("OLLAMA_REPLY_TOKENS", "1024"))
+
+# Readiness prober behind /ready: dependencies are checked in the background every
+# READY_PROBE_INTERVAL_S; a result older than 3 intervals counts as failed
+READY_PROBE_INTERVAL_S = float(os.getenv("READY_PROBE_INTERVAL_S", "10"))
+READY_PROBE_TIMEOUT_S = float(os.getenv("READY_PROBE_TIMEOUT_S", "5"))
+READY_MIN_FREE_DISK_MB = int(os.getenv("READY_MIN_FREE_DISK_MB", "500"))
+
+# Shared speech server (speech_server.py): when SPEECH_SERVER_SOCKET is set, API workers send
+# transcriptions to it over that Unix socket and fall back to in-process Whisper if it is down
+SPEECH_SERVER_SOCKET = os.getenv("SPEECH_SERVER_SOCKET")
+SPEECH_SERVER_TIMEOUT_S = float(os.getenv("SPEECH_SERVER_TIMEOUT_S", "300"))
+SPEECH_SERVER_WORKERS = int(os.getenv("SPEECH_SERVER_WORKERS", "2"))
+SPEECH_SERVER_MAX_MODELS = int(os.getenv("SPEECH_SERVER_MAX_MODELS", "2"))
+
+# Chat message writes go through one writer thread per process (core/writer.py) that commits
+# everything queued while it was busy, up to WRITE_BATCH_MAX writes, in one transaction
+WRITE_BATCH_MAX = int(os.getenv("WRITE_BATCH_MAX", "64"))
+
+# LLM/Whisper settings changed at runtime are stored in SQLite and shared by all worker
+# processes; each process re-checks the stored versions at most every CONFIG_REFRESH_S
+CONFIG_REFRESH_S = float(os.getenv("CONFIG_REFRESH_S", "2"))
+# API keys entered in the settings are not stored in the database but in this file (mode 0600)
+CONFIG_SECRETS_PATH = os.getenv("CONFIG_SECRETS_PATH", f"{DB_PATH}.secrets.json")
+
+# Change events pushed over /api/events: the newest EVENTS_RETENTION events are kept for
+# clients resuming from a cursor; writes from other processes are picked up every EVENTS_POLL_S
+EVENTS_RETENTION = int(os.getenv("EVENTS_RETENTION", "5000"))
+EVENTS_POLL_S = float(os.getenv("EVENTS_POLL_S", "1"))
+EVENTS_PING_S = float(os.getenv("EVENTS_PING_S", "25"))
+
+# Speculative replies (services/prefetch_service.py): in PREFETCH_MODES chats the client sends the
+# learner's draft while they type and the reply is generated ahead of time, at most PREFETCH_CONCURRENCY
+# at once; send_message uses it if the sent text and the history still match within PREFETCH_TTL_S
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "false").lower() == "true"
+PREFETCH_MODES = tuple(m.strip() for m in os.getenv("PREFETCH_MODES", "grammar,document").split(",") if m.strip())
+PREFETCH_TTL_S = float(os.getenv("PREFETCH_TTL_S", "120"))
+PREFETCH_CONCURRENCY = int(os.getenv("PREFETCH_CONCURRENCY", "1"))
+PREFETCH_MAX_ENTRIES = int(os.getenv("PREFETCH_MAX_ENTRIES", "256"))
+
+# A send whose client disconnects is cancelled (core/disconnect.py) and its user message removed
+# again, so the chat has no message without a reply; set to true to keep such messages
+KEEP_UNANSWERED_MESSAGES = os.getenv("KEEP_UNANSWERED_MESSAGES", "false").lower() == "true"
+
+# Exercise bank built for each document after upload (services/exercise_service.py):
+# sentences handled per transaction, and how many of the top words get a vocab item
+EXERCISE_BATCH_SIZE = int(os.getenv("EXERCISE_BATCH_SIZE", "200"))
+EXERCISE_VOCAB_ITEMS = int(os.getenv("EXERCISE_VOCAB_ITEMS", "100"))
+EXERCISE_OPTIONS = int(os.getenv("EXERCISE_OPTIONS", "4"))
+
+# Grammar detection in free talk: "separate" analyses the learner's message with its own LLM call
+# (LLMConfig.grammar_model, e.g. a small local model) while the reply is generated; "inline" has the
+# chat model tag issues in its reply; "auto" is separate only when a grammar model is configured.
+# Analyses taking longer than GRAMMAR_TIMEOUT_S are dropped.
+GRAMMAR_DETECTOR = os.getenv("GRAMMAR_DETECTOR", "auto")
+GRAMMAR_TIMEOUT_S = float(os.getenv("GRAMMAR_TIMEOUT_S", "20"))
+
+# LLM usage accounting (services/usage_service.py): one row per call, buffered and written in
+# batches every USAGE_FLUSH_S or once USAGE_BATCH_SIZE are pending. LLM_PRICES gives USD per
+# million input/output tokens by model for cost estimates: "gpt-4o-mini=0.15/0.6,claude-3-5-haiku-latest=0.8/4"
+USAGE_FLUSH_S = float(os.getenv("USAGE_FLUSH_S", "2"))
+USAGE_BATCH_SIZE = int(os.getenv("USAGE_BATCH_SIZE", "200"))
+LLM_PRICES = {
+    model.strip(): tuple(float(price) for price in prices.split("/", 1))
+    for model, prices in (item.rsplit("=", 1) for item in os.getenv("LLM_PRICES", "").split(",") if "=" in item)
+}
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 
+# Hosted API endpoints (override to use a proxy or a local stand-in)
+ANTHROPIC_BASE_URL = os.getenv("ANTHROPIC_BASE_URL", "https://api.anthropic.com")
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com")
+
 DEFAULT_LLM_PROVIDER = os.getenv("DEFAULT_LLM_PROVIDER", "ollama")
 DEFAULT_LLM_MODEL = os.getenv("DEFAULT_LLM_MODEL", "llama3.2")
 
@@ -28,6 +145,8 @@ class LLMConfig(BaseModel):
     model: str = DEFAULT_LLM_MODEL
     base_url: str = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
     api_key: Optional[str] = None
+    # Model (same provider) for the separate grammar analysis; None uses `model`
+    grammar_model: Optional[str] = os.getenv("GRAMMAR_MODEL") or None
     
     def get_api_key(self) -> Optional[str]:
         if self.api_key:
@@ -48,15 +167,7 @@ class WhisperConfig(BaseModel):
     task: str = "transcribe"
 
 
-llm_config = LLMConfig()
-whisper_config = WhisperConfig()
-
-
-def update_llm_config(config: LLMConfig):
-    global llm_config
-    llm_config = config
-
+def ensure_directories():
+    """Create the directories the app writes to (called at startup, not on import)"""
+    os.makedirs(AUDIO_UPLOAD_DIR, exist_ok=True)
 
-def update_whisper_config(config: WhisperConfig):
-    global whisper_config
-    whisper_config = config
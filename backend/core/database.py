@@ -2,9 +2,16 @@
 Database initialization and helpers
 """
 
+import hashlib
 import sqlite3
+import time
+import unicodedata
+from functools import lru_cache
 from typing import Optional, List, Any
 from core.config import DB_PATH
+from core.compression import compress_text
+from core.metrics import DB_QUERY_SECONDS, DB_QUERY_ERRORS
+from core.tracing import add_span
 
 
 def init_db():
@@ -50,6 +57,16 @@ def init_db():
         )
     """)
     
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_messages_chat ON messages(chat_id, created_at)")
+    
+    # Sidebar summary, maintained by chat_service on every message write
+    added = _add_column(cursor, "chats", "message_count", "INTEGER NOT NULL DEFAULT 0")
+    _add_column(cursor, "chats", "last_message_preview", "TEXT")
+    _add_column(cursor, "chats", "last_message_role", "TEXT")
+    _add_column(cursor, "chats", "last_message_at", "TIMESTAMP")
+    if added:
+        _backfill_chat_summaries(cursor)
+    
     # Documents table (for document mode)
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS documents (
@@ -62,6 +79,76 @@ def init_db():
         )
     """)
     
+    # Shared document content, addressed by the hash of the normalized text.
+    # Several logical documents can point at one blob (re-uploads of the same file).
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS document_blobs (
+            id TEXT PRIMARY KEY,
+            content TEXT,
+            extracted_words TEXT,
+            extracted_sentences TEXT,
+            ref_count INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    _add_column(cursor, "documents", "file_hash", "TEXT")
+    _add_column(cursor, "documents", "blob_id", "TEXT REFERENCES document_blobs(id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_documents_file_hash ON documents(file_hash)")
+    _migrate_inline_documents(cursor)
+    
+    # Content is stored compressed in `data`; `content` only holds not yet migrated text
+    _add_column(cursor, "document_blobs", "data", "BLOB")
+    _add_column(cursor, "document_blobs", "codec", "TEXT")
+    _add_column(cursor, "document_blobs", "size", "INTEGER")
+    _compress_document_blobs(cursor)
+    
+    # Per-document word frequencies (vocabulary index)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS document_words (
+            doc_id TEXT NOT NULL,
+            word TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            first_offset INTEGER NOT NULL,
+            PRIMARY KEY (doc_id, word),
+            FOREIGN KEY (doc_id) REFERENCES documents(id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_document_words_word ON document_words(word, count)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_document_words_rank ON document_words(doc_id, count DESC)")
+    
+    # Sentences of each document with character offsets into its content
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS document_sentences (
+            doc_id TEXT NOT NULL,
+            idx INTEGER NOT NULL,
+            start_offset INTEGER NOT NULL,
+            end_offset INTEGER NOT NULL,
+            text TEXT NOT NULL,
+            PRIMARY KEY (doc_id, idx),
+            FOREIGN KEY (doc_id) REFERENCES documents(id) ON DELETE CASCADE
+        )
+    """)
+    
+    # Pre-generated exercises per document (services/exercise_service.py); served in id order
+    # per kind, `answer` is NULL for free-form items graded by the LLM
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS document_exercises (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            doc_id TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            prompt TEXT NOT NULL,
+            answer TEXT,
+            options TEXT,
+            hint TEXT,
+            source TEXT,
+            FOREIGN KEY (doc_id) REFERENCES documents(id) ON DELETE CASCADE
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_document_exercises_next ON document_exercises(doc_id, kind, id)")
+    # One exercise per sentence / word, so concurrent or repeated builds add nothing twice
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_document_exercises_source ON document_exercises(doc_id, source)")
+    
     # Grammar rules learned
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS grammar_rules (
@@ -75,20 +162,313 @@ def init_db():
         )
     """)
     
+    # One row per grammar issue detected in an assistant message (see services/grammar_service.py)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS grammar_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            message_id TEXT NOT NULL UNIQUE,
+            chat_id TEXT NOT NULL,
+            rule_key TEXT NOT NULL,
+            rule_name TEXT NOT NULL,
+            explanation TEXT,
+            created_at TIMESTAMP NOT NULL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_grammar_events_rule ON grammar_events(rule_key, created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_grammar_events_chat ON grammar_events(chat_id, created_at)")
+    
+    # Per-rule aggregates and weekly counts, updated with every grammar event
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS grammar_stats (
+            rule_key TEXT PRIMARY KEY,
+            rule_name TEXT NOT NULL,
+            occurrences INTEGER NOT NULL,
+            first_seen TIMESTAMP NOT NULL,
+            last_seen TIMESTAMP NOT NULL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_grammar_stats_occurrences ON grammar_stats(occurrences DESC)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_grammar_stats_last_seen ON grammar_stats(last_seen DESC)")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS grammar_stats_weekly (
+            rule_key TEXT NOT NULL,
+            week TEXT NOT NULL,
+            occurrences INTEGER NOT NULL,
+            PRIMARY KEY (rule_key, week)
+        ) WITHOUT ROWID
+    """)
+    
+    # One row per LLM call (services/usage_service.py); kept when the chat is deleted
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS llm_usage (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at TIMESTAMP NOT NULL,
+            provider TEXT NOT NULL,
+            model TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            chat_id TEXT,
+            mode TEXT,
+            status TEXT NOT NULL,
+            prompt_tokens INTEGER,
+            completion_tokens INTEGER,
+            latency_ms REAL NOT NULL,
+            ttft_ms REAL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_llm_usage_created ON llm_usage(created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_llm_usage_chat ON llm_usage(chat_id, created_at)")
+    
+    # Progress of resumable data migrations that run after init_db
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS migration_state (
+            name TEXT PRIMARY KEY,
+            position INTEGER NOT NULL DEFAULT 0,
+            finished_at REAL
+        )
+    """)
+    
+    # Revision counters per table / per chat, bumped on writes (ETags, see core/revisions.py)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS revisions (
+            key TEXT PRIMARY KEY,
+            revision INTEGER NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    """)
+    
+    # LLM/Whisper settings changed through /api/config (see core/runtime_config.py)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS runtime_config (
+            name TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    """)
+    
+    # Change log behind the /api/events WebSocket; the id is the clients' resume cursor
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            type TEXT NOT NULL,
+            chat_id TEXT,
+            payload TEXT NOT NULL,
+            created_at REAL NOT NULL
+        )
+    """)
+    
+    # Written by the readiness prober to measure write latency (one row per probe name)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS health_probes (
+            name TEXT PRIMARY KEY,
+            checked_at REAL NOT NULL
+        )
+    """)
+    
+    # Full-text search indexes, kept in sync with their tables by triggers
+    _create_fts_index(cursor, "chats_fts", "chats", ["title"])
+    _create_fts_index(cursor, "messages_fts", "messages", ["content"])
+    _create_fts_index(cursor, "documents_fts", "documents", ["filename"])
+    _create_fts_index(cursor, "document_sentences_fts", "document_sentences", ["text"])
+    _create_fts_index(cursor, "grammar_rules_fts", "grammar_rules", ["name", "description"])
+    
     conn.commit()
     conn.close()
 
 
+# Length of the last-message snippet kept on each chat for the sidebar
+PREVIEW_CHARS = 120
+
+
+# Case and diacritic folding (ä -> a, é -> e) so learners find words typed without umlauts;
+# prefix indexes speed up the prefix queries used for German compounds.
+FTS_TOKENIZER = "unicode61 remove_diacritics 2"
+
+
+def _create_fts_index(cursor, fts_table: str, table: str, columns: List[str]) -> None:
+    """
+    Create an external-content FTS5 index over `table` with sync triggers.
+    
+    The index is keyed by `search_rowid`, an integer the insert trigger numbers
+    rows with, not by the implicit rowid: the indexed tables have TEXT (or
+    composite) primary keys, so VACUUM may renumber their rowids.
+    """
+    existing = cursor.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (fts_table,)
+    ).fetchone()
+    if existing and "content_rowid" not in existing[0]:
+        # Built by an older version on the implicit rowid: rebuild it
+        for trigger in ("insert", "delete", "update"):
+            cursor.execute(f"DROP TRIGGER IF EXISTS {table}_fts_{trigger}")
+        cursor.execute(f"DROP TABLE {fts_table}")
+        existing = None
+    
+    if _add_column(cursor, table, "search_rowid", "INTEGER"):
+        cursor.execute(f"UPDATE {table} SET search_rowid = rowid")
+    cursor.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_search_rowid ON {table}(search_rowid)")
+    
+    cols = ", ".join(columns)
+    new_cols = ", ".join(f"new.{c}" for c in columns)
+    old_cols = ", ".join(f"old.{c}" for c in columns)
+    
+    cursor.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5(
+            {cols}, content='{table}', content_rowid='search_rowid',
+            tokenize='{FTS_TOKENIZER}', prefix='2 3'
+        )
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN
+            UPDATE {table} SET search_rowid = (SELECT COALESCE(MAX(search_rowid), 0) + 1 FROM {table})
+            WHERE rowid = new.rowid;
+            INSERT INTO {fts_table}(rowid, {cols})
+            SELECT search_rowid, {cols} FROM {table} WHERE rowid = new.rowid;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts_table}({fts_table}, rowid, {cols}) VALUES ('delete', old.search_rowid, {old_cols});
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE OF {cols} ON {table} BEGIN
+            INSERT INTO {fts_table}({fts_table}, rowid, {cols}) VALUES ('delete', old.search_rowid, {old_cols});
+            INSERT INTO {fts_table}(rowid, {cols}) VALUES (new.search_rowid, {new_cols});
+        END
+    """)
+    
+    if not existing:
+        cursor.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
+
+
+def _add_column(cursor, table: str, column: str, definition: str) -> bool:
+    """Add a column to an existing table if it is not there yet; True if it was added"""
+    columns = [r[1] for r in cursor.execute(f"PRAGMA table_info({table})").fetchall()]
+    if column in columns:
+        return False
+    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    return True
+
+
+def _backfill_chat_summaries(cursor) -> None:
+    """Fill the sidebar summary columns of chats created before they existed"""
+    chat_ids = [r[0] for r in cursor.execute("SELECT id FROM chats").fetchall()]
+    for chat_id in chat_ids:
+        count = cursor.execute("SELECT COUNT(*) FROM messages WHERE chat_id = ?", (chat_id,)).fetchone()[0]
+        last = cursor.execute(
+            "SELECT role, content, created_at FROM messages WHERE chat_id = ? ORDER BY created_at DESC, rowid DESC LIMIT 1",
+            (chat_id,)
+        ).fetchone()
+        if last:
+            cursor.execute(
+                """UPDATE chats SET message_count = ?, last_message_role = ?, last_message_preview = ?,
+                   last_message_at = ? WHERE id = ?""",
+                (count, last[0], message_preview(last[1]), last[2], chat_id)
+            )
+
+
+def _migrate_inline_documents(cursor) -> None:
+    """Move content stored inline in `documents` (pre-dedup rows) into document_blobs"""
+    rows = cursor.execute(
+        "SELECT id, content, extracted_words, extracted_sentences FROM documents WHERE blob_id IS NULL"
+    ).fetchall()
+    for doc_id, content, words, sentences in rows:
+        blob_id = content_hash(normalize_text(content).encode("utf-8"))
+        cursor.execute(
+            """INSERT INTO document_blobs (id, content, extracted_words, extracted_sentences, ref_count)
+               VALUES (?, ?, ?, ?, 1)
+               ON CONFLICT(id) DO UPDATE SET ref_count = ref_count + 1""",
+            (blob_id, content, words, sentences)
+        )
+        cursor.execute(
+            "UPDATE documents SET blob_id = ?, content = '', extracted_words = NULL, extracted_sentences = NULL WHERE id = ?",
+            (blob_id, doc_id)
+        )
+
+
+def _compress_document_blobs(cursor) -> None:
+    """Compress blob content that is still stored as plain text"""
+    rows = cursor.execute("SELECT id, content FROM document_blobs WHERE content IS NOT NULL").fetchall()
+    for blob_id, content in rows:
+        data, codec = compress_text(content)
+        cursor.execute(
+            "UPDATE document_blobs SET data = ?, codec = ?, size = ?, content = NULL WHERE id = ?",
+            (data, codec, len(content), blob_id)
+        )
+
+
+def normalize_text(text: str) -> str:
+    """Normalize extracted text so that equivalent documents hash identically"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def message_preview(text: str) -> str:
+    """Single-line snippet of a message for chat lists"""
+    text = " ".join(text.split())
+    return text if len(text) <= PREVIEW_CHARS else text[:PREVIEW_CHARS - 1].rstrip() + "…"
+
+
+def content_hash(data: bytes) -> str:
+    """Stable content hash used for document deduplication"""
+    return hashlib.sha256(data).hexdigest()
+
+
+@lru_cache(maxsize=512)
+def _operation(sql: str) -> str:
+    """Statement type (SELECT, INSERT, ...) used as metrics label"""
+    words = sql.split(None, 1)
+    return words[0].upper() if words else "EMPTY"
+
+
+def _record_query(sql: str, seconds: float) -> None:
+    operation = _operation(sql)
+    DB_QUERY_SECONDS.observe(seconds, operation)
+    add_span(f"db.{operation.lower()}", seconds * 1000, sql=sql.strip()[:120])
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection that records statement execution time as metrics and trace spans"""
+    
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        except sqlite3.Error:
+            DB_QUERY_ERRORS.inc(_operation(sql))
+            raise
+        finally:
+            _record_query(sql, time.perf_counter() - start)
+    
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        except sqlite3.Error:
+            DB_QUERY_ERRORS.inc(_operation(sql))
+            raise
+        finally:
+            _record_query(sql, time.perf_counter() - start)
+
+
 def get_db():
     """Get database connection with row factory"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(DB_PATH, factory=TimedConnection)
     conn.row_factory = sqlite3.Row
     return conn
 
 
+# Internal columns left out of API payloads (the full-text search key, see _create_fts_index)
+INTERNAL_COLUMNS = ("search_rowid",)
+
+
 def dict_from_row(row) -> Optional[dict]:
-    """Convert sqlite row to dict"""
-    return dict(row) if row else None
+    """Convert sqlite row to dict (without internal columns)"""
+    if not row:
+        return None
+    data = dict(row)
+    for column in INTERNAL_COLUMNS:
+        data.pop(column, None)
+    return data
 
 
 def execute_query(query: str, params: tuple = ()) -> List[dict]:
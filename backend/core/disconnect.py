@@ -0,0 +1,53 @@
+"""
+Cancelling request work when the client goes away.
+
+Starlette keeps running an endpoint after the client disconnects, so a
+learner who navigates away (or a proxy that times out) would still pay for
+a full LLM generation or Whisper decode. cancel_on_disconnect() runs the
+work as a task and cancels it when the ASGI server reports http.disconnect;
+the cancellation reaches the httpx call to the provider, which closes the
+connection (Ollama then stops generating), and Whisper decoding, which checks
+a stop flag between segments.
+"""
+
+import asyncio
+from typing import Awaitable, TypeVar
+
+from fastapi import HTTPException, Request
+
+from core.metrics import CLIENT_DISCONNECTS
+
+T = TypeVar("T")
+
+# nginx's code for "client closed request"; only ends up in logs and metrics
+CLIENT_CLOSED_REQUEST = 499
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    # The body has been read by now, so the next message is the disconnect
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def cancel_on_disconnect(request: Request, work: Awaitable[T]) -> T:
+    """Await `work`, cancelling it (and waiting for its cleanup) if the client disconnects first"""
+    task = asyncio.ensure_future(work)
+    watcher = asyncio.create_task(_wait_for_disconnect(request))
+    try:
+        await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        task.cancel()
+        watcher.cancel()
+        raise
+    if task.done():
+        watcher.cancel()
+        return task.result()
+
+    task.cancel()
+    # Let the work roll back what it started before answering
+    await asyncio.gather(task, return_exceptions=True)
+    route = request.scope.get("route")
+    CLIENT_DISCONNECTS.inc(route.path if route is not None else request.url.path)
+    raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed the request")
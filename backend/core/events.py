@@ -0,0 +1,133 @@
+"""
+Change events pushed to clients over the /api/events WebSocket.
+
+Services record compact events (message appended, chat created/updated/
+deleted, document ingested/deleted, category and grammar rule changes) with
+record_event() in the same transaction as the write, and call
+notify_events() once it is committed. The events table is the source of
+truth: a woken subscriber reads the rows after its cursor, so a client that
+reconnects with the last id it saw gets exactly what it missed.
+"""
+
+import asyncio
+import json
+import time
+from typing import List, Optional, Set
+
+from core.config import EVENTS_RETENTION, EVENTS_POLL_S
+from core.database import get_db
+
+PRUNE_INTERVAL_S = 60.0
+
+_subscribers: Set["Subscriber"] = set()
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_watcher: Optional[asyncio.Task] = None
+
+
+class Subscriber:
+    """One connected client; woken when new events may be available"""
+
+    def __init__(self):
+        self.wake = asyncio.Event()
+
+    def __enter__(self):
+        global _loop
+        _loop = asyncio.get_running_loop()
+        _subscribers.add(self)
+        return self
+
+    def __exit__(self, *exc):
+        _subscribers.discard(self)
+
+
+def record_event(conn, type: str, data: dict, chat_id: Optional[str] = None) -> None:
+    """Append an event inside the caller's transaction (commit is up to the caller)"""
+    conn.execute(
+        "INSERT INTO events (type, chat_id, payload, created_at) VALUES (?, ?, ?, ?)",
+        (type, chat_id, json.dumps(data, default=str), time.time())
+    )
+
+
+def _wake_all() -> None:
+    for subscriber in _subscribers:
+        subscriber.wake.set()
+
+
+def notify_events() -> None:
+    """Wake connected subscribers after a commit that recorded events (safe from any thread)"""
+    if _loop is None or not _subscribers:
+        return
+    try:
+        _loop.call_soon_threadsafe(_wake_all)
+    except RuntimeError:
+        # The loop that served the subscribers is gone
+        pass
+
+
+def event_bounds() -> tuple:
+    """(oldest, latest) event id still stored; (0, 0) when there are none"""
+    conn = get_db()
+    row = conn.execute("SELECT MIN(id) AS oldest, MAX(id) AS latest FROM events").fetchone()
+    conn.close()
+    return row["oldest"] or 0, row["latest"] or 0
+
+
+def read_events(after: int, limit: int = 500) -> List[dict]:
+    """Events with an id greater than the cursor, oldest first"""
+    conn = get_db()
+    rows = conn.execute(
+        "SELECT id, type, chat_id, payload, created_at FROM events WHERE id > ? ORDER BY id LIMIT ?",
+        (after, limit)
+    ).fetchall()
+    conn.close()
+    return [
+        {
+            "id": row["id"],
+            "type": row["type"],
+            "chat_id": row["chat_id"],
+            "data": json.loads(row["payload"]),
+            "created_at": row["created_at"],
+        }
+        for row in rows
+    ]
+
+
+def prune_events() -> int:
+    """Drop all but the newest EVENTS_RETENTION events"""
+    conn = get_db()
+    cursor = conn.execute(
+        "DELETE FROM events WHERE id <= (SELECT MAX(id) FROM events) - ?",
+        (EVENTS_RETENTION,)
+    )
+    conn.commit()
+    conn.close()
+    return cursor.rowcount
+
+
+async def _watch_loop() -> None:
+    """Catch events committed by other processes, and keep the table bounded"""
+    latest = (await asyncio.to_thread(event_bounds))[1]
+    last_prune = time.monotonic()
+    while True:
+        await asyncio.sleep(EVENTS_POLL_S)
+        if _subscribers:
+            current = (await asyncio.to_thread(event_bounds))[1]
+            if current != latest:
+                latest = current
+                _wake_all()
+        if time.monotonic() - last_prune > PRUNE_INTERVAL_S:
+            await asyncio.to_thread(prune_events)
+            last_prune = time.monotonic()
+
+
+def start_event_watcher() -> None:
+    global _watcher
+    if _watcher is None:
+        _watcher = asyncio.create_task(_watch_loop())
+
+
+def stop_event_watcher() -> None:
+    global _watcher
+    if _watcher is not None:
+        _watcher.cancel()
+        _watcher = None
@@ -0,0 +1,45 @@
+"""
+Framing for local IPC over Unix sockets (API workers <-> speech server).
+
+A frame is a 4-byte big-endian header length, a JSON header, and an optional
+binary payload whose length is the header's "size" field.
+"""
+
+import asyncio
+import json
+import struct
+from typing import Optional, Tuple
+
+_HEADER_LENGTH = struct.Struct(">I")
+MAX_HEADER_BYTES = 1 << 20
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Tuple[dict, Optional[bytes]]:
+    (length,) = _HEADER_LENGTH.unpack(await reader.readexactly(_HEADER_LENGTH.size))
+    if length > MAX_HEADER_BYTES:
+        raise ValueError(f"Frame header too large: {length} bytes")
+    header = json.loads(await reader.readexactly(length))
+    size = header.get("size", 0)
+    payload = await reader.readexactly(size) if size else None
+    return header, payload
+
+
+async def write_frame(writer: asyncio.StreamWriter, header: dict, payload: Optional[bytes] = None) -> None:
+    if payload:
+        header = {**header, "size": len(payload)}
+    encoded = json.dumps(header).encode("utf-8")
+    writer.write(_HEADER_LENGTH.pack(len(encoded)) + encoded)
+    if payload:
+        writer.write(payload)
+    await writer.drain()
+
+
+async def request(socket_path: str, header: dict, payload: Optional[bytes] = None,
+                  timeout: Optional[float] = None) -> Tuple[dict, Optional[bytes]]:
+    """Send one request on a new connection and wait for the reply"""
+    reader, writer = await asyncio.open_unix_connection(socket_path)
+    try:
+        await write_frame(writer, header, payload)
+        return await asyncio.wait_for(read_frame(reader), timeout)
+    finally:
+        writer.close()
@@ -0,0 +1,248 @@
+"""
+In-process metrics (counters, gauges, histograms) in Prometheus text format
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+DB_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1)
+
+_INF = 'le="+Inf"'
+
+_registry: List["_Metric"] = []
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, *labelvalues, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labelvalues, amount: float = 1) -> None:
+        self.inc(*labelvalues, amount=-amount)
+
+    def set(self, *labelvalues, value: float) -> None:
+        with self._lock:
+            self._values[labelvalues] = value
+
+    @contextmanager
+    def track_inprogress(self, *labelvalues):
+        self.inc(*labelvalues)
+        try:
+            yield
+        finally:
+            self.dec(*labelvalues)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (last one is +Inf), sum, count]
+        self._values: Dict[tuple, list] = {}
+
+    def observe(self, value: float, *labelvalues) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labelvalues)
+            if state is None:
+                state = self._values[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, *labelvalues):
+        """Observe the duration of the block, also when it raises"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labelvalues)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            items = sorted((labels, [list(s[0]), s[1], s[2]]) for labels, s in self._values.items())
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = _format_labels(self.labelnames, labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, _INF)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+def render_prometheus() -> str:
+    """Render all registered metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ============== Application metrics ==============
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route")
+)
+HTTP_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "HTTP requests currently being served"
+)
+CLIENT_DISCONNECTS = Counter(
+    "http_client_disconnects_total", "Requests whose client went away before the response; their work was cancelled",
+    ("route",)
+)
+
+LLM_REQUESTS = Counter(
+    "llm_requests_total", "LLM provider calls by outcome", ("provider", "model", "kind", "status")
+)
+LLM_REQUEST_SECONDS = Histogram(
+    "llm_request_duration_seconds", "LLM provider call latency", ("provider", "model", "kind")
+)
+LLM_IN_PROGRESS = Gauge(
+    "llm_requests_in_progress", "LLM provider calls waiting for a response", ("provider",)
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total", "Tokens reported by the LLM providers (prompt, completion)", ("provider", "model", "kind", "direction")
+)
+
+LLM_PREFETCH = Counter(
+    "llm_prefetch_total", "Speculative replies by outcome (started, hit, hit_pending, miss, stale, ...)", ("outcome",)
+)
+
+OLLAMA_PHASE_SECONDS = Histogram(
+    "ollama_phase_duration_seconds", "Durations Ollama reports per request (load, prompt_eval, eval)", ("model", "phase")
+)
+OLLAMA_TOKENS = Counter(
+    "ollama_tokens_total", "Tokens Ollama evaluated (prompt, eval)", ("model", "phase")
+)
+OLLAMA_TOKENS_PER_SECOND = Histogram(
+    "ollama_tokens_per_second", "Ollama prompt processing and generation speed", ("model", "phase"),
+    buckets=(1, 5, 10, 20, 40, 80, 160, 320, 640, 1280, 2560)
+)
+OLLAMA_REQUESTS_BY_CTX = Counter(
+    "ollama_requests_by_context_total", "Ollama requests by planned num_ctx", ("model", "num_ctx")
+)
+OLLAMA_MODEL_LOADS = Counter(
+    "ollama_model_loads_total", "Requests during which Ollama loaded the model (load_duration over 0.5s)",
+    ("model", "num_ctx")
+)
+
+TRANSCRIBE_SECONDS = Histogram(
+    "whisper_transcribe_duration_seconds", "Local Whisper transcription time", ("model",)
+)
+TRANSCRIBE_IN_PROGRESS = Gauge(
+    "whisper_transcriptions_in_progress", "Transcriptions currently running"
+)
+
+EXTRACTION_SECONDS = Histogram(
+    "document_extraction_duration_seconds", "Text extraction time for uploads", ("kind",)
+)
+EXTRACTION_ERRORS = Counter(
+    "document_extraction_errors_total", "Failed text extractions", ("kind",)
+)
+
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds", "SQLite statement execution time", ("operation",), buckets=DB_BUCKETS
+)
+DB_QUERY_ERRORS = Counter(
+    "db_query_errors_total", "Failed SQLite statements", ("operation",)
+)
+DB_WRITE_BATCH_SIZE = Histogram(
+    "db_write_batch_size", "Writes committed together by the group-commit writer", (),
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+DB_WRITE_WAIT_SECONDS = Histogram(
+    "db_write_wait_seconds", "Time from queueing a write until its batch was committed", (), buckets=DB_BUCKETS
+)
+
+
+# ============== ASGI middleware ==============
+
+class MetricsMiddleware:
+    """Record per-route latency, status counts and in-flight requests"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_PROGRESS.dec()
+            route = scope.get("route")
+            # Use the route template (/api/chats/{chat_id}) to keep label cardinality bounded
+            path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, method, path)
+            HTTP_REQUESTS.inc(method, path, str(status))
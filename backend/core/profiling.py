@@ -0,0 +1,222 @@
+"""
+Sampling profiler for on-demand request profiles and background stack sampling.
+
+A sampler thread reads the stacks of selected threads (the event loop and the
+worker pools) from sys._current_frames() and aggregates them in the folded
+format (`root;frame;frame count` per line) that flamegraph.pl and speedscope
+read. Nothing here runs unless enabled in core/config.py.
+"""
+
+import asyncio
+import hmac
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from typing import Callable, Dict, Optional
+from urllib.parse import parse_qs
+
+from fastapi import Header, HTTPException
+from fastapi.responses import JSONResponse
+
+from core.config import (
+    PROFILE_ADMIN_TOKEN, PROFILE_DIR, PROFILE_INTERVAL_MS, PROFILE_BACKGROUND_ENABLED,
+    PROFILE_BACKGROUND_INTERVAL_MS, PROFILE_BACKGROUND_WINDOW_S, PROFILE_BACKGROUND_WINDOWS,
+)
+from core.workers import WHISPER_THREAD_PREFIX, EXTRACTION_THREAD_PREFIX
+
+PROFILE_HEADER = b"x-profile"
+TOKEN_HEADER = b"x-profile-token"
+MAX_STACK_DEPTH = 128
+EVENT_LOOP_ROOT = "event-loop"
+# Whisper/OCR pools and the threadpool FastAPI runs sync endpoints in
+WORKER_THREAD_PREFIXES = (WHISPER_THREAD_PREFIX, EXTRACTION_THREAD_PREFIX, "AnyIO worker thread")
+
+_PROFILE_ID_RE = re.compile(r"[0-9a-f]{32}")
+
+
+def is_admin_token(token: Optional[str]) -> bool:
+    return bool(PROFILE_ADMIN_TOKEN and token) and hmac.compare_digest(token, PROFILE_ADMIN_TOKEN)
+
+
+def require_admin_token(x_profile_token: Optional[str] = Header(None)) -> None:
+    """Dependency for profile endpoints"""
+    if not is_admin_token(x_profile_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+def fold_stack(frame, root: str) -> str:
+    """Render a frame and its callers as one folded stack line (root first)"""
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        labels.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    labels.append(root)
+    return ";".join(reversed(labels))
+
+
+def render_folded(stacks: Counter) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def worker_threads() -> Dict[int, str]:
+    return {t.ident: t.name for t in threading.enumerate() if t.name.startswith(WORKER_THREAD_PREFIXES)}
+
+
+class StackSampler:
+    """Sample the stacks of the threads returned by `targets` (ident -> root label) every `interval_s`"""
+
+    def __init__(self, interval_s: float, targets: Callable[[], Dict[int, str]]):
+        self.interval_s = interval_s
+        self.targets = targets
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            self.sample()
+
+    def sample(self) -> None:
+        frames = sys._current_frames()
+        stacks = [fold_stack(frames[ident], root) for ident, root in self.targets().items() if ident in frames]
+        with self._lock:
+            self.stacks.update(stacks)
+            self.samples += 1
+
+
+# ============== Request profiles ==============
+
+def save_profile(profile_id: str, stacks: Counter) -> None:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    with open(os.path.join(PROFILE_DIR, f"{profile_id}.folded"), "w", encoding="utf-8") as f:
+        f.write(render_folded(stacks))
+
+
+def load_profile(profile_id: str) -> Optional[str]:
+    if not _PROFILE_ID_RE.fullmatch(profile_id):
+        return None
+    path = os.path.join(PROFILE_DIR, f"{profile_id}.folded")
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+class ProfilingMiddleware:
+    """
+    Profile requests sent with ?profile=1 or "X-Profile: 1" and a valid X-Profile-Token.
+
+    The profile is saved to PROFILE_DIR; its id is returned in the X-Profile-Id
+    header and it can be fetched from /api/debug/profiles/{id}. Worker threads
+    are shared, so concurrent requests show up in the same profile.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        if headers.get(PROFILE_HEADER) != b"1" and query.get("profile") != ["1"]:
+            await self.app(scope, receive, send)
+            return
+
+        if not is_admin_token(headers.get(TOKEN_HEADER, b"").decode("latin-1")):
+            await JSONResponse({"detail": "Admin token required for profiling"}, status_code=403)(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+        loop_thread = threading.get_ident()
+        sampler = StackSampler(
+            PROFILE_INTERVAL_MS / 1000,
+            lambda: {loop_thread: EVENT_LOOP_ROOT, **worker_threads()}
+        )
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            stacks = await asyncio.to_thread(sampler.stop)
+            await asyncio.to_thread(save_profile, profile_id, stacks)
+
+
+# ============== Background sampler ==============
+
+class BackgroundSampler(StackSampler):
+    """Keep folded stacks for the last PROFILE_BACKGROUND_WINDOWS windows of PROFILE_BACKGROUND_WINDOW_S"""
+
+    def __init__(self, loop_thread: int):
+        super().__init__(
+            PROFILE_BACKGROUND_INTERVAL_MS / 1000,
+            lambda: {loop_thread: EVENT_LOOP_ROOT, **worker_threads()}
+        )
+        self.window_started = time.time()
+        self.windows: deque = deque(maxlen=PROFILE_BACKGROUND_WINDOWS - 1)
+
+    def sample(self) -> None:
+        if time.time() - self.window_started >= PROFILE_BACKGROUND_WINDOW_S:
+            with self._lock:
+                self.windows.append((self.window_started, self.stacks, self.samples))
+                self.stacks, self.samples = Counter(), 0
+                self.window_started = time.time()
+        super().sample()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            windows = list(self.windows) + [(self.window_started, Counter(self.stacks), self.samples)]
+        stacks = Counter()
+        for _, window_stacks, _ in windows:
+            stacks.update(window_stacks)
+        return {
+            "since": windows[0][0],
+            "samples": sum(samples for _, _, samples in windows),
+            "folded": render_folded(stacks),
+        }
+
+
+_background: Optional[BackgroundSampler] = None
+
+
+def start_background_sampler() -> bool:
+    """Start the background sampler if enabled (call from the event loop thread)"""
+    global _background
+    if not PROFILE_BACKGROUND_ENABLED or _background is not None:
+        return False
+    _background = BackgroundSampler(threading.get_ident())
+    _background.start()
+    return True
+
+
+def stop_background_sampler() -> None:
+    global _background
+    if _background is not None:
+        _background.stop()
+        _background = None
+
+
+def background_profile() -> Optional[dict]:
+    return _background.snapshot() if _background else None
@@ -0,0 +1,84 @@
+"""
+Fast JSON responses and response compression
+"""
+
+import json
+
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipMiddleware
+
+try:
+    import orjson
+except ImportError:  # optional, the standard library encoder is used instead
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional, gzip only
+    brotli = None
+
+# Fast enough to compress on the fly, most of the size benefit of higher levels
+BROTLI_QUALITY = 4
+GZIP_LEVEL = 5
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson when it is installed"""
+
+    def render(self, content) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content)
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class CompressionMiddleware:
+    """Brotli (when installed and accepted) or gzip for responses of at least `minimum_size` bytes"""
+
+    def __init__(self, app, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size, compresslevel=GZIP_LEVEL)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and brotli is not None \
+                and "br" in Headers(scope=scope).get("accept-encoding", ""):
+            await _BrotliResponder(self.app, self.minimum_size)(scope, receive, send)
+            return
+        await self.gzip(scope, receive, send)
+
+
+class _BrotliResponder:
+    def __init__(self, app, minimum_size: int):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.send = None
+        self.start_message = None
+
+    async def __call__(self, scope, receive, send):
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body" or self.start_message is None:
+            await self.send(message)
+            return
+
+        start, self.start_message = self.start_message, None
+        headers = MutableHeaders(raw=start["headers"])
+        body = message.get("body", b"")
+        # Streamed, small or already encoded responses are passed through unchanged
+        if message.get("more_body") or len(body) < self.minimum_size or "content-encoding" in headers:
+            await self.send(start)
+            await self.send(message)
+            return
+
+        compressed = brotli.compress(body, quality=BROTLI_QUALITY)
+        headers["Content-Encoding"] = "br"
+        headers["Content-Length"] = str(len(compressed))
+        headers.add_vary_header("Accept-Encoding")
+        await self.send(start)
+        await self.send({"type": "http.response.body", "body": compressed})
@@ -0,0 +1,84 @@
+"""
+Revision counters for cheap conditional GETs.
+
+Writes bump the counters of what they changed ("chats", "categories",
+"documents", "grammar_rules" and "chat:<id>") in the same transaction. Read
+endpoints derive ETag/Last-Modified from the counters alone, so an unchanged
+resource is answered with 304 before its rows are queried.
+"""
+
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request, Response
+
+from core.database import get_db
+
+
+def chat_key(chat_id: str) -> str:
+    return f"chat:{chat_id}"
+
+
+def bump_revisions(conn, *keys: str) -> None:
+    """Bump revision counters inside the caller's transaction (commit is up to the caller)"""
+    now = time.time()
+    conn.executemany(
+        """INSERT INTO revisions (key, revision, updated_at) VALUES (?, 1, ?)
+           ON CONFLICT(key) DO UPDATE SET revision = revision + 1, updated_at = excluded.updated_at""",
+        [(key, now) for key in keys]
+    )
+
+
+def get_revisions(*keys: str) -> Dict[str, Tuple[int, float]]:
+    """key -> (revision, updated_at); keys never written are missing"""
+    conn = get_db()
+    rows = conn.execute(
+        f"SELECT key, revision, updated_at FROM revisions WHERE key IN ({','.join('?' * len(keys))})",
+        keys
+    ).fetchall()
+    conn.close()
+    return {row["key"]: (row["revision"], row["updated_at"]) for row in rows}
+
+
+def _not_modified_since(request: Request, updated_at: float) -> bool:
+    header = request.headers.get("if-modified-since")
+    if not header:
+        return False
+    try:
+        since = parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return False
+    return int(updated_at) <= since
+
+
+def check_not_modified(request: Request, response: Response, *keys: str) -> Optional[Response]:
+    """
+    Set ETag/Last-Modified for the resource described by `keys`.
+
+    Returns a 304 response when the client's copy is current (the endpoint
+    should return it as is), otherwise None and the endpoint builds the body.
+    """
+    revisions = get_revisions(*keys)
+    # The timestamps keep ETags from repeating when a database is recreated
+    etag = 'W/"' + "-".join(
+        "{}.{}".format(*(
+            (revisions[key][0], int(revisions[key][1] * 1000)) if key in revisions else (0, 0)
+        ))
+        for key in keys
+    ) + '"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    updated_at = max((updated for _, updated in revisions.values()), default=None)
+    if updated_at is not None:
+        headers["Last-Modified"] = formatdate(updated_at, usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        matched = if_none_match.strip() == "*" or etag in (tag.strip() for tag in if_none_match.split(","))
+    else:
+        matched = updated_at is not None and _not_modified_since(request, updated_at)
+    if matched:
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,190 @@
+"""
+Runtime configuration shared by all worker processes.
+
+LLM and Whisper settings changed through /api/config are stored in the
+runtime_config table, one row per entry with a version counter. Code reads
+them through get_llm_config()/get_whisper_config() on every use: these
+return the in-memory objects. A background task started with the app
+re-checks the stored versions every CONFIG_REFRESH_S (reading SQLite off the
+event loop), so an update made by one worker reaches the others within that
+interval. Callbacks registered with on_config_change() run when an entry
+changes, to rebuild whatever was built from the old settings.
+
+Secret fields (the LLM API key) are kept out of the table: they go to
+CONFIG_SECRETS_PATH, a JSON file only the owner can read, and are merged back
+in when an entry is loaded.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from core.config import LLMConfig, WhisperConfig, CONFIG_REFRESH_S, CONFIG_SECRETS_PATH
+from core.database import get_db
+from core.events import record_event, notify_events
+
+_MODELS = {"llm": LLMConfig, "whisper": WhisperConfig}
+_SECRET_FIELDS = {"llm": {"api_key"}, "whisper": set()}
+
+# Environment defaults until an entry has been stored
+_values: Dict[str, BaseModel] = {name: model() for name, model in _MODELS.items()}
+_versions: Dict[str, int] = {name: 0 for name in _MODELS}
+_listeners: Dict[str, List[Callable]] = {name: [] for name in _MODELS}
+_lock = threading.Lock()
+_refresher: Optional[asyncio.Task] = None
+
+
+def on_config_change(name: str, callback: Callable) -> None:
+    """Call `callback(old, new)` whenever the entry changes, in this process or another"""
+    _listeners[name].append(callback)
+
+
+def _apply(name: str, value: BaseModel, version: int) -> None:
+    with _lock:
+        if version < _versions[name]:
+            return
+        old = _values[name]
+        _values[name] = value
+        _versions[name] = version
+    if old != value:
+        for callback in _listeners[name]:
+            callback(old, value)
+
+
+def _read_secrets() -> dict:
+    try:
+        with open(CONFIG_SECRETS_PATH) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _write_secrets(name: str, values: dict) -> None:
+    secrets = _read_secrets()
+    secrets[name] = values
+    # Created readable by the owner only, and swapped in whole so readers never see half a file
+    temp_path = f"{CONFIG_SECRETS_PATH}.{os.getpid()}.tmp"
+    with os.fdopen(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as f:
+        json.dump(secrets, f)
+    os.replace(temp_path, CONFIG_SECRETS_PATH)
+
+
+def _parse(name: str, stored: str, secrets: dict) -> BaseModel:
+    return _MODELS[name].model_validate({**json.loads(stored), **secrets.get(name, {})})
+
+
+def _move_stored_secrets() -> None:
+    """Move secrets that older versions stored in runtime_config to the secrets file"""
+    conn = get_db()
+    try:
+        rows = conn.execute("SELECT name, value FROM runtime_config").fetchall()
+    except sqlite3.OperationalError:
+        rows = []
+    for row in rows:
+        data = json.loads(row["value"])
+        found = {field: data.pop(field) for field in _SECRET_FIELDS.get(row["name"], ()) if field in data}
+        if not found:
+            continue
+        if row["name"] not in _read_secrets():
+            _write_secrets(row["name"], found)
+        conn.execute("UPDATE runtime_config SET value = ? WHERE name = ?", (json.dumps(data), row["name"]))
+    conn.commit()
+    conn.close()
+
+
+def _load_changes() -> List[tuple]:
+    """(name, value, version) of the entries whose stored version differs from ours (blocking)"""
+    conn = get_db()
+    try:
+        rows = conn.execute("SELECT name, value, version FROM runtime_config").fetchall()
+    except sqlite3.OperationalError:
+        # Read before init_db created the table
+        rows = []
+    finally:
+        conn.close()
+    changed = [row for row in rows if row["name"] in _MODELS and row["version"] != _versions[row["name"]]]
+    secrets = _read_secrets() if changed else {}
+    return [(row["name"], _parse(row["name"], row["value"], secrets), row["version"]) for row in changed]
+
+
+def refresh_config() -> None:
+    """Apply the stored entries now (blocking; used at startup, before serving)"""
+    for name, value, version in _load_changes():
+        _apply(name, value, version)
+
+
+async def _refresh_loop() -> None:
+    while True:
+        await asyncio.sleep(CONFIG_REFRESH_S)
+        try:
+            changes = await asyncio.to_thread(_load_changes)
+        except sqlite3.Error as e:
+            print(f"Could not reload the runtime configuration: {e}")
+            continue
+        # Applied on the event loop, where the change callbacks expect to run
+        for name, value, version in changes:
+            _apply(name, value, version)
+
+
+def start_config_refresher() -> None:
+    global _refresher
+    if _refresher is None:
+        _move_stored_secrets()
+        refresh_config()
+        _refresher = asyncio.create_task(_refresh_loop())
+
+
+def stop_config_refresher() -> None:
+    global _refresher
+    if _refresher is not None:
+        _refresher.cancel()
+        _refresher = None
+
+
+def get_llm_config() -> LLMConfig:
+    return _values["llm"]
+
+
+def get_whisper_config() -> WhisperConfig:
+    return _values["whisper"]
+
+
+def config_versions() -> Dict[str, int]:
+    return dict(_versions)
+
+
+def _store(name: str, value: BaseModel) -> None:
+    secret_fields = _SECRET_FIELDS[name]
+    if secret_fields:
+        # Written first, so a process that sees the new version also finds its secrets
+        _write_secrets(name, value.model_dump(include=secret_fields))
+    conn = get_db()
+    conn.execute(
+        """INSERT INTO runtime_config (name, value, version, updated_at) VALUES (?, ?, 1, ?)
+           ON CONFLICT(name) DO UPDATE SET value = excluded.value, version = version + 1,
+           updated_at = excluded.updated_at""",
+        (name, value.model_dump_json(exclude=secret_fields), time.time())
+    )
+    version = conn.execute("SELECT version FROM runtime_config WHERE name = ?", (name,)).fetchone()["version"]
+    # Tells open clients to reload their settings; never carries the values (API keys)
+    record_event(conn, "config.updated", {"name": name, "version": version})
+    conn.commit()
+    conn.close()
+    notify_events()
+    _apply(name, value, version)
+
+
+def update_llm_config(config: LLMConfig) -> None:
+    """Persist the LLM settings for all workers"""
+    _store("llm", config)
+
+
+def update_whisper_config(config: WhisperConfig) -> None:
+    """Persist the Whisper settings for all workers"""
+    _store("whisper", config)
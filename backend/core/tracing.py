@@ -0,0 +1,223 @@
+"""
+Lightweight request tracing.
+
+A trace is started per HTTP request and carried through contextvars, so any
+code running for that request (including awaited services and threadpool
+work) can record spans with `span("name")`. Outside a trace, spans are no-ops.
+"""
+
+import asyncio
+import json
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional
+
+from core.config import TRACE_STORE_ENABLED, TRACE_DB_PATH, TRACE_RETENTION_HOURS
+
+MAX_SPANS_PER_TRACE = 1000
+RECENT_TRACES = 200
+TRACE_HEADER = "x-trace-id"
+# Monitoring and trace viewing requests would only push real traces out of memory
+UNTRACED_PREFIXES = ("/metrics", "/health", "/ready", "/api/debug")
+
+_TRACE_ID_RE = re.compile(r"[A-Za-z0-9_-]{8,64}")
+
+
+class Trace:
+    def __init__(self, name: str):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self.spans: List[dict] = []
+        self.attributes: dict = {}
+
+    def offset_ms(self) -> float:
+        return (time.perf_counter() - self._start) * 1000
+
+    def finish(self) -> None:
+        self.duration_ms = self.offset_ms()
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+            "spans": self.spans,
+        }
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[int]] = ContextVar("current_span", default=None)
+
+
+def current_trace_id() -> Optional[str]:
+    trace = _current_trace.get()
+    return trace.id if trace else None
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Record the duration of the block as a span of the active trace"""
+    trace = _current_trace.get()
+    if trace is None or len(trace.spans) >= MAX_SPANS_PER_TRACE:
+        yield
+        return
+
+    record = {
+        "id": len(trace.spans),
+        "parent": _current_span.get(),
+        "name": name,
+        "start_ms": trace.offset_ms(),
+        "duration_ms": None,
+        "attributes": attributes,
+        "error": None,
+    }
+    trace.spans.append(record)
+    token = _current_span.set(record["id"])
+    try:
+        yield record
+    except BaseException as e:
+        record["error"] = type(e).__name__
+        raise
+    finally:
+        _current_span.reset(token)
+        record["duration_ms"] = trace.offset_ms() - record["start_ms"]
+
+
+def add_span(name: str, duration_ms: float, **attributes) -> None:
+    """Record an already measured operation that ended just now (cheap, for hot paths)"""
+    trace = _current_trace.get()
+    if trace is None or len(trace.spans) >= MAX_SPANS_PER_TRACE:
+        return
+    end = trace.offset_ms()
+    trace.spans.append({
+        "id": len(trace.spans),
+        "parent": _current_span.get(),
+        "name": name,
+        "start_ms": end - duration_ms,
+        "duration_ms": duration_ms,
+        "attributes": attributes,
+        "error": None,
+    })
+
+
+# ============== Trace store ==============
+
+_recent: "OrderedDict[str, dict]" = OrderedDict()
+_recent_lock = threading.Lock()
+_writes_since_prune = 0
+
+
+def _store_connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(TRACE_DB_PATH)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS traces (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            started_at REAL NOT NULL,
+            duration_ms REAL,
+            data TEXT NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_traces_started_at ON traces(started_at)")
+    return conn
+
+
+def remember_trace(trace: Trace) -> None:
+    """Keep a finished trace in the in-memory ring of recent traces"""
+    with _recent_lock:
+        _recent[trace.id] = trace.to_dict()
+        while len(_recent) > RECENT_TRACES:
+            _recent.popitem(last=False)
+
+
+def store_trace(trace: Trace) -> None:
+    """Persist a finished trace in the SQLite trace store, pruning old ones now and then"""
+    global _writes_since_prune
+    data = trace.to_dict()
+    conn = _store_connect()
+    conn.execute(
+        "INSERT INTO traces (id, name, started_at, duration_ms, data) VALUES (?, ?, ?, ?, ?)",
+        (trace.id, trace.name, trace.started_at, trace.duration_ms, json.dumps(data))
+    )
+    _writes_since_prune += 1
+    if _writes_since_prune >= 100:
+        _writes_since_prune = 0
+        cutoff = time.time() - TRACE_RETENTION_HOURS * 3600
+        conn.execute("DELETE FROM traces WHERE started_at < ?", (cutoff,))
+    conn.commit()
+    conn.close()
+
+
+def get_trace(trace_id: str) -> Optional[dict]:
+    """Look up a trace in memory, then in the trace store"""
+    with _recent_lock:
+        data = _recent.get(trace_id)
+    if data or not TRACE_STORE_ENABLED:
+        return data
+
+    conn = _store_connect()
+    row = conn.execute("SELECT data FROM traces WHERE id = ?", (trace_id,)).fetchone()
+    conn.close()
+    return json.loads(row[0]) if row else None
+
+
+def list_traces(limit: int = 50) -> List[dict]:
+    """Most recent traces (summary only)"""
+    with _recent_lock:
+        recent = list(_recent.values())[-limit:]
+    return [
+        {"id": t["id"], "name": t["name"], "started_at": t["started_at"],
+         "duration_ms": t["duration_ms"], "spans": len(t["spans"])}
+        for t in reversed(recent)
+    ]
+
+
+# ============== ASGI middleware ==============
+
+class TracingMiddleware:
+    """Start a trace per HTTP request and return its id in the X-Trace-Id header"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(UNTRACED_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        # The id is always ours (a client could otherwise overwrite another request's stored
+        # trace); an id sent by the client is only kept for correlation
+        trace = Trace(f"{scope['method']} {scope['path']}")
+        incoming = dict(scope.get("headers") or []).get(TRACE_HEADER.encode(), b"").decode("latin-1")
+        if _TRACE_ID_RE.fullmatch(incoming):
+            trace.attributes["client_trace_id"] = incoming
+        token = _current_trace.set(trace)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-trace-id", trace.id.encode())]
+                trace.attributes["status"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_trace.reset(token)
+            trace.finish()
+            route = scope.get("route")
+            if route is not None:
+                trace.attributes["route"] = route.path
+            remember_trace(trace)
+            if TRACE_STORE_ENABLED:
+                await asyncio.to_thread(store_trace, trace)
@@ -0,0 +1,25 @@
+"""
+Thread pools for blocking work (Whisper decoding, document extraction and indexing)
+"""
+
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from core.config import WHISPER_WORKERS, EXTRACTION_WORKERS
+
+# Thread names are what the background profiler uses to tell the pools apart
+WHISPER_THREAD_PREFIX = "whisper"
+EXTRACTION_THREAD_PREFIX = "ocr"
+
+whisper_pool = ThreadPoolExecutor(max_workers=WHISPER_WORKERS, thread_name_prefix=WHISPER_THREAD_PREFIX)
+extraction_pool = ThreadPoolExecutor(max_workers=EXTRACTION_WORKERS, thread_name_prefix=EXTRACTION_THREAD_PREFIX)
+
+
+async def run_in_pool(pool: ThreadPoolExecutor, fn, *args, **kwargs):
+    """Run a blocking function in a pool without blocking the event loop (keeps the trace context)"""
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, fn, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(pool, call)
+
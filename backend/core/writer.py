@@ -0,0 +1,114 @@
+"""
+Group commit for SQLite writes on the chat path.
+
+run_write(fn, *args) queues `fn(conn, *args)` for a single writer thread that
+owns its own connection. The writer takes everything queued while it was busy
+(up to WRITE_BATCH_MAX jobs) and runs it in one transaction: each job gets a
+savepoint, so a failing job only undoes its own changes, and the batch is
+committed once. Under load many chats share a commit, the event loop never
+waits on SQLite locks or commits, and no connection is held while a request
+awaits the LLM.
+
+Jobs must not commit or close the connection. Events recorded by a job are
+visible once run_write returns; the caller then calls notify_events().
+With several worker processes each has its own writer; SQLite's file lock
+serializes their batches.
+"""
+
+import asyncio
+import contextvars
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Optional, TypeVar
+
+from core.config import WRITE_BATCH_MAX
+from core.database import get_db
+from core.metrics import DB_WRITE_BATCH_SIZE, DB_WRITE_WAIT_SECONDS
+
+T = TypeVar("T")
+
+_jobs: "queue.SimpleQueue[tuple]" = queue.SimpleQueue()
+_thread: Optional[threading.Thread] = None
+_thread_lock = threading.Lock()
+_stats = {"batches": 0, "writes": 0, "failed": 0, "largest_batch": 0}
+
+
+def _run_batch(conn, batch: list) -> None:
+    conn.execute("BEGIN IMMEDIATE")
+    outcomes = []
+    for future, ctx, fn, args, queued_at in batch:
+        if not future.set_running_or_notify_cancel():
+            # The caller was cancelled before its write started: skip it
+            continue
+        conn.execute("SAVEPOINT job")
+        try:
+            # In the submitter's context, so the statements show up in its request trace
+            result = ctx.run(fn, conn, *args)
+            conn.execute("RELEASE job")
+            outcomes.append((future, queued_at, result, None))
+        except Exception as e:
+            conn.execute("ROLLBACK TO job")
+            conn.execute("RELEASE job")
+            outcomes.append((future, queued_at, None, e))
+    conn.execute("COMMIT")
+
+    done = time.perf_counter()
+    for future, queued_at, result, error in outcomes:
+        DB_WRITE_WAIT_SECONDS.observe(done - queued_at)
+        if error is None:
+            future.set_result(result)
+        else:
+            _stats["failed"] += 1
+            future.set_exception(error)
+
+
+def _writer_loop() -> None:
+    conn = get_db()
+    # Transactions are managed here (BEGIN IMMEDIATE ... COMMIT)
+    conn.isolation_level = None
+    while True:
+        batch = [_jobs.get()]
+        while len(batch) < WRITE_BATCH_MAX:
+            try:
+                batch.append(_jobs.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            _run_batch(conn, batch)
+        except Exception as e:
+            # BEGIN or COMMIT failed (e.g. the database stayed locked): the whole batch failed
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for future, *_ in batch:
+                if not future.done():
+                    _stats["failed"] += 1
+                    future.set_exception(e)
+            continue
+        _stats["batches"] += 1
+        _stats["writes"] += len(batch)
+        _stats["largest_batch"] = max(_stats["largest_batch"], len(batch))
+        DB_WRITE_BATCH_SIZE.observe(len(batch))
+
+
+def _ensure_writer() -> None:
+    global _thread
+    if _thread is None:
+        with _thread_lock:
+            if _thread is None:
+                _thread = threading.Thread(target=_writer_loop, name="db-writer", daemon=True)
+                _thread.start()
+
+
+async def run_write(fn: Callable[..., T], *args) -> T:
+    """Run `fn(conn, *args)` in the writer's next transaction and return its result once committed"""
+    _ensure_writer()
+    future: Future = Future()
+    _jobs.put((future, contextvars.copy_context(), fn, args, time.perf_counter()))
+    # Cancelling the caller drops the write if the writer has not started it yet
+    return await asyncio.wrap_future(future)
+
+
+def writer_stats() -> dict:
+    return {**_stats, "queued": _jobs.qsize()}
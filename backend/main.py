@@ -5,30 +5,83 @@ A personal language learning assistant with LLM integration
 Run with: uvicorn main:app --reload
 """
 
+import asyncio
+import time
 from contextlib import asynccontextmanager
 from datetime import datetime
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 from core.database import init_db
+from core.metrics import MetricsMiddleware, render_prometheus
+from core.tracing import TracingMiddleware
+from core.config import PROFILING_ENABLED, COMPRESSION_MIN_BYTES, ensure_directories
+from core.responses import FastJSONResponse, CompressionMiddleware
+from core.profiling import ProfilingMiddleware, start_background_sampler, stop_background_sampler
+from core.events import start_event_watcher, stop_event_watcher
+from core.runtime_config import start_config_refresher, stop_config_refresher
+from services.document_service import reindex_documents
+from services.exercise_service import build_missing_exercise_banks
+from services.grammar_service import backfill_grammar_events
+from services.warmup_service import warm_up, warmup_status, record_startup_phase
+from services.readiness_service import start_prober, stop_prober, readiness
+from services.usage_service import start_usage_writer, stop_usage_writer
 from routers import all_routers
 
 
+async def _build_exercise_banks() -> None:
+    banks = await asyncio.to_thread(build_missing_exercise_banks)
+    if banks:
+        print(f"📝 Built exercise banks for {banks} documents")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan manager for startup/shutdown"""
     print("🚀 Starting Language Teacher API...")
+    ensure_directories()
+    start = time.perf_counter()
     init_db()
+    record_startup_phase("init_db", time.perf_counter() - start)
     print("✅ Database initialized")
+    start_config_refresher()
+    start = time.perf_counter()
+    reindexed = reindex_documents()
+    record_startup_phase("reindex_documents", time.perf_counter() - start)
+    if reindexed:
+        print(f"📚 Indexed words and sentences for {reindexed} documents")
+    start = time.perf_counter()
+    backfilled = backfill_grammar_events()
+    record_startup_phase("backfill_grammar_events", time.perf_counter() - start)
+    if backfilled:
+        print(f"📈 Recorded {backfilled} grammar events from existing messages")
+    if start_background_sampler():
+        print("🔬 Background profiler sampling")
+    # Warm up in the background: the app is live right away and reports ready when done
+    warmup_task = asyncio.create_task(warm_up())
+    # Missing exercise banks (e.g. after an upgrade) are built after startup, like after an upload
+    banks_task = asyncio.create_task(_build_exercise_banks())
+    start_prober()
+    start_event_watcher()
+    start_usage_writer()
     yield
     print("👋 Shutting down...")
+    stop_usage_writer()
+    stop_config_refresher()
+    stop_event_watcher()
+    stop_prober()
+    warmup_task.cancel()
+    banks_task.cancel()
+    stop_background_sampler()
 
 
 app = FastAPI(
     title="Language Teacher API",
     description="Personal language learning assistant with LLM and speech-to-text support",
     version="2.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # CORS middleware - allow all origins for local development
@@ -40,6 +93,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large responses (chat histories, document contents)
+app.add_middleware(CompressionMiddleware, minimum_size=COMPRESSION_MIN_BYTES)
+
+# Request latency/status metrics, exposed at /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Per-request traces, viewable at /api/debug/traces/{id}
+app.add_middleware(TracingMiddleware)
+
+# On-demand request profiles (?profile=1 plus admin token), only installed when enabled
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
 # Register all routers
 for router in all_routers:
     app.include_router(router)
@@ -48,14 +114,40 @@ for router in all_routers:
 # Health check endpoint
 @app.get("/health", tags=["health"])
 async def health_check():
-    """Health check endpoint"""
+    """
+    Health check endpoint.
+    
+    The process is live whenever this answers; `ready` turns true once the
+    startup warm-up (Whisper/Ollama preload, cache priming) has finished.
+    """
+    warmup = warmup_status()
     return {
         "status": "healthy",
+        "ready": warmup["ready"],
+        "warmup": warmup,
         "timestamp": datetime.now().isoformat(),
         "version": "2.0.0"
     }
 
 
+@app.get("/ready", tags=["health"])
+async def readiness_check():
+    """
+    Readiness for load balancers: 503 until warm-up has finished and while a dependency probe fails.
+    
+    Served from the background prober's cache (Ollama, hosted provider, Whisper,
+    SQLite writes, free disk), including each probe's last latency.
+    """
+    result = readiness()
+    return JSONResponse(result, status_code=200 if result["ready"] else 503)
+
+
+@app.get("/metrics", tags=["health"], response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics: request latency, LLM/Whisper/extraction timings, DB queries"""
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/", tags=["health"])
 async def root():
     """Root endpoint with API info"""
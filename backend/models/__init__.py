@@ -32,6 +32,14 @@ class ChatMessage(BaseModel):
     detect_grammar: bool = True
 
 
+class PrefetchRequest(BaseModel):
+    content: str  # the learner's current draft
+
+
+class ExerciseAnswer(BaseModel):
+    answer: str
+
+
 class AudioTranscribeRequest(BaseModel):
     language: Optional[str] = None  # None for auto-detect
 
@@ -56,6 +64,14 @@ class Chat(BaseModel):
     metadata: Optional[str] = None
 
 
+class ChatSummary(Chat):
+    """Chat row with the denormalized counters the sidebar shows"""
+    message_count: int = 0
+    last_message_preview: Optional[str] = None
+    last_message_role: Optional[str] = None
+    last_message_at: Optional[str] = None
+
+
 class Message(BaseModel):
     id: str
     chat_id: str
@@ -65,13 +81,21 @@ class Message(BaseModel):
     metadata: Optional[str] = None
 
 
+class ChatDetail(BaseModel):
+    chat: Chat
+    messages: List[Message]
+
+
 class Document(BaseModel):
     id: str
     filename: str
+    created_at: str
+    size: Optional[int] = None
+    word_count: Optional[int] = None
+    sentence_count: Optional[int] = None
     content: Optional[str] = None
     extracted_words: Optional[List[str]] = None
     extracted_sentences: Optional[List[str]] = None
-    created_at: str
 
 
 class GrammarRule(BaseModel):
@@ -4,6 +4,10 @@ from routers.categories_router import router as categories_router
 from routers.documents_router import router as documents_router
 from routers.grammar_router import router as grammar_router
 from routers.audio_router import router as audio_router
+from routers.search_router import router as search_router
+from routers.debug_router import router as debug_router
+from routers.events_router import router as events_router
+from routers.usage_router import router as usage_router
 
 all_routers = [
     config_router,
@@ -12,4 +16,8 @@ all_routers = [
     documents_router,
     grammar_router,
     audio_router,
+    search_router,
+    debug_router,
+    events_router,
+    usage_router,
 ]
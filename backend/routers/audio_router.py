@@ -2,7 +2,7 @@
 Speech/Audio API routes - handles audio transcription
 """
 
-from fastapi import APIRouter, UploadFile, File, HTTPException, Form
+from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Request
 from typing import Optional
 
 from models import TranscriptionResponse
@@ -12,12 +12,15 @@ from services.speech_service import (
     validate_audio_file
 )
 from services.chat_service import send_message
+from core.disconnect import cancel_on_disconnect
+from core.tracing import span
 
 router = APIRouter(prefix="/api/audio", tags=["audio"])
 
 
 @router.post("/transcribe", response_model=TranscriptionResponse)
 async def transcribe_audio_endpoint(
+    request: Request,
     audio: UploadFile = File(...),
     language: Optional[str] = Form(None),
     correct: bool = Form(False)
@@ -42,8 +45,10 @@ async def transcribe_audio_endpoint(
             detail=f"Invalid audio file. Supported formats: {', '.join(get_supported_audio_formats())}"
         )
     
-    # Transcribe (with optional LLM correction)
-    corrected_text, original_text, detected_lang, confidence = await transcribe_audio(audio, language, correct=correct)
+    # Transcribe (with optional LLM correction), stopping if the client goes away
+    corrected_text, original_text, detected_lang, confidence = await cancel_on_disconnect(
+        request, transcribe_audio(audio, language, correct=correct)
+    )
     
     return TranscriptionResponse(
         text=corrected_text,
@@ -56,6 +61,7 @@ async def transcribe_audio_endpoint(
 
 @router.post("/transcribe-and-send")
 async def transcribe_and_send_message(
+    request: Request,
     audio: UploadFile = File(...),
     chat_id: str = Form(...),
     language: Optional[str] = Form(None),
@@ -90,17 +96,18 @@ async def transcribe_and_send_message(
     # Get chat history for context-aware correction
     chat_history = []
     if correct:
-        conn = get_db()
-        messages = conn.execute(
-            "SELECT role, content FROM messages WHERE chat_id = ? ORDER BY created_at ASC",
-            (chat_id,)
-        ).fetchall()
-        conn.close()
+        with span("chat.history"):
+            conn = get_db()
+            messages = conn.execute(
+                "SELECT role, content FROM messages WHERE chat_id = ? ORDER BY created_at ASC, rowid ASC",
+                (chat_id,)
+            ).fetchall()
+            conn.close()
         chat_history = [{"role": m["role"], "content": m["content"]} for m in messages]
     
-    # Transcribe (with optional LLM correction using chat context)
-    corrected_text, original_text, detected_lang, confidence = await transcribe_audio(
-        audio, language, correct=correct, chat_history=chat_history
+    # Transcribe (with optional LLM correction using chat context); both steps stop if the client goes away
+    corrected_text, original_text, detected_lang, confidence = await cancel_on_disconnect(
+        request, transcribe_audio(audio, language, correct=correct, chat_history=chat_history)
     )
     
     if not corrected_text.strip():
@@ -110,11 +117,12 @@ async def transcribe_and_send_message(
         )
     
     # Send corrected text as message
-    chat_response = await send_message(
-        chat_id=chat_id,
-        content=corrected_text,
-        detect_grammar=detect_grammar
-    )
+    with span("chat.send_message"):
+        chat_response = await cancel_on_disconnect(request, send_message(
+            chat_id=chat_id,
+            content=corrected_text,
+            detect_grammar=detect_grammar
+        ))
     
     return {
         "transcription": {
@@ -3,18 +3,24 @@ Categories API routes
 """
 
 import uuid
-from fastapi import APIRouter
+from fastapi import APIRouter, Request, Response
 from typing import Optional
 
 from models import CategoryCreate
 from core.database import get_db, dict_from_row
+from core.revisions import bump_revisions, check_not_modified
+from core.events import record_event, notify_events
 
 router = APIRouter(prefix="/api/categories", tags=["categories"])
 
 
 @router.get("")
-async def list_categories(type: Optional[str] = None):
+async def list_categories(request: Request, response: Response, type: Optional[str] = None):
     """List all categories, optionally filtered by type"""
+    not_modified = check_not_modified(request, response, "categories")
+    if not_modified:
+        return not_modified
+    
     conn = get_db()
     
     if type:
@@ -41,12 +47,14 @@ async def create_category(category: CategoryCreate):
         "INSERT INTO categories (id, name, type) VALUES (?, ?, ?)",
         (cat_id, category.name, category.type)
     )
+    row = dict_from_row(conn.execute("SELECT * FROM categories WHERE id = ?", (cat_id,)).fetchone())
+    bump_revisions(conn, "categories")
+    record_event(conn, "category.created", row)
     conn.commit()
-    
-    row = conn.execute("SELECT * FROM categories WHERE id = ?", (cat_id,)).fetchone()
     conn.close()
+    notify_events()
     
-    return dict_from_row(row)
+    return row
 
 
 @router.delete("/{category_id}")
@@ -54,6 +62,9 @@ async def delete_category(category_id: str):
     """Delete a category"""
     conn = get_db()
     conn.execute("DELETE FROM categories WHERE id = ?", (category_id,))
+    bump_revisions(conn, "categories")
+    record_event(conn, "category.deleted", {"id": category_id})
     conn.commit()
     conn.close()
+    notify_events()
     return {"status": "deleted"}
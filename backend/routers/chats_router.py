@@ -2,24 +2,49 @@
 Chat API routes
 """
 
-from fastapi import APIRouter, HTTPException
-from typing import Optional
+from fastapi import APIRouter, HTTPException, Request, Response
+from typing import List, Optional
 
-from models import ChatCreate, ChatMessage
+from models import ChatCreate, ChatMessage, Chat, ChatDetail, ChatSummary, PrefetchRequest
+from core.revisions import check_not_modified, chat_key
+from core.disconnect import cancel_on_disconnect
 from services.chat_service import (
     create_chat,
     get_chat,
     get_all_chats,
     delete_chat,
-    send_message
+    send_message,
+    prefetch_reply
 )
 
 router = APIRouter(prefix="/api/chats", tags=["chats"])
 
 
-@router.get("")
-async def list_chats(mode: Optional[str] = None, category_id: Optional[str] = None):
+@router.get("", response_model=List[Chat])
+async def list_chats(
+    request: Request,
+    response: Response,
+    mode: Optional[str] = None,
+    category_id: Optional[str] = None
+):
     """List all chats, optionally filtered by mode or category"""
+    not_modified = check_not_modified(request, response, "chats")
+    if not_modified:
+        return not_modified
+    return get_all_chats(mode, category_id)
+
+
+@router.get("/summary", response_model=List[ChatSummary])
+async def list_chat_summaries(
+    request: Request,
+    response: Response,
+    mode: Optional[str] = None,
+    category_id: Optional[str] = None
+):
+    """List chats with message count, last message snippet and last activity (for the sidebar)"""
+    not_modified = check_not_modified(request, response, "chats")
+    if not_modified:
+        return not_modified
     return get_all_chats(mode, category_id)
 
 
@@ -34,9 +59,12 @@ async def create_new_chat(chat: ChatCreate):
     )
 
 
-@router.get("/{chat_id}")
-async def get_chat_detail(chat_id: str):
-    """Get a specific chat with all messages"""
+@router.get("/{chat_id}", response_model=ChatDetail)
+async def get_chat_detail(chat_id: str, request: Request, response: Response):
+    """Get a specific chat with all messages (304 if unchanged since the client's ETag)"""
+    not_modified = check_not_modified(request, response, chat_key(chat_id))
+    if not_modified:
+        return not_modified
     chat, messages = get_chat(chat_id)
     return {"chat": chat, "messages": messages}
 
@@ -49,10 +77,16 @@ async def delete_chat_endpoint(chat_id: str):
 
 
 @router.post("/{chat_id}/messages")
-async def send_chat_message(chat_id: str, message: ChatMessage):
-    """Send a message and get LLM response"""
-    return await send_message(
+async def send_chat_message(chat_id: str, message: ChatMessage, request: Request):
+    """Send a message and get LLM response (cancelled if the client disconnects)"""
+    return await cancel_on_disconnect(request, send_message(
         chat_id=chat_id,
         content=message.content,
         detect_grammar=message.detect_grammar
-    )
+    ))
+
+
+@router.post("/{chat_id}/prefetch")
+async def prefetch_chat_reply(chat_id: str, draft: PrefetchRequest):
+    """Generate the reply to the learner's draft in the background while they type (grammar/document chats)"""
+    return await prefetch_reply(chat_id, draft.content)
@@ -4,16 +4,19 @@ Configuration API routes
 
 from fastapi import APIRouter
 from core.config import (
-    llm_config, 
-    whisper_config, 
-    update_llm_config, 
-    update_whisper_config,
     LLMConfig,
     WhisperConfig,
     GEMINI_API_KEY,
     OPENAI_API_KEY,
     ANTHROPIC_API_KEY
 )
+from core.runtime_config import (
+    get_llm_config,
+    get_whisper_config,
+    update_llm_config,
+    update_whisper_config,
+    config_versions
+)
 
 router = APIRouter(prefix="/api/config", tags=["config"])
 
@@ -21,10 +24,13 @@ router = APIRouter(prefix="/api/config", tags=["config"])
 @router.get("")
 async def get_config():
     """Get current LLM and Whisper configuration"""
+    llm_config = get_llm_config()
+    whisper_config = get_whisper_config()
     return {
         "llm": {
             "provider": llm_config.provider,
             "model": llm_config.model,
+            "grammar_model": llm_config.grammar_model,
             "base_url": llm_config.base_url,
             "has_api_key": bool(llm_config.get_api_key()),
             "api_key_source": "env" if (
@@ -42,19 +48,21 @@ async def get_config():
             "gemini": bool(GEMINI_API_KEY),
             "openai": bool(OPENAI_API_KEY),
             "anthropic": bool(ANTHROPIC_API_KEY)
-        }
+        },
+        "versions": config_versions()
     }
 
 
 @router.post("")
 async def update_config(config: LLMConfig):
-    """Update LLM configuration"""
+    """Update LLM configuration (stored, and picked up by every worker within CONFIG_REFRESH_S)"""
     update_llm_config(config)
     return {
         "status": "ok", 
         "config": {
             "provider": config.provider,
             "model": config.model,
+            "grammar_model": config.grammar_model,
             "base_url": config.base_url,
             "has_api_key": bool(config.api_key)
         }
@@ -63,6 +71,6 @@ async def update_config(config: LLMConfig):
 
 @router.post("/whisper")
 async def update_whisper(config: WhisperConfig):
-    """Update Whisper configuration"""
+    """Update Whisper configuration (stored, and picked up by every worker within CONFIG_REFRESH_S)"""
     update_whisper_config(config)
     return {"status": "ok", "config": config.model_dump()}
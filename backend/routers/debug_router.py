@@ -0,0 +1,112 @@
+"""
+Debug API routes - request traces and profiles
+"""
+
+import html
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import HTMLResponse, PlainTextResponse
+
+from core.tracing import get_trace, list_traces
+from core.profiling import require_admin_token, load_profile, background_profile
+from services.prefetch_service import prefetch_stats
+
+router = APIRouter(prefix="/api/debug", tags=["debug"])
+
+
+@router.get("/traces", dependencies=[Depends(require_admin_token)])
+async def list_recent_traces(limit: int = 50):
+    """List the most recent request traces"""
+    return list_traces(limit)
+
+
+@router.get("/traces/{trace_id}", dependencies=[Depends(require_admin_token)])
+async def get_trace_detail(trace_id: str, format: str = "html"):
+    """
+    Show a request trace.
+    
+    Renders a waterfall of the recorded spans by default; `?format=json` returns the raw trace.
+    """
+    trace = get_trace(trace_id)
+    if not trace:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    if format == "json":
+        return trace
+    return HTMLResponse(render_waterfall(trace))
+
+
+@router.get("/prefetch", dependencies=[Depends(require_admin_token)])
+async def get_prefetch_stats():
+    """Outcomes of speculative replies in this process (hit rate, stale and expired speculations)"""
+    return prefetch_stats()
+
+
+@router.get("/profiles/background", dependencies=[Depends(require_admin_token)])
+async def get_background_profile():
+    """Folded stacks from the background sampler (event loop, Whisper and OCR pools)"""
+    profile = background_profile()
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Background sampler is not running")
+    return PlainTextResponse(profile["folded"], headers={
+        "X-Profile-Since": str(profile["since"]),
+        "X-Profile-Samples": str(profile["samples"]),
+    })
+
+
+@router.get("/profiles/{profile_id}", dependencies=[Depends(require_admin_token)])
+async def get_request_profile(profile_id: str):
+    """Folded stacks of a profiled request (load into flamegraph.pl or speedscope)"""
+    folded = load_profile(profile_id)
+    if folded is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(folded)
+
+
+def _depth(span: dict, spans: list) -> int:
+    depth = 0
+    parent = span["parent"]
+    while parent is not None:
+        depth += 1
+        parent = spans[parent]["parent"]
+    return depth
+
+
+def render_waterfall(trace: dict) -> str:
+    """Render a trace as an HTML waterfall"""
+    total = trace["duration_ms"] or max(
+        (s["start_ms"] + (s["duration_ms"] or 0) for s in trace["spans"]), default=1
+    ) or 1
+    rows = []
+    for s in sorted(trace["spans"], key=lambda s: s["start_ms"]):
+        duration = s["duration_ms"] or 0
+        left = s["start_ms"] / total * 100
+        width = max(duration / total * 100, 0.2)
+        attrs = ", ".join(f"{k}={v}" for k, v in s["attributes"].items())
+        color = "#e5534b" if s["error"] else "#4c8ed9"
+        rows.append(f"""
+        <tr>
+          <td style="padding-left:{_depth(s, trace['spans']) * 16 + 4}px" title="{html.escape(attrs)}">
+            {html.escape(s['name'])}{' ⚠ ' + html.escape(s['error']) if s['error'] else ''}
+          </td>
+          <td class="num">{s['start_ms']:.1f}</td>
+          <td class="num">{duration:.1f}</td>
+          <td class="bar"><div style="margin-left:{left:.2f}%;width:{width:.2f}%;background:{color}"></div></td>
+        </tr>""")
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Trace {html.escape(trace['id'])}</title>
+<style>
+  body {{ font-family: system-ui, sans-serif; margin: 2em; }}
+  table {{ border-collapse: collapse; width: 100%; font-size: 13px; }}
+  td, th {{ border-bottom: 1px solid #eee; padding: 3px 4px; text-align: left; white-space: nowrap; }}
+  td.num {{ text-align: right; font-variant-numeric: tabular-nums; width: 6em; }}
+  td.bar {{ width: 60%; }}
+  td.bar div {{ height: 12px; border-radius: 2px; }}
+</style></head>
+<body>
+<h2>{html.escape(trace['name'])}</h2>
+<p>Trace <code>{html.escape(trace['id'])}</code> · {total:.1f} ms · {len(trace['spans'])} spans ·
+{html.escape(', '.join(f'{k}={v}' for k, v in trace['attributes'].items()))}</p>
+<table>
+<tr><th>Span</th><th>Start (ms)</th><th>Duration (ms)</th><th></th></tr>
+{''.join(rows)}
+</table>
+</body></html>"""
@@ -2,34 +2,113 @@
 Documents API routes
 """
 
-from fastapi import APIRouter, UploadFile, File
+from fastapi import APIRouter, BackgroundTasks, UploadFile, File, Query, HTTPException, Request, Response
+from typing import List, Literal, Optional
+
+from models import Document, ExerciseAnswer
+from core.revisions import check_not_modified
 
 from services.document_service import (
     process_document,
     get_document,
     get_all_documents,
+    get_top_words,
+    get_document_sentences,
+    get_document_content,
     delete_document
 )
+from services.exercise_service import (
+    build_exercise_bank,
+    get_exercise_bank,
+    get_next_exercise,
+    grade_answer
+)
 
 router = APIRouter(prefix="/api/documents", tags=["documents"])
 
 
-@router.get("")
-async def list_documents():
+@router.get("", response_model=List[Document], response_model_exclude_unset=True)
+async def list_documents(request: Request, response: Response):
     """List all uploaded documents"""
+    not_modified = check_not_modified(request, response, "documents")
+    if not_modified:
+        return not_modified
     return get_all_documents()
 
 
 @router.post("/upload")
-async def upload_document(file: UploadFile = File(...)):
-    """Upload and process a document (PDF, image, or text)"""
-    return await process_document(file)
+async def upload_document(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
+    """Upload and process a document (PDF, image, or text); its exercise bank is built afterwards"""
+    document = await process_document(file)
+    background_tasks.add_task(build_exercise_bank, document["id"])
+    return document
+
+
+@router.get("/words/top")
+async def list_top_words(
+    limit: int = Query(50, ge=1, le=1000),
+    min_length: int = Query(3, ge=1),
+    exclude: List[str] = Query(default=[])
+):
+    """Most frequent words across all documents, with the number of documents containing them"""
+    return get_top_words(limit, min_length, exclude)
+
+
+@router.get("/{doc_id}", response_model=Document, response_model_exclude_unset=True)
+async def get_document_detail(doc_id: str, fields: Optional[str] = None):
+    """
+    Get document metadata.
+    
+    `fields` is a comma separated list of extra parts to include:
+    content, words, sentences (e.g. ?fields=words,sentences)
+    """
+    selected = [f.strip() for f in fields.split(",") if f.strip()] if fields else []
+    return get_document(doc_id, selected)
+
+
+@router.get("/{doc_id}/content")
+async def get_document_content_range(
+    doc_id: str,
+    offset: int = Query(0, ge=0),
+    length: Optional[int] = Query(None, ge=1)
+):
+    """Get the document text, or a character range of it"""
+    content = get_document_content(doc_id, offset, length)
+    if content is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return {"id": doc_id, "offset": offset, "content": content}
+
+
+@router.get("/{doc_id}/sentences")
+async def list_document_sentences(
+    doc_id: str,
+    start: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=1000)
+):
+    """Get a range of document sentences with their character offsets"""
+    return get_document_sentences(doc_id, start, limit)
+
+
+@router.get("/{doc_id}/exercises")
+async def get_document_exercise_bank(doc_id: str):
+    """Whether the exercise bank is built, and how many exercises of each kind it has"""
+    return get_exercise_bank(doc_id)
+
+
+@router.get("/{doc_id}/exercises/next")
+async def get_document_next_exercise(
+    doc_id: str,
+    kind: Literal["cloze", "vocab"] = "cloze",
+    after: int = Query(0, ge=0)
+):
+    """Next pre-generated exercise after the id `after` (without the answer); 404 when none are left"""
+    return get_next_exercise(doc_id, kind, after)
 
 
-@router.get("/{doc_id}")
-async def get_document_detail(doc_id: str):
-    """Get document details including extracted words and sentences"""
-    return get_document(doc_id)
+@router.post("/{doc_id}/exercises/{exercise_id}/answer")
+async def answer_document_exercise(doc_id: str, exercise_id: int, answer: ExerciseAnswer):
+    """Check an answer: cloze items directly, free-form vocab items by the LLM"""
+    return await grade_answer(doc_id, exercise_id, answer.answer)
 
 
 @router.delete("/{doc_id}")
@@ -0,0 +1,68 @@
+"""
+Events router - WebSocket push of change events so clients apply deltas instead of refetching
+"""
+
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+
+from core.config import EVENTS_PING_S
+from core.events import Subscriber, event_bounds, read_events
+
+router = APIRouter(prefix="/api/events", tags=["events"])
+
+
+async def _send_pending(websocket: WebSocket, cursor: int) -> int:
+    """Send every stored event after the cursor; returns the new cursor"""
+    while True:
+        events = read_events(cursor)
+        for event in events:
+            await websocket.send_json(event)
+        if not events:
+            return cursor
+        cursor = events[-1]["id"]
+
+
+@router.websocket("")
+async def events_socket(websocket: WebSocket, cursor: Optional[int] = None):
+    """
+    Stream change events as JSON: {id, type, chat_id, data, created_at}.
+
+    Connect with ?cursor=<last id seen> to receive what was missed. The first
+    frame is {"type": "hello", "cursor": ...}, or {"type": "reset", ...} when
+    the cursor is no longer covered by the stored events and the client
+    should refetch its state. Idle connections get {"type": "ping"} frames.
+    """
+    await websocket.accept()
+    with Subscriber() as subscriber:
+        oldest, latest = event_bounds()
+        if cursor is None:
+            cursor = latest
+            await websocket.send_json({"type": "hello", "cursor": cursor})
+        elif cursor > latest or (oldest and cursor < oldest - 1):
+            # Pruned past the cursor, or the database was recreated
+            cursor = latest
+            await websocket.send_json({"type": "reset", "cursor": cursor})
+        else:
+            await websocket.send_json({"type": "hello", "cursor": cursor})
+
+        # Incoming frames are ignored; receiving is how a disconnect is noticed
+        receiver = asyncio.create_task(websocket.receive_text())
+        try:
+            while True:
+                subscriber.wake.clear()
+                cursor = await _send_pending(websocket, cursor)
+                waiter = asyncio.create_task(subscriber.wake.wait())
+                done, _ = await asyncio.wait({receiver, waiter}, timeout=EVENTS_PING_S,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                waiter.cancel()
+                if receiver in done:
+                    receiver.result()
+                    receiver = asyncio.create_task(websocket.receive_text())
+                elif not done:
+                    await websocket.send_json({"type": "ping", "cursor": cursor})
+        except WebSocketDisconnect:
+            pass
+        finally:
+            receiver.cancel()
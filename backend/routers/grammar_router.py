@@ -3,17 +3,24 @@ Grammar rules API routes
 """
 
 import uuid
-from fastapi import APIRouter
-from typing import Optional
+from fastapi import APIRouter, Query, Request, Response
+from typing import Literal, Optional
 
 from core.database import get_db, dict_from_row
+from core.revisions import bump_revisions, check_not_modified, chat_key
+from core.events import record_event, notify_events
+from services.grammar_service import get_grammar_stats, get_rule_progress
 
 router = APIRouter(prefix="/api/grammar-rules", tags=["grammar"])
 
 
 @router.get("")
-async def list_grammar_rules():
+async def list_grammar_rules(request: Request, response: Response):
     """List all learned grammar rules"""
+    not_modified = check_not_modified(request, response, "grammar_rules")
+    if not_modified:
+        return not_modified
+    
     conn = get_db()
     rows = conn.execute(
         "SELECT * FROM grammar_rules ORDER BY created_at DESC"
@@ -22,6 +29,25 @@ async def list_grammar_rules():
     return [dict_from_row(r) for r in rows]
 
 
+@router.get("/stats")
+async def list_grammar_stats(
+    order: Literal["occurrences", "last_seen"] = "occurrences",
+    limit: int = Query(50, ge=1, le=500)
+):
+    """Per-rule mistake counts (total, this week, last week), last seen and trend"""
+    return get_grammar_stats(order, limit)
+
+
+@router.get("/stats/{rule_key}")
+async def get_grammar_rule_stats(
+    rule_key: str,
+    weeks: int = Query(12, ge=1, le=104),
+    limit: int = Query(20, ge=1, le=200)
+):
+    """Progress for one rule: totals, weekly counts and the most recent occurrences"""
+    return get_rule_progress(rule_key, weeks, limit)
+
+
 @router.post("")
 async def create_grammar_rule(
     rule_name: str,
@@ -43,6 +69,8 @@ async def create_grammar_rule(
             "INSERT INTO categories (id, name, type) VALUES (?, ?, 'grammar')",
             (cat_id, rule_name)
         )
+        category = conn.execute("SELECT * FROM categories WHERE id = ?", (cat_id,)).fetchone()
+        record_event(conn, "category.created", dict_from_row(category))
     else:
         cat_id = grammar_cat["id"]
     
@@ -59,9 +87,17 @@ async def create_grammar_rule(
         "INSERT INTO grammar_rules (id, name, description, chat_id) VALUES (?, ?, ?, ?)",
         (rule_id, rule_name, description, chat_id)
     )
+    bump_revisions(conn, "categories", "chats", chat_key(chat_id), "grammar_rules")
+    chat = conn.execute("SELECT * FROM chats WHERE id = ?", (chat_id,)).fetchone()
+    record_event(conn, "chat.created", dict_from_row(chat), chat_id)
+    record_event(conn, "grammar_rule.created", {
+        "id": rule_id, "name": rule_name, "description": description,
+        "chat_id": chat_id, "category_id": cat_id,
+    }, chat_id)
     
     conn.commit()
     conn.close()
+    notify_events()
     
     return {"rule_id": rule_id, "chat_id": chat_id, "category_id": cat_id}
 
@@ -71,6 +107,9 @@ async def delete_grammar_rule(rule_id: str):
     """Delete a grammar rule"""
     conn = get_db()
     conn.execute("DELETE FROM grammar_rules WHERE id = ?", (rule_id,))
+    bump_revisions(conn, "grammar_rules")
+    record_event(conn, "grammar_rule.deleted", {"id": rule_id})
     conn.commit()
     conn.close()
+    notify_events()
     return {"status": "deleted"}
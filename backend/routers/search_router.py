@@ -0,0 +1,27 @@
+"""
+Search API routes
+"""
+
+from fastapi import APIRouter, Query
+from typing import Optional
+
+from services.search_service import search
+
+router = APIRouter(prefix="/api/search", tags=["search"])
+
+
+@router.get("")
+async def search_endpoint(
+    q: str = Query(..., min_length=1),
+    scope: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0)
+):
+    """
+    Full-text search across chats, messages, documents and grammar rules.
+    
+    `scope` is a comma separated subset of: chats, messages, documents, grammar.
+    Snippets mark matches with <mark>…</mark>.
+    """
+    scopes = [s.strip() for s in scope.split(",") if s.strip()] if scope else None
+    return search(q, scopes, limit, offset)
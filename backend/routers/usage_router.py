@@ -0,0 +1,20 @@
+"""
+LLM usage API routes
+"""
+
+from fastapi import APIRouter, Query
+from typing import Literal, Optional
+
+from services.usage_service import get_usage
+
+router = APIRouter(prefix="/api/usage", tags=["usage"])
+
+
+@router.get("")
+async def usage_summary(
+    group_by: Literal["chat", "mode", "provider", "model", "kind", "day"] = "day",
+    days: int = Query(30, ge=1, le=3650),
+    chat_id: Optional[str] = None
+):
+    """LLM calls, tokens, average latency / time to first token and estimated cost per group"""
+    return await get_usage(group_by, days, chat_id)
@@ -1,19 +1,39 @@
-from services.llm_service import call_llm, get_system_prompt
-from services.speech_service import (
-    transcribe_audio, 
-    get_supported_audio_formats, 
-    validate_audio_file
-)
-from services.document_service import (
-    process_document,
-    get_document,
-    get_all_documents,
-    delete_document
-)
-from services.chat_service import (
-    create_chat,
-    get_chat,
-    get_all_chats,
-    delete_chat,
-    send_message
-)
+"""
+Service layer.
+
+Names are resolved on first access, so `import services` (or importing one
+service module) does not import every other service and its dependencies.
+"""
+
+import importlib
+
+_EXPORTS = {
+    "call_llm": "services.llm_service",
+    "get_system_prompt": "services.llm_service",
+    "transcribe_audio": "services.speech_service",
+    "get_supported_audio_formats": "services.speech_service",
+    "validate_audio_file": "services.speech_service",
+    "process_document": "services.document_service",
+    "get_document": "services.document_service",
+    "get_all_documents": "services.document_service",
+    "delete_document": "services.document_service",
+    "create_chat": "services.chat_service",
+    "get_chat": "services.chat_service",
+    "get_all_chats": "services.chat_service",
+    "delete_chat": "services.chat_service",
+    "send_message": "services.chat_service",
+    "prefetch_reply": "services.chat_service",
+    "get_next_exercise": "services.exercise_service",
+    "grade_answer": "services.exercise_service",
+    "get_grammar_stats": "services.grammar_service",
+    "get_rule_progress": "services.grammar_service",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module 'services' has no attribute {name!r}")
+    return getattr(importlib.import_module(module), name)
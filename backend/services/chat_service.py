@@ -2,13 +2,147 @@
 Chat service - handles chat and message operations
 """
 
+import asyncio
 import json
 import uuid
 import re
+from datetime import datetime, timezone
 from typing import List, Optional, Tuple
 
-from core.database import get_db, dict_from_row
+from core.config import PREFETCH_ENABLED, PREFETCH_MODES, KEEP_UNANSWERED_MESSAGES
+from core.database import get_db, dict_from_row, message_preview
+from core.runtime_config import config_versions
+from core.tracing import span
+from core.revisions import bump_revisions, chat_key
+from core.events import record_event, notify_events
+from core.writer import run_write
 from services.llm_service import call_llm
+from services.document_service import get_document_content
+from services.grammar_service import record_grammar_event, analyze_grammar, grammar_detector
+from services.prefetch_service import start_prefetch, take_prefetched, discard_prefetch
+
+
+_GRAMMAR_TAG_RE = re.compile(r'\[GRAMMAR_DETECTED:\s*([^|]+)\s*\|\s*([^\]]+)\]')
+_GRAMMAR_TAG_STRIP_RE = re.compile(r'\[GRAMMAR_DETECTED:[^\]]+\]')
+
+_SUMMARY_COLUMNS = "id, updated_at, message_count, last_message_preview, last_message_role, last_message_at"
+
+# Reply writes still running after their request was cancelled
+_reply_writes = set()
+
+
+def extract_grammar_detection(response: str) -> Tuple[str, Optional[dict]]:
+    """Split a [GRAMMAR_DETECTED: rule | explanation] tag off an LLM reply"""
+    if "[GRAMMAR_DETECTED:" not in response:
+        return response, None
+    match = _GRAMMAR_TAG_RE.search(response)
+    if not match:
+        return response, None
+    grammar_detected = {
+        "rule_name": match.group(1).strip(),
+        "explanation": match.group(2).strip()
+    }
+    return _GRAMMAR_TAG_STRIP_RE.sub('', response).strip(), grammar_detected
+
+
+def _count_message(conn, message: dict, touch: bool = False) -> dict:
+    """Update the chat's denormalized sidebar summary for a new message; returns the summary"""
+    conn.execute(
+        f"""UPDATE chats SET message_count = message_count + 1, last_message_role = ?,
+            last_message_preview = ?, last_message_at = ?{", updated_at = CURRENT_TIMESTAMP" if touch else ""}
+            WHERE id = ?""",
+        (message["role"], message_preview(message["content"]), message["created_at"], message["chat_id"])
+    )
+    row = conn.execute(f"SELECT {_SUMMARY_COLUMNS} FROM chats WHERE id = ?", (message["chat_id"],)).fetchone()
+    return dict_from_row(row)
+
+
+def _new_message(chat_id: str, role: str, content: str, metadata: Optional[str] = None) -> dict:
+    """A message row as SELECT * returns it, built before it is written"""
+    return {
+        "id": str(uuid.uuid4()),
+        "chat_id": chat_id,
+        "role": role,
+        "content": content,
+        # The format SQLite's CURRENT_TIMESTAMP default writes
+        "created_at": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+        "metadata": metadata,
+    }
+
+
+def _insert_message(conn, message: dict) -> None:
+    conn.execute(
+        "INSERT INTO messages (id, chat_id, role, content, created_at, metadata) VALUES (?, ?, ?, ?, ?, ?)",
+        (message["id"], message["chat_id"], message["role"], message["content"],
+         message["created_at"], message["metadata"])
+    )
+
+
+def _append_user_message(conn, message: dict) -> None:
+    """Writer job: store the learner's message"""
+    _insert_message(conn, message)
+    summary = _count_message(conn, message)
+    bump_revisions(conn, "chats", chat_key(message["chat_id"]))
+    record_event(conn, "message.appended", message, message["chat_id"])
+    record_event(conn, "chat.updated", summary, message["chat_id"])
+
+
+def _append_reply(conn, message: dict) -> None:
+    """Writer job: store the reply, its grammar event and the chat's new timestamp and summary"""
+    _insert_message(conn, message)
+    if message["grammar_detected"]:
+        record_grammar_event(conn, message["id"], message["chat_id"], message["grammar_detected"],
+                             message["created_at"])
+    summary = _count_message(conn, message, touch=True)
+    bump_revisions(conn, "chats", chat_key(message["chat_id"]))
+    record_event(conn, "message.appended", message, message["chat_id"])
+    record_event(conn, "chat.updated", summary, message["chat_id"])
+
+
+def _retract_message(conn, message: dict) -> bool:
+    """Writer job: delete a message again and point the chat's summary back at the one before it"""
+    if not conn.execute("DELETE FROM messages WHERE id = ?", (message["id"],)).rowcount:
+        return False
+    chat_id = message["chat_id"]
+    last = conn.execute(
+        "SELECT role, content, created_at FROM messages WHERE chat_id = ? ORDER BY created_at DESC, rowid DESC LIMIT 1",
+        (chat_id,)
+    ).fetchone()
+    conn.execute(
+        """UPDATE chats SET message_count = message_count - 1, last_message_role = ?,
+           last_message_preview = ?, last_message_at = ? WHERE id = ?""",
+        (last["role"] if last else None, message_preview(last["content"]) if last else None,
+         last["created_at"] if last else None, chat_id)
+    )
+    summary = dict_from_row(conn.execute(f"SELECT {_SUMMARY_COLUMNS} FROM chats WHERE id = ?", (chat_id,)).fetchone())
+    bump_revisions(conn, "chats", chat_key(chat_id))
+    record_event(conn, "message.deleted", {"id": message["id"], "chat_id": chat_id}, chat_id)
+    record_event(conn, "chat.updated", summary, chat_id)
+    return True
+
+
+def _document_content(chat_dict: dict) -> Optional[str]:
+    """Text of the chat's document (document mode only)"""
+    if chat_dict["mode"] != "document" or not chat_dict.get("metadata"):
+        return None
+    metadata = json.loads(chat_dict["metadata"])
+    if not metadata.get("document_id"):
+        return None
+    with span("document.load", document_id=metadata["document_id"]):
+        return get_document_content(metadata["document_id"])
+
+
+def _llm_history(conn, chat_id: str) -> List[dict]:
+    rows = conn.execute(
+        "SELECT role, content FROM messages WHERE chat_id = ? ORDER BY created_at ASC, rowid ASC",
+        (chat_id,)
+    ).fetchall()
+    return [{"role": r["role"], "content": r["content"]} for r in rows]
+
+
+def _prefetch_key(chat_dict: dict, content: str) -> tuple:
+    """What a speculative reply depends on besides the chat: history length, the text, LLM settings"""
+    return chat_dict["message_count"], content, config_versions()["llm"]
 
 
 async def create_chat(
@@ -26,12 +160,14 @@ async def create_chat(
         "INSERT INTO chats (id, category_id, title, mode, metadata) VALUES (?, ?, ?, ?, ?)",
         (chat_id, category_id, title, mode, metadata)
     )
+    row = dict_from_row(conn.execute("SELECT * FROM chats WHERE id = ?", (chat_id,)).fetchone())
+    bump_revisions(conn, "chats", chat_key(chat_id))
+    record_event(conn, "chat.created", row, chat_id)
     conn.commit()
-    
-    row = conn.execute("SELECT * FROM chats WHERE id = ?", (chat_id,)).fetchone()
     conn.close()
+    notify_events()
     
-    return dict_from_row(row)
+    return row
 
 
 def get_chat(chat_id: str) -> Tuple[dict, List[dict]]:
@@ -45,7 +181,7 @@ def get_chat(chat_id: str) -> Tuple[dict, List[dict]]:
         raise HTTPException(status_code=404, detail="Chat not found")
     
     messages = conn.execute(
-        "SELECT * FROM messages WHERE chat_id = ? ORDER BY created_at ASC",
+        "SELECT * FROM messages WHERE chat_id = ? ORDER BY created_at ASC, rowid ASC",
         (chat_id,)
     ).fetchall()
     
@@ -81,8 +217,47 @@ def delete_chat(chat_id: str) -> None:
     conn = get_db()
     conn.execute("DELETE FROM messages WHERE chat_id = ?", (chat_id,))
     conn.execute("DELETE FROM chats WHERE id = ?", (chat_id,))
+    bump_revisions(conn, "chats", chat_key(chat_id))
+    record_event(conn, "chat.deleted", {"id": chat_id}, chat_id)
     conn.commit()
     conn.close()
+    notify_events()
+    discard_prefetch(chat_id)
+
+
+async def prefetch_reply(chat_id: str, draft: str) -> dict:
+    """
+    Start generating the reply to the learner's draft before it is sent
+    (grammar and document chats, when PREFETCH_ENABLED).
+
+    Returns {"status": ...}: "started", "pending" or "ready" for a draft
+    being or already prefetched, "skipped" or "disabled" otherwise.
+    """
+    if not PREFETCH_ENABLED:
+        return {"status": "disabled"}
+    conn = get_db()
+    chat = conn.execute("SELECT * FROM chats WHERE id = ?", (chat_id,)).fetchone()
+    if not chat:
+        conn.close()
+        from fastapi import HTTPException
+        raise HTTPException(status_code=404, detail="Chat not found")
+    chat_dict = dict_from_row(chat)
+    if chat_dict["mode"] not in PREFETCH_MODES or not draft.strip():
+        conn.close()
+        return {"status": "skipped"}
+    messages_for_llm = _llm_history(conn, chat_id) + [{"role": "user", "content": draft}]
+    conn.close()
+
+    async def generate() -> str:
+        return await call_llm(messages_for_llm, chat_dict["mode"], _document_content(chat_dict), kind="prefetch",
+                              chat_id=chat_id)
+
+    return {"status": start_prefetch(chat_id, _prefetch_key(chat_dict, draft), generate)}
+
+
+async def _store_reply(assistant_msg: dict) -> None:
+    await run_write(_append_reply, assistant_msg)
+    notify_events()
 
 
 async def send_message(
@@ -93,6 +268,10 @@ async def send_message(
     """
     Send a message and get LLM response.
     
+    The user message and the reply (with the chat summary update) are written
+    in two short transactions through the group-commit writer; no connection
+    is held while the LLM generates.
+    
     Returns:
         Dict with user_message, assistant_message, and optional grammar_detected
     """
@@ -107,76 +286,68 @@ async def send_message(
     
     chat_dict = dict_from_row(chat)
     mode = chat_dict["mode"]
+    history = _llm_history(conn, chat_id)
+    conn.close()
     
-    # Get document content if in document mode
-    document_content = None
-    if mode == "document" and chat_dict.get("metadata"):
-        metadata = json.loads(chat_dict["metadata"])
-        if metadata.get("document_id"):
-            doc = conn.execute(
-                "SELECT content FROM documents WHERE id = ?",
-                (metadata["document_id"],)
-            ).fetchone()
-            if doc:
-                document_content = doc["content"]
-    
-    # Save user message
-    user_msg_id = str(uuid.uuid4())
-    conn.execute(
-        "INSERT INTO messages (id, chat_id, role, content) VALUES (?, ?, ?, ?)",
-        (user_msg_id, chat_id, "user", content)
-    )
-    conn.commit()
-    
-    # Get conversation history
-    history = conn.execute(
-        "SELECT role, content FROM messages WHERE chat_id = ? ORDER BY created_at ASC",
-        (chat_id,)
-    ).fetchall()
-    
-    messages_for_llm = [{"role": h["role"], "content": h["content"]} for h in history]
-    
-    # Get LLM response
-    response = await call_llm(messages_for_llm, mode, document_content)
+    user_msg = _new_message(chat_id, "user", content)
+    detector = grammar_detector() if detect_grammar and mode == "free_talk" else None
+    detect_inline = detector == "inline"
+    grammar_task = None
+    try:
+        await run_write(_append_user_message, user_msg)
+        notify_events()
+        
+        # Free talk grammar check: a separate call that runs while the reply is generated
+        if detector == "separate":
+            previous = next((m["content"] for m in reversed(history) if m["role"] == "assistant"), None)
+            grammar_task = asyncio.create_task(analyze_grammar(content, previous, chat_id=chat_id))
+        
+        # Use the reply prefetched while the learner was typing, if it was for this exact message
+        response = None
+        if PREFETCH_ENABLED and mode in PREFETCH_MODES:
+            response = await take_prefetched(chat_id, _prefetch_key(chat_dict, content))
+        
+        # Get LLM response
+        if response is None:
+            response = await call_llm(history + [{"role": "user", "content": content}], mode,
+                                      _document_content(chat_dict), grammar_tags=detect_inline, chat_id=chat_id)
+    except BaseException as e:
+        if grammar_task:
+            grammar_task.cancel()
+        if isinstance(e, asyncio.CancelledError) and not KEEP_UNANSWERED_MESSAGES:
+            # The client went away (core/disconnect.py): don't leave its message without a reply
+            if await run_write(_retract_message, user_msg):
+                notify_events()
+        raise
     
-    # Check for grammar detection
+    # A reply exists from here on: if the client goes away now, the reply is
+    # stored (without a pending grammar check) instead of retracting the message
     grammar_detected = None
-    if detect_grammar and "[GRAMMAR_DETECTED:" in response:
-        match = re.search(r'\[GRAMMAR_DETECTED:\s*([^|]+)\s*\|\s*([^\]]+)\]', response)
-        if match:
-            grammar_detected = {
-                "rule_name": match.group(1).strip(),
-                "explanation": match.group(2).strip()
-            }
-            # Clean the response
-            response = re.sub(r'\[GRAMMAR_DETECTED:[^\]]+\]', '', response).strip()
-    
-    # Save assistant message
-    assistant_msg_id = str(uuid.uuid4())
-    msg_metadata = json.dumps({"grammar_detected": grammar_detected}) if grammar_detected else None
-    conn.execute(
-        "INSERT INTO messages (id, chat_id, role, content, metadata) VALUES (?, ?, ?, ?, ?)",
-        (assistant_msg_id, chat_id, "assistant", response, msg_metadata)
-    )
+    disconnect = None
+    if grammar_task:
+        try:
+            grammar_detected = await grammar_task
+        except asyncio.CancelledError as e:
+            grammar_task.cancel()
+            disconnect = e
+    elif detect_inline:
+        response, grammar_detected = extract_grammar_detection(response)
     
-    # Update chat timestamp
-    conn.execute(
-        "UPDATE chats SET updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-        (chat_id,)
-    )
-    
-    conn.commit()
-    
-    # Get the saved messages
-    user_msg = conn.execute("SELECT * FROM messages WHERE id = ?", (user_msg_id,)).fetchone()
-    assistant_msg = conn.execute("SELECT * FROM messages WHERE id = ?", (assistant_msg_id,)).fetchone()
-    
-    conn.close()
+    # Save assistant message and update the chat timestamp and summary in one transaction
+    msg_metadata = json.dumps({"grammar_detected": grammar_detected}) if grammar_detected else None
+    assistant_msg = {
+        **_new_message(chat_id, "assistant", response, msg_metadata),
+        "grammar_detected": grammar_detected
+    }
+    # Shielded, so a cancellation while the write is queued does not drop it
+    store = asyncio.create_task(_store_reply(assistant_msg))
+    _reply_writes.add(store)
+    store.add_done_callback(_reply_writes.discard)
+    await asyncio.shield(store)
+    if disconnect:
+        raise disconnect
     
     return {
-        "user_message": dict_from_row(user_msg),
-        "assistant_message": {
-            **dict_from_row(assistant_msg),
-            "grammar_detected": grammar_detected
-        }
+        "user_message": user_msg,
+        "assistant_message": assistant_msg
     }
@@ -0,0 +1,146 @@
+"""
+Context planning for Ollama requests.
+
+Ollama sizes a model's KV cache by the num_ctx it is loaded with and reloads
+the model whenever a request asks for a different one. Instead of a fixed
+8192 for everything, a request gets the smallest of OLLAMA_CTX_BUCKETS that
+fits its estimated prompt plus reply, and keeps the size a model is already
+loaded with whenever that is big enough: a short correction prompt after a
+chat turn does not shrink (and reload) the chat model, and a small grammar
+model is loaded with a small context. A model only moves to a bigger bucket
+when a prompt does not fit (long histories, document mode).
+
+keep_alive is sent with every request: a request without it resets the
+model's timer to Ollama's default of 5 minutes, whatever warm-up asked for.
+When the configured chat model changes, the previous one is unloaded.
+
+Loaded sizes are tracked per process from the requests it sent.
+"""
+
+import asyncio
+import re
+import time
+from typing import Dict, List, Optional, Tuple, Union
+
+import httpx
+
+from core.config import (
+    OLLAMA_CTX_BUCKETS, OLLAMA_REPLY_TOKENS, OLLAMA_KEEP_ALIVE, OLLAMA_KEEP_ALIVE_MODELS, LLMConfig
+)
+from core.metrics import (
+    OLLAMA_PHASE_SECONDS, OLLAMA_TOKENS, OLLAMA_TOKENS_PER_SECOND, OLLAMA_REQUESTS_BY_CTX, OLLAMA_MODEL_LOADS
+)
+from core.runtime_config import on_config_change
+
+# German and English text run at roughly 3-4 characters per token; err towards more tokens
+CHARS_PER_TOKEN = 3.0
+MESSAGE_OVERHEAD_TOKENS = 4
+# load_duration is a few milliseconds when the model is already in memory
+MODEL_LOAD_THRESHOLD_S = 0.5
+
+_DURATION_RE = re.compile(r"(-?\d+(?:\.\d+)?)(ms|s|m|h)?")
+_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600, None: 1}
+
+# model -> (num_ctx it was last loaded with, when keep_alive runs out)
+_loaded: Dict[str, Tuple[int, float]] = {}
+_unloads = set()
+
+
+def keep_alive_for(model: str) -> Union[str, float]:
+    """
+    keep_alive to send for `model`. Ollama parses strings as Go durations, which
+    need a unit, so unitless values ("-1", "300") are sent as numbers (seconds).
+    """
+    value = OLLAMA_KEEP_ALIVE_MODELS.get(model, OLLAMA_KEEP_ALIVE).strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        return value
+    return int(seconds) if seconds.is_integer() else seconds
+
+
+def _keep_alive_seconds(value: Union[str, float]) -> float:
+    """Seconds for an Ollama keep_alive ("30m", "1h", 300, negative = forever)"""
+    if isinstance(value, (int, float)):
+        return float("inf") if value < 0 else float(value)
+    match = _DURATION_RE.fullmatch(value.strip())
+    if not match:
+        return 300.0
+    seconds = float(match.group(1)) * _UNITS[match.group(2)]
+    return float("inf") if seconds < 0 else seconds
+
+
+def estimate_tokens(messages: List[dict]) -> int:
+    chars = sum(len(m.get("content") or "") for m in messages)
+    return int(chars / CHARS_PER_TOKEN) + MESSAGE_OVERHEAD_TOKENS * len(messages)
+
+
+def plan_num_ctx(model: str, messages: List[dict], reply_tokens: int = OLLAMA_REPLY_TOKENS) -> int:
+    """The num_ctx to request for this prompt on `model`"""
+    needed = estimate_tokens(messages) + reply_tokens
+    # Prompts beyond the largest bucket are truncated by Ollama (oldest messages first)
+    fitting = next((size for size in OLLAMA_CTX_BUCKETS if size >= needed), OLLAMA_CTX_BUCKETS[-1])
+    loaded = _loaded.get(model)
+    if loaded and loaded[1] > time.monotonic() and loaded[0] >= fitting:
+        return loaded[0]
+    return fitting
+
+
+def note_loaded(model: str, num_ctx: int) -> None:
+    """Remember that `model` is now loaded with `num_ctx` (after a successful request)"""
+    _loaded[model] = (num_ctx, time.monotonic() + _keep_alive_seconds(keep_alive_for(model)))
+
+
+def record_ollama_timings(model: str, num_ctx: int, body: dict) -> None:
+    """Export the timing fields of an Ollama response (durations are in nanoseconds)"""
+    OLLAMA_REQUESTS_BY_CTX.inc(model, str(num_ctx))
+    load = body.get("load_duration", 0) / 1e9
+    OLLAMA_PHASE_SECONDS.observe(load, model, "load")
+    if load > MODEL_LOAD_THRESHOLD_S:
+        OLLAMA_MODEL_LOADS.inc(model, str(num_ctx))
+    for phase, count_field, duration_field in (
+        ("prompt", "prompt_eval_count", "prompt_eval_duration"),
+        ("eval", "eval_count", "eval_duration"),
+    ):
+        count = body.get(count_field) or 0
+        seconds = (body.get(duration_field) or 0) / 1e9
+        OLLAMA_PHASE_SECONDS.observe(seconds, model, "prompt_eval" if phase == "prompt" else "eval")
+        OLLAMA_TOKENS.inc(model, phase, amount=count)
+        if count and seconds:
+            OLLAMA_TOKENS_PER_SECOND.observe(count / seconds, model, phase)
+
+
+async def _unload(base_url: str, model: str) -> None:
+    try:
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            await client.post(f"{base_url}/api/generate", json={"model": model, "keep_alive": 0})
+    except httpx.HTTPError as e:
+        print(f"Could not unload Ollama model {model}: {e}")
+
+
+def _on_llm_config_change(old: LLMConfig, new: LLMConfig) -> None:
+    """Free the memory of a chat or grammar model that is no longer configured"""
+    if old.provider != "ollama":
+        return
+    in_use = {new.model, new.grammar_model} if new.provider == "ollama" else set()
+    for model in {old.model, old.grammar_model} - in_use - {None}:
+        _loaded.pop(model, None)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Changed outside the event loop; the model unloads when its keep_alive runs out
+            continue
+        task = loop.create_task(_unload(old.base_url, model))
+        _unloads.add(task)
+        task.add_done_callback(_unloads.discard)
+
+
+on_config_change("llm", _on_llm_config_change)
+
+
+def preload_request(model: str, num_ctx: Optional[int] = None) -> dict:
+    """Body of a /api/generate request that only loads `model` with `num_ctx`"""
+    body = {"model": model, "keep_alive": keep_alive_for(model)}
+    if num_ctx:
+        body["options"] = {"num_ctx": num_ctx}
+    return body
@@ -3,13 +3,22 @@ Document processing service for PDF, image, and text file extraction.
 """
 
 import io
-import json
 import os
 import uuid
-from typing import Tuple, List
+from functools import lru_cache
+from typing import Tuple, List, Optional
 from fastapi import HTTPException, UploadFile
 
-from core.database import get_db, dict_from_row
+from core.config import DOCUMENT_CACHE_SIZE
+from core.metrics import EXTRACTION_SECONDS, EXTRACTION_ERRORS
+from core.workers import run_in_pool, extraction_pool
+from core.compression import compress_text, decompress_text
+from core.database import get_db, dict_from_row, content_hash, normalize_text
+from core.revisions import bump_revisions
+from core.events import record_event, notify_events
+from services.vocabulary_service import rank_words
+from services.sentence_service import segment_text
+from services.exercise_service import bank_name
 
 
 def configure_tesseract():
@@ -37,43 +46,193 @@ def configure_tesseract():
 
 
 async def process_document(file: UploadFile) -> dict:
-    """Process uploaded document and extract text content."""
+    """
+    Process uploaded document and extract text content.
+    
+    Uploads are deduplicated by content hash: a file that was seen before reuses
+    the stored extraction, and different files that yield the same normalized
+    text share one content blob.
+    """
     content = await file.read()
-    filename = file.filename or "unknown"
-    extracted_text = ""
+    # Extraction, compression, word ranking, sentence segmentation and the inserts
+    # are all CPU-bound or blocking, so the whole ingest runs in the extraction pool
+    return await run_in_pool(extraction_pool, _ingest_document, file.filename or "unknown", content)
+
+
+def _ingest_document(filename: str, content: bytes) -> dict:
+    """Store an uploaded file as a document (blocking; see process_document)"""
+    file_hash = content_hash(content)
     
-    if filename.lower().endswith('.pdf'):
-        extracted_text = extract_from_pdf(content)
-    elif filename.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.webp')):
-        extracted_text = extract_from_image(content)
-    elif filename.lower().endswith(('.txt', '.md')):
-        extracted_text = content.decode('utf-8', errors='ignore')
-    else:
-        raise HTTPException(status_code=400, detail="Unsupported file type. Use PDF, images, or text files.")
+    conn = get_db()
+    known = conn.execute(
+        "SELECT blob_id FROM documents WHERE file_hash = ? AND blob_id IS NOT NULL LIMIT 1",
+        (file_hash,)
+    ).fetchone()
+    conn.close()
     
-    if not extracted_text.strip():
-        raise HTTPException(status_code=400, detail="Could not extract text from document")
+    if known:
+        text = _load_blob_content(known["blob_id"])
+        # None: the blob was deleted since the lookup, so extract the file again
+        if text is not None:
+            return _create_document(filename, file_hash, known["blob_id"], text)
     
-    words, sentences = extract_vocabulary(extracted_text)
+    extracted_text = extract_text(filename, content)
+    blob_id = content_hash(normalize_text(extracted_text).encode("utf-8"))
+    return _create_document(filename, file_hash, blob_id, extracted_text, compressed=compress_text(extracted_text))
+
+
+def _create_document(filename: str, file_hash: str, blob_id: str, text: str,
+                     compressed: Optional[Tuple[bytes, str]] = None) -> dict:
+    """
+    Insert a logical document referencing a content blob.
     
+    The blob (created from `compressed` if it does not exist yet), its reference
+    and the document are written in one transaction, so a concurrent delete of
+    the last document sharing the blob cannot remove it in between.
+    """
     doc_id = str(uuid.uuid4())
     conn = get_db()
-    conn.execute(
-        "INSERT INTO documents (id, filename, content, extracted_words, extracted_sentences) VALUES (?, ?, ?, ?, ?)",
-        (doc_id, filename, extracted_text, json.dumps(words[:500]), json.dumps(sentences[:100]))
-    )
-    conn.commit()
-    conn.close()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        deduplicated = True
+        if compressed:
+            data, codec = compressed
+            deduplicated = conn.execute(
+                "INSERT OR IGNORE INTO document_blobs (id, data, codec, size) VALUES (?, ?, ?, ?)",
+                (blob_id, data, codec, len(text))
+            ).rowcount == 0
+        referenced = conn.execute(
+            "UPDATE document_blobs SET ref_count = ref_count + 1 WHERE id = ?", (blob_id,)
+        ).rowcount
+        if not referenced:
+            raise HTTPException(status_code=409, detail="The stored text of this file was deleted during the upload; please upload it again")
+        conn.execute(
+            "INSERT INTO documents (id, filename, content, file_hash, blob_id) VALUES (?, ?, '', ?, ?)",
+            (doc_id, filename, file_hash, blob_id)
+        )
+        word_count = _index_words(conn, doc_id, blob_id, text)
+        sentence_count = _index_sentences(conn, doc_id, blob_id, text)
+        created_at = conn.execute("SELECT created_at FROM documents WHERE id = ?", (doc_id,)).fetchone()["created_at"]
+        bump_revisions(conn, "documents")
+        record_event(conn, "document.ingested", {
+            "id": doc_id,
+            "filename": filename,
+            "created_at": created_at,
+            "word_count": word_count,
+            "sentence_count": sentence_count,
+        })
+        conn.commit()
+    finally:
+        # Without the commit, closing rolls everything back
+        conn.close()
+    notify_events()
     
     return {
         "id": doc_id,
         "filename": filename,
-        "word_count": len(words),
-        "sentence_count": len(sentences),
-        "preview": extracted_text[:500] + "..." if len(extracted_text) > 500 else extracted_text
+        "word_count": word_count,
+        "sentence_count": sentence_count,
+        "deduplicated": deduplicated,
+        "preview": text[:500] + "..." if len(text) > 500 else text
     }
 
 
+def _copy_from_sibling(conn, table: str, columns: str, doc_id: str, blob_id: str) -> Optional[int]:
+    """
+    Copy the index rows of another document sharing the same blob.
+    
+    Returns the number of copied rows, or None if no sibling has been indexed.
+    """
+    sibling = conn.execute(
+        f"""SELECT d.id FROM documents d
+            WHERE d.blob_id = ? AND d.id != ?
+              AND EXISTS (SELECT 1 FROM {table} t WHERE t.doc_id = d.id)
+            LIMIT 1""",
+        (blob_id, doc_id)
+    ).fetchone()
+    if not sibling:
+        return None
+    
+    cursor = conn.execute(
+        f"INSERT INTO {table} (doc_id, {columns}) SELECT ?, {columns} FROM {table} WHERE doc_id = ?",
+        (doc_id, sibling["id"])
+    )
+    return cursor.rowcount
+
+
+def _index_words(conn, doc_id: str, blob_id: str, text: str) -> int:
+    """Fill document_words for a document. Returns the number of distinct words."""
+    copied = _copy_from_sibling(conn, "document_words", "word, count, first_offset", doc_id, blob_id)
+    if copied is not None:
+        return copied
+    
+    ranked = rank_words(text)
+    conn.executemany(
+        "INSERT INTO document_words (doc_id, word, count, first_offset) VALUES (?, ?, ?, ?)",
+        [(doc_id, word, count, offset) for word, count, offset in ranked]
+    )
+    return len(ranked)
+
+
+def _index_sentences(conn, doc_id: str, blob_id: str, text: str) -> int:
+    """Fill document_sentences for a document. Returns the number of sentences."""
+    copied = _copy_from_sibling(conn, "document_sentences", "idx, start_offset, end_offset, text", doc_id, blob_id)
+    if copied is not None:
+        return copied
+    
+    cursor = conn.executemany(
+        "INSERT INTO document_sentences (doc_id, idx, start_offset, end_offset, text) VALUES (?, ?, ?, ?, ?)",
+        ((doc_id, idx, start, end, sentence) for idx, (start, end, sentence) in enumerate(segment_text(text)))
+    )
+    return cursor.rowcount
+
+
+def reindex_documents() -> int:
+    """Build the word and sentence index for documents that do not have one yet."""
+    conn = get_db()
+    rows = conn.execute(
+        """SELECT d.id, d.blob_id,
+                  EXISTS (SELECT 1 FROM document_words w WHERE w.doc_id = d.id) AS has_words,
+                  EXISTS (SELECT 1 FROM document_sentences s WHERE s.doc_id = d.id) AS has_sentences
+           FROM documents d
+           JOIN document_blobs b ON b.id = d.blob_id
+           WHERE NOT has_words OR NOT has_sentences"""
+    ).fetchall()
+    for row in rows:
+        content = _read_blob(conn, row["blob_id"])
+        if not row["has_words"]:
+            _index_words(conn, row["id"], row["blob_id"], content)
+        if not row["has_sentences"]:
+            _index_sentences(conn, row["id"], row["blob_id"], content)
+    conn.commit()
+    conn.close()
+    return len(rows)
+
+
+def extract_text(filename: str, content: bytes) -> str:
+    """Extract text from an uploaded file based on its extension."""
+    if filename.lower().endswith('.pdf'):
+        kind, extractor = "pdf", extract_from_pdf
+    elif filename.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.webp')):
+        kind, extractor = "ocr", extract_from_image
+    elif filename.lower().endswith(('.txt', '.md')):
+        kind, extractor = "text", lambda data: data.decode('utf-8', errors='ignore')
+    else:
+        raise HTTPException(status_code=400, detail="Unsupported file type. Use PDF, images, or text files.")
+    
+    try:
+        with EXTRACTION_SECONDS.time(kind):
+            extracted_text = extractor(content)
+    except HTTPException:
+        EXTRACTION_ERRORS.inc(kind)
+        raise
+    
+    if not extracted_text.strip():
+        raise HTTPException(status_code=400, detail="Could not extract text from document")
+    
+    return extracted_text
+
+
 def extract_from_pdf(content: bytes) -> str:
     """Extract text from PDF."""
     try:
@@ -117,36 +276,165 @@ def extract_from_image(content: bytes) -> str:
 
 
 def extract_vocabulary(text: str) -> Tuple[List[str], List[str]]:
-    """Extract unique words and sentences from text."""
-    words = list(set(
-        w.lower() for w in text.split() 
-        if len(w) > 2 and w.isalpha()
-    ))
+    """Extract words (most frequent first) and sentences from text."""
+    words = [word for word, _, _ in rank_words(text)]
+    sentences = [sentence for _, _, sentence in segment_text(text)]
+    return words, sentences
+
+
+def _read_blob(conn, blob_id: str) -> Optional[str]:
+    """Read and decompress the content of a blob."""
+    row = conn.execute(
+        "SELECT content, data, codec FROM document_blobs WHERE id = ?",
+        (blob_id,)
+    ).fetchone()
+    if not row:
+        return None
+    if row["data"] is None:
+        return row["content"]
+    return decompress_text(row["data"], row["codec"])
+
+
+class _BlobMissing(Exception):
+    pass
+
+
+@lru_cache(maxsize=DOCUMENT_CACHE_SIZE)
+def _cached_blob_content(blob_id: str) -> str:
+    conn = get_db()
+    content = _read_blob(conn, blob_id)
+    conn.close()
+    if content is None:
+        # Raised rather than returned so lru_cache does not remember the miss
+        raise _BlobMissing(blob_id)
+    return content
+
+
+def _load_blob_content(blob_id: str) -> Optional[str]:
+    """
+    Decompressed blob content, cached in process.
+    
+    Blobs are addressed by the hash of their text and never change, so cached
+    entries cannot go stale. Misses are not cached: a deleted blob may be
+    created again under the same id.
+    """
+    try:
+        return _cached_blob_content(blob_id)
+    except _BlobMissing:
+        return None
+
+
+def _document_blob_id(doc_id: str) -> Optional[str]:
+    """Blob of a document; looked up on every call so deletes in other workers are seen."""
+    conn = get_db()
+    doc = conn.execute("SELECT blob_id FROM documents WHERE id = ?", (doc_id,)).fetchone()
+    conn.close()
+    return doc["blob_id"] if doc else None
+
+
+def get_document_content(doc_id: str, offset: int = 0, length: Optional[int] = None) -> Optional[str]:
+    """
+    Get the text of a document, optionally a character range of it.
     
-    sentences = [
-        s.strip() for s in text.replace('\n', ' ').split('.') 
-        if len(s.strip()) > 10
-    ]
+    Repeated reads for the same document (document-mode chat turns) cost one
+    primary-key lookup; the text itself is served from memory.
+    """
+    blob_id = _document_blob_id(doc_id)
+    if not blob_id:
+        return None
     
-    return words, sentences
+    content = _load_blob_content(blob_id)
+    if content is None:
+        return None
+    if offset or length is not None:
+        end = offset + length if length is not None else None
+        return content[offset:end]
+    return content
+
 
+DOCUMENT_FIELDS = ("content", "words", "sentences")
 
-def get_document(doc_id: str) -> dict:
-    """Get document by ID."""
+
+def get_document(doc_id: str, fields: Optional[List[str]] = None) -> dict:
+    """
+    Get document by ID.
+    
+    Returns metadata only unless `fields` asks for the heavy parts:
+    "content", "words" (extracted_words) and/or "sentences" (extracted_sentences).
+    """
+    fields = fields or []
+    unknown = set(fields) - set(DOCUMENT_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    
     conn = get_db()
-    doc = conn.execute("SELECT * FROM documents WHERE id = ?", (doc_id,)).fetchone()
+    doc = conn.execute(
+        """SELECT d.id, d.filename, d.created_at, b.size,
+                  (SELECT COUNT(*) FROM document_words w WHERE w.doc_id = d.id) AS word_count,
+                  (SELECT COUNT(*) FROM document_sentences s WHERE s.doc_id = d.id) AS sentence_count
+           FROM documents d JOIN document_blobs b ON b.id = d.blob_id
+           WHERE d.id = ?""",
+        (doc_id,)
+    ).fetchone()
     conn.close()
     
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
     
     doc_dict = dict_from_row(doc)
-    doc_dict["extracted_words"] = json.loads(doc_dict["extracted_words"]) if doc_dict["extracted_words"] else []
-    doc_dict["extracted_sentences"] = json.loads(doc_dict["extracted_sentences"]) if doc_dict["extracted_sentences"] else []
+    if "content" in fields:
+        doc_dict["content"] = get_document_content(doc_id)
+    if "words" in fields:
+        doc_dict["extracted_words"] = get_document_words(doc_id)
+    if "sentences" in fields:
+        doc_dict["extracted_sentences"] = [s["text"] for s in get_document_sentences(doc_id)]
     
     return doc_dict
 
 
+def get_document_words(doc_id: str, limit: int = 500) -> List[str]:
+    """Get the most frequent words of a document."""
+    conn = get_db()
+    rows = conn.execute(
+        "SELECT word FROM document_words WHERE doc_id = ? ORDER BY count DESC, first_offset LIMIT ?",
+        (doc_id, limit)
+    ).fetchall()
+    conn.close()
+    return [r["word"] for r in rows]
+
+
+def get_document_sentences(doc_id: str, start: int = 0, limit: int = -1) -> List[dict]:
+    """Get a range of sentences of a document by index, without loading its content."""
+    conn = get_db()
+    rows = conn.execute(
+        """SELECT idx, start_offset, end_offset, text FROM document_sentences
+           WHERE doc_id = ? AND idx >= ? ORDER BY idx LIMIT ?""",
+        (doc_id, start, limit)
+    ).fetchall()
+    conn.close()
+    return [dict_from_row(r) for r in rows]
+
+
+def get_top_words(limit: int = 50, min_length: int = 3, exclude: List[str] = None) -> List[dict]:
+    """Get the most frequent words across all documents."""
+    exclude = [w.lower() for w in exclude or []]
+    placeholders = ",".join("?" * len(exclude))
+    exclude_clause = f"AND word NOT IN ({placeholders})" if exclude else ""
+    
+    conn = get_db()
+    rows = conn.execute(
+        f"""SELECT word, SUM(count) AS count, COUNT(*) AS document_count
+            FROM document_words
+            WHERE length(word) >= ? {exclude_clause}
+            GROUP BY word
+            ORDER BY count DESC
+            LIMIT ?""",
+        (min_length, *exclude, limit)
+    ).fetchall()
+    conn.close()
+    return [dict_from_row(r) for r in rows]
+
+
 def get_all_documents() -> List[dict]:
     """Get all documents metadata."""
     conn = get_db()
@@ -158,8 +446,19 @@ def get_all_documents() -> List[dict]:
 
 
 def delete_document(doc_id: str) -> None:
-    """Delete a document."""
+    """Delete a document, dropping its content blob once nothing references it."""
     conn = get_db()
+    doc = conn.execute("SELECT blob_id FROM documents WHERE id = ?", (doc_id,)).fetchone()
+    conn.execute("DELETE FROM document_words WHERE doc_id = ?", (doc_id,))
+    conn.execute("DELETE FROM document_sentences WHERE doc_id = ?", (doc_id,))
+    conn.execute("DELETE FROM document_exercises WHERE doc_id = ?", (doc_id,))
+    conn.execute("DELETE FROM migration_state WHERE name = ?", (bank_name(doc_id),))
     conn.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
+    if doc and doc["blob_id"]:
+        conn.execute("UPDATE document_blobs SET ref_count = ref_count - 1 WHERE id = ?", (doc["blob_id"],))
+        conn.execute("DELETE FROM document_blobs WHERE id = ? AND ref_count <= 0", (doc["blob_id"],))
+    bump_revisions(conn, "documents")
+    record_event(conn, "document.deleted", {"id": doc_id})
     conn.commit()
     conn.close()
+    notify_events()
@@ -0,0 +1,304 @@
+"""
+Exercise service - per-document bank of pre-generated exercises.
+
+After a document is indexed, its bank is built in the background from the
+word and sentence index, without LLM calls:
+- "cloze": a document sentence with one word blanked out, plus multiple
+  choice options (the answer and other words of the document of similar length)
+- "vocab": use one of the document's most frequent words in a sentence of
+  your own, with an example sentence from the document as hint
+
+Exercises are served in order with an id cursor, which is a single index
+seek. Cloze answers are checked by string comparison; only free-form vocab
+answers are graded by the LLM.
+"""
+
+import json
+import random
+import re
+import time
+import unicodedata
+from bisect import bisect_right
+from typing import List, Optional
+
+from fastapi import HTTPException
+
+from core.config import EXERCISE_BATCH_SIZE, EXERCISE_VOCAB_ITEMS, EXERCISE_OPTIONS
+from core.database import get_db, dict_from_row
+from core.events import record_event, notify_events
+from services.vocabulary_service import tokenize
+
+EXERCISE_KINDS = ("cloze", "vocab")
+
+BLANK = "_____"
+MIN_SENTENCE_WORDS = 5
+MAX_SENTENCE_WORDS = 40
+MIN_TARGET_LENGTH = 5
+
+_PUNCT_RE = re.compile(r"[^\w\s-]")
+
+
+def bank_name(doc_id: str) -> str:
+    """migration_state entry tracking how far a document's bank has been built"""
+    return f"exercises:{doc_id}"
+
+
+def _pick_target(tokens: List[tuple], counts: dict) -> Optional[tuple]:
+    """The word to blank out: the longest one that recurs in the document, else the longest one"""
+    candidates = [t for t in tokens if len(t[0]) >= MIN_TARGET_LENGTH]
+    if not candidates:
+        return None
+    recurring = [t for t in candidates if counts.get(t[0], 0) >= 2]
+    return max(recurring or candidates, key=lambda t: len(t[0]))
+
+
+def _match_case(word: str, like: str) -> str:
+    return word[:1].upper() + word[1:] if like[:1].isupper() else word
+
+
+def _distractors(rng: random.Random, answer: str, by_length: dict, exclude: set) -> List[str]:
+    """Other words of the document with about the answer's length, none of them from the sentence"""
+    pool = []
+    for delta in (0, -1, 1, -2, 2):
+        pool.extend(w for w in by_length.get(len(answer) + delta, ()) if w != answer and w not in exclude)
+        if len(pool) >= 4 * EXERCISE_OPTIONS:
+            break
+    return rng.sample(pool, min(EXERCISE_OPTIONS - 1, len(pool)))
+
+
+def _starts_sentence(text: str, offset: int) -> bool:
+    before = text[max(0, offset - 10):offset].rstrip(" \t\n\"'„“«»(")
+    return not before or before[-1] in ".!?:"
+
+
+def _surface_forms(doc_id: str, words: list) -> dict:
+    """
+    The spelling of each indexed (lowercased) word at its first occurrence in
+    the document, so options keep the capitalization of nouns
+    """
+    from services.document_service import get_document_content
+    content = get_document_content(doc_id) or ""
+    surface = {}
+    for row in words:
+        word, offset = row["word"], row["first_offset"]
+        form = content[offset:offset + len(word)]
+        # Words re-joined from line-break hyphenation do not appear as such in the text
+        if form.lower() != word:
+            continue
+        if form[:1].isupper() and row["count"] >= 2 and _starts_sentence(content, offset):
+            # Capitalized only because it starts a sentence? Then a later occurrence is not
+            later = re.compile(rf"\b{re.escape(word)}\b", re.IGNORECASE).search(content, offset + len(word))
+            if later and later.group().islower():
+                form = later.group()
+        surface[word] = form
+    return surface
+
+
+def _cloze(doc_id: str, sentence: dict, counts: dict, by_length: dict, surface: dict) -> Optional[tuple]:
+    text = sentence["text"]
+    if not MIN_SENTENCE_WORDS <= len(text.split()) <= MAX_SENTENCE_WORDS:
+        return None
+    tokens = list(tokenize(text))
+    target = _pick_target(tokens, counts)
+    if not target:
+        return None
+    word, offset = target
+    original = text[offset:offset + len(word)]
+    rng = random.Random(f"{doc_id}:{sentence['idx']}")
+    distractors = _distractors(rng, word, by_length, {t[0] for t in tokens})
+    options = [original] + [_match_case(surface.get(w, w), original) for w in distractors]
+    rng.shuffle(options)
+    return (
+        doc_id, "cloze", text[:offset] + BLANK + text[offset + len(original):], original,
+        json.dumps(options, ensure_ascii=False), f"{original[0]}… ({len(original)} letters)",
+        f"sentence:{sentence['idx']}"
+    )
+
+
+def _vocab_items(conn, doc_id: str) -> List[tuple]:
+    words = conn.execute(
+        """SELECT word, first_offset FROM document_words
+           WHERE doc_id = ? AND count >= 2 AND length(word) >= ?
+           ORDER BY count DESC, first_offset LIMIT ?""",
+        (doc_id, MIN_TARGET_LENGTH, EXERCISE_VOCAB_ITEMS)
+    ).fetchall()
+    sentences = conn.execute(
+        "SELECT start_offset, text FROM document_sentences WHERE doc_id = ? ORDER BY idx", (doc_id,)
+    ).fetchall()
+    starts = [s["start_offset"] for s in sentences]
+    items = []
+    for row in words:
+        # The sentence the word first appears in
+        position = bisect_right(starts, row["first_offset"]) - 1
+        example = sentences[position]["text"] if position >= 0 else None
+        items.append((
+            doc_id, "vocab", f"Use „{row['word']}“ in a sentence of your own.", None, None,
+            example, f"word:{row['word']}"
+        ))
+    return items
+
+
+def _insert(conn, rows: List[tuple]) -> int:
+    return conn.executemany(
+        """INSERT OR IGNORE INTO document_exercises (doc_id, kind, prompt, answer, options, hint, source)
+           VALUES (?, ?, ?, ?, ?, ?, ?)""",
+        rows
+    ).rowcount
+
+
+def _save_position(conn, doc_id: str, position: int, finished: bool = False) -> None:
+    conn.execute(
+        """INSERT INTO migration_state (name, position, finished_at) VALUES (?, ?, ?)
+           ON CONFLICT(name) DO UPDATE SET position = excluded.position, finished_at = excluded.finished_at""",
+        (bank_name(doc_id), position, time.time() if finished else None)
+    )
+
+
+def build_exercise_bank(doc_id: str, batch_size: int = EXERCISE_BATCH_SIZE) -> int:
+    """
+    Generate a document's exercises, `batch_size` sentences per transaction.
+
+    The position is saved with each batch, so a build interrupted by a restart
+    continues where it stopped. Returns the number of exercises added.
+    """
+    conn = get_db()
+    state = conn.execute(
+        "SELECT position, finished_at FROM migration_state WHERE name = ?", (bank_name(doc_id),)
+    ).fetchone()
+    if (state and state["finished_at"]) or not conn.execute(
+            "SELECT 1 FROM documents WHERE id = ?", (doc_id,)).fetchone():
+        conn.close()
+        return 0
+
+    words = conn.execute(
+        "SELECT word, count, first_offset FROM document_words WHERE doc_id = ?", (doc_id,)
+    ).fetchall()
+    counts = {row["word"]: row["count"] for row in words}
+    by_length = {}
+    for word in counts:
+        by_length.setdefault(len(word), []).append(word)
+    surface = _surface_forms(doc_id, words)
+
+    position = state["position"] if state else 0
+    added = 0
+    while True:
+        sentences = conn.execute(
+            "SELECT idx, text FROM document_sentences WHERE doc_id = ? AND idx >= ? ORDER BY idx LIMIT ?",
+            (doc_id, position, batch_size)
+        ).fetchall()
+        if not sentences:
+            break
+        rows = [row for row in (_cloze(doc_id, s, counts, by_length, surface) for s in sentences) if row]
+        added += _insert(conn, rows)
+        position = sentences[-1]["idx"] + 1
+        _save_position(conn, doc_id, position)
+        conn.commit()
+
+    added += _insert(conn, _vocab_items(conn, doc_id))
+    _save_position(conn, doc_id, position, finished=True)
+    record_event(conn, "document.exercises_ready", {"id": doc_id, **_counts(conn, doc_id)})
+    conn.commit()
+    conn.close()
+    notify_events()
+    return added
+
+
+def build_missing_exercise_banks() -> int:
+    """Build (or finish) the banks of documents that do not have a complete one"""
+    conn = get_db()
+    doc_ids = [row["id"] for row in conn.execute(
+        """SELECT d.id FROM documents d
+           LEFT JOIN migration_state m ON m.name = 'exercises:' || d.id
+           WHERE m.finished_at IS NULL"""
+    ).fetchall()]
+    conn.close()
+    for doc_id in doc_ids:
+        build_exercise_bank(doc_id)
+    return len(doc_ids)
+
+
+def _counts(conn, doc_id: str) -> dict:
+    rows = conn.execute(
+        "SELECT kind, COUNT(*) AS n FROM document_exercises WHERE doc_id = ? GROUP BY kind", (doc_id,)
+    ).fetchall()
+    return {kind: 0 for kind in EXERCISE_KINDS} | {row["kind"]: row["n"] for row in rows}
+
+
+def _public(row) -> dict:
+    """An exercise as served to the learner (without the answer)"""
+    exercise = dict_from_row(row)
+    exercise.pop("answer", None)
+    exercise["options"] = json.loads(exercise["options"]) if exercise["options"] else None
+    return exercise
+
+
+def get_exercise_bank(doc_id: str) -> dict:
+    """Build state and number of exercises per kind"""
+    conn = get_db()
+    state = conn.execute(
+        "SELECT finished_at FROM migration_state WHERE name = ?", (bank_name(doc_id),)
+    ).fetchone()
+    counts = _counts(conn, doc_id)
+    conn.close()
+    return {"doc_id": doc_id, "ready": bool(state and state["finished_at"]), "counts": counts}
+
+
+def get_next_exercise(doc_id: str, kind: str = "cloze", after: int = 0) -> dict:
+    """The first exercise of `kind` with an id above `after` (404 when the bank has no more)"""
+    conn = get_db()
+    row = conn.execute(
+        """SELECT id, doc_id, kind, prompt, options, hint FROM document_exercises
+           WHERE doc_id = ? AND kind = ? AND id > ? ORDER BY id LIMIT 1""",
+        (doc_id, kind, after)
+    ).fetchone()
+    conn.close()
+    if not row:
+        raise HTTPException(status_code=404, detail="No more exercises")
+    return _public(row)
+
+
+def _normalize_answer(text: str) -> str:
+    """Compare answers ignoring case, punctuation and spacing (umlauts still count)"""
+    text = unicodedata.normalize("NFC", text).casefold()
+    return " ".join(_PUNCT_RE.sub(" ", text).split())
+
+
+async def grade_answer(doc_id: str, exercise_id: int, answer: str) -> dict:
+    """
+    Check an answer. Cloze items are compared with the stored answer;
+    free-form items are graded by the LLM.
+    """
+    conn = get_db()
+    row = conn.execute(
+        "SELECT * FROM document_exercises WHERE id = ? AND doc_id = ?", (exercise_id, doc_id)
+    ).fetchone()
+    conn.close()
+    if not row:
+        raise HTTPException(status_code=404, detail="Exercise not found")
+    if not answer.strip():
+        raise HTTPException(status_code=400, detail="Answer is empty")
+
+    if row["answer"] is not None:
+        return {
+            "correct": _normalize_answer(answer) == _normalize_answer(row["answer"]),
+            "expected": row["answer"],
+            "feedback": None,
+            "graded_by": "match",
+        }
+
+    from services.llm_service import call_llm_raw
+    prompt = f"""You are grading a German learner's exercise.
+
+Exercise: {row['prompt']}
+Learner's answer: {answer}
+
+Is the word used correctly, in a grammatical sentence? Reply with CORRECT or INCORRECT on the
+first line, then one or two short sentences of feedback (with a corrected version if needed)."""
+    reply = (await call_llm_raw(prompt, kind="grading")).strip()
+    verdict, _, feedback = reply.partition("\n")
+    return {
+        "correct": verdict.strip().lstrip("*").upper().startswith("CORRECT"),
+        "expected": None,
+        "feedback": feedback.strip() or None,
+        "graded_by": "llm",
+    }
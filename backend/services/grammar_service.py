@@ -0,0 +1,233 @@
+"""
+Grammar service - detection of grammar issues, their structured store and per-rule progress
+"""
+
+import asyncio
+import json
+import time
+from typing import List, Optional
+
+from fastapi import HTTPException
+
+from core.config import GRAMMAR_DETECTOR, GRAMMAR_TIMEOUT_S
+from core.database import get_db, dict_from_row
+from core.runtime_config import get_llm_config
+from core.tracing import span
+from services.llm_service import call_llm_raw
+
+BACKFILL_BATCH = 500
+BACKFILL_NAME = "grammar_events"
+
+# Weeks start on Monday: date(x, 'weekday 0', '-6 days') is the Monday of x's week
+_STATS_QUERY = """
+    SELECT s.rule_key, s.rule_name, s.occurrences, s.first_seen, s.last_seen,
+           COALESCE(cur.occurrences, 0) AS this_week, COALESCE(prev.occurrences, 0) AS last_week
+    FROM grammar_stats s
+    LEFT JOIN grammar_stats_weekly cur
+        ON cur.rule_key = s.rule_key AND cur.week = date('now', 'weekday 0', '-6 days')
+    LEFT JOIN grammar_stats_weekly prev
+        ON prev.rule_key = s.rule_key AND prev.week = date('now', 'weekday 0', '-13 days')
+"""
+
+MAX_RULE_NAME = 80
+
+_ANALYSIS_PROMPT = """You check a language learner's chat message for grammar mistakes.
+{context}
+Learner's message: {message}
+
+Reply with JSON only. For the most important mistake:
+{{"issue": true, "rule_name": "<short name of the grammar rule>", "explanation": "<one sentence>"}}
+If the message has no grammar mistake: {{"issue": false}}"""
+
+STATS_ORDER = {
+    "occurrences": "s.occurrences DESC, s.last_seen DESC",
+    "last_seen": "s.last_seen DESC",
+}
+
+
+def rule_key(rule_name: str) -> str:
+    """Case- and whitespace-insensitive key, so "Dativ" and "dativ " count as one rule"""
+    return " ".join(rule_name.split()).casefold()
+
+
+def _parse_analysis(reply: str) -> Optional[dict]:
+    """The grammar_detected dict from an analysis reply, None if it reports no issue or is not JSON"""
+    start, end = reply.find("{"), reply.rfind("}")
+    if start < 0 or end < start:
+        return None
+    try:
+        data = json.loads(reply[start:end + 1])
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or not data.get("issue"):
+        return None
+    rule_name = " ".join(str(data.get("rule_name") or "").split())[:MAX_RULE_NAME]
+    if not rule_name:
+        return None
+    return {"rule_name": rule_name, "explanation": str(data.get("explanation") or "").strip()}
+
+
+def grammar_detector() -> str:
+    """How free talk grammar issues are found now: "separate" or "inline" (see GRAMMAR_DETECTOR)"""
+    if GRAMMAR_DETECTOR != "auto":
+        return GRAMMAR_DETECTOR
+    # A second full call on the chat model would double the cost of every turn
+    return "separate" if get_llm_config().grammar_model else "inline"
+
+
+async def analyze_grammar(message: str, previous: Optional[str] = None,
+                          chat_id: Optional[str] = None) -> Optional[dict]:
+    """
+    Look for a grammar mistake in a learner's message with a separate LLM call
+    on LLMConfig.grammar_model. Returns {"rule_name", "explanation"} or None;
+    failures and timeouts count as no issue, so they never hold up the reply.
+    """
+    context = f"The tutor's previous message (context only): {previous[:500]}\n" if previous else ""
+    prompt = _ANALYSIS_PROMPT.format(context=context, message=message)
+    try:
+        with span("grammar.analyze"):
+            reply = await asyncio.wait_for(
+                call_llm_raw(prompt, kind="grammar", model=get_llm_config().grammar_model, json_output=True,
+                             chat_id=chat_id),
+                GRAMMAR_TIMEOUT_S
+            )
+    except Exception as e:
+        print(f"Grammar analysis failed: {e!r}")
+        return None
+    return _parse_analysis(reply)
+
+
+def record_grammar_event(conn, message_id: str, chat_id: str, grammar_detected: dict, created_at: str) -> bool:
+    """
+    Store a detected grammar issue and update its rule's aggregates in the
+    caller's transaction. Returns False if the message was already recorded.
+    """
+    name = " ".join(grammar_detected["rule_name"].split())
+    key = rule_key(name)
+    inserted = conn.execute(
+        """INSERT OR IGNORE INTO grammar_events (message_id, chat_id, rule_key, rule_name, explanation, created_at)
+           VALUES (?, ?, ?, ?, ?, ?)""",
+        (message_id, chat_id, key, name, grammar_detected.get("explanation"), created_at)
+    ).rowcount
+    if not inserted:
+        return False
+    conn.execute(
+        """INSERT INTO grammar_stats (rule_key, rule_name, occurrences, first_seen, last_seen) VALUES (?, ?, 1, ?, ?)
+           ON CONFLICT(rule_key) DO UPDATE SET
+               occurrences = occurrences + 1,
+               rule_name = CASE WHEN excluded.last_seen >= last_seen THEN excluded.rule_name ELSE rule_name END,
+               first_seen = MIN(first_seen, excluded.first_seen),
+               last_seen = MAX(last_seen, excluded.last_seen)""",
+        (key, name, created_at, created_at)
+    )
+    conn.execute(
+        """INSERT INTO grammar_stats_weekly (rule_key, week, occurrences)
+           VALUES (?, date(?, 'weekday 0', '-6 days'), 1)
+           ON CONFLICT(rule_key, week) DO UPDATE SET occurrences = occurrences + 1""",
+        (key, created_at)
+    )
+    return True
+
+
+def backfill_grammar_events(batch_size: int = BACKFILL_BATCH) -> int:
+    """
+    Create grammar events for messages stored before grammar_events existed.
+
+    Runs in batches of `batch_size` messages, each committed with its position
+    in migration_state, so an interrupted backfill resumes where it stopped.
+    Returns the number of events added (0 once the backfill has finished).
+    """
+    conn = get_db()
+    state = conn.execute(
+        "SELECT position, finished_at FROM migration_state WHERE name = ?", (BACKFILL_NAME,)
+    ).fetchone()
+    if state and state["finished_at"]:
+        conn.close()
+        return 0
+
+    position = state["position"] if state else 0
+    # Messages written after this point record their own events
+    end = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM messages").fetchone()[0]
+    added = 0
+    while position < end:
+        rows = conn.execute(
+            """SELECT rowid, id, chat_id, metadata, created_at FROM messages
+               WHERE rowid > ? AND rowid <= ? AND role = 'assistant' AND metadata LIKE '%grammar_detected%'
+               ORDER BY rowid LIMIT ?""",
+            (position, end, batch_size)
+        ).fetchall()
+        for row in rows:
+            try:
+                grammar_detected = json.loads(row["metadata"]).get("grammar_detected")
+            except (ValueError, AttributeError):
+                continue
+            if grammar_detected and grammar_detected.get("rule_name"):
+                added += record_grammar_event(conn, row["id"], row["chat_id"], grammar_detected, row["created_at"])
+        position = rows[-1]["rowid"] if len(rows) == batch_size else end
+        conn.execute(
+            """INSERT INTO migration_state (name, position) VALUES (?, ?)
+               ON CONFLICT(name) DO UPDATE SET position = excluded.position""",
+            (BACKFILL_NAME, position)
+        )
+        conn.commit()
+
+    conn.execute(
+        """INSERT INTO migration_state (name, position, finished_at) VALUES (?, ?, ?)
+           ON CONFLICT(name) DO UPDATE SET position = excluded.position, finished_at = excluded.finished_at""",
+        (BACKFILL_NAME, position, time.time())
+    )
+    conn.commit()
+    conn.close()
+    return added
+
+
+def _trend(this_week: int, last_week: int, occurrences: int) -> str:
+    """Fewer mistakes than the week before is improvement; a rule first seen this week is new"""
+    if this_week == last_week:
+        return "inactive" if this_week == 0 else "steady"
+    if last_week == 0 and occurrences == this_week:
+        return "new"
+    return "improving" if this_week < last_week else "worsening"
+
+
+def get_grammar_stats(order: str = "occurrences", limit: int = 50) -> List[dict]:
+    """Per-rule totals with this week's and last week's counts"""
+    conn = get_db()
+    rows = conn.execute(
+        f"{_STATS_QUERY} ORDER BY {STATS_ORDER[order]} LIMIT ?",
+        (limit,)
+    ).fetchall()
+    conn.close()
+    return [
+        {**dict_from_row(row), "trend": _trend(row["this_week"], row["last_week"], row["occurrences"])}
+        for row in rows
+    ]
+
+
+def get_rule_progress(key: str, weeks: int = 12, limit: int = 20) -> dict:
+    """One rule's totals, weekly counts (newest first) and most recent occurrences"""
+    key = rule_key(key)
+    conn = get_db()
+    stats = conn.execute(
+        f"{_STATS_QUERY} WHERE s.rule_key = ?",
+        (key,)
+    ).fetchone()
+    if not stats:
+        conn.close()
+        raise HTTPException(status_code=404, detail="No grammar events for this rule")
+    weekly = conn.execute(
+        "SELECT week, occurrences FROM grammar_stats_weekly WHERE rule_key = ? ORDER BY week DESC LIMIT ?",
+        (key, weeks)
+    ).fetchall()
+    recent = conn.execute(
+        """SELECT message_id, chat_id, explanation, created_at FROM grammar_events
+           WHERE rule_key = ? ORDER BY created_at DESC LIMIT ?""",
+        (key, limit)
+    ).fetchall()
+    conn.close()
+    return {
+        **dict_from_row(stats),
+        "trend": _trend(stats["this_week"], stats["last_week"], stats["occurrences"]),
+        "weekly": [dict_from_row(r) for r in weekly],
+        "recent": [dict_from_row(r) for r in recent],
+    }
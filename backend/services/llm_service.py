@@ -2,10 +2,17 @@
 LLM integration service - handles communication with various LLM providers
 """
 
+import asyncio
+import time
 import httpx
 from typing import List, Optional
 from fastapi import HTTPException
-from core.config import llm_config
+from core.config import ANTHROPIC_BASE_URL, GEMINI_BASE_URL
+from core.runtime_config import get_llm_config
+from core.metrics import LLM_REQUESTS, LLM_REQUEST_SECONDS, LLM_IN_PROGRESS
+from core.tracing import span
+from services.context_planner import plan_num_ctx, keep_alive_for, note_loaded, record_ollama_timings
+from services.usage_service import record_usage
 
 
 # System prompts for different modes
@@ -15,12 +22,7 @@ SYSTEM_PROMPTS = {
 2. Gently correct grammar mistakes when they occur
 3. When you notice a grammar rule the user might benefit from learning, mention it and ask if they'd like to explore it further
 4. Keep the conversation natural and engaging
-5. Adapt to the user's level
-
-When you detect a grammar issue, format it like this:
-[GRAMMAR_DETECTED: rule_name | brief_explanation]
-
-Then continue the conversation naturally. The app will use this to offer creating a grammar lesson.""",
+5. Adapt to the user's level""",
 
     "grammar": """You are a language teacher focused on teaching a specific grammar rule. Your role is to:
 1. Explain the grammar rule clearly with examples
@@ -45,68 +47,120 @@ Structure your lessons with:
 The document content will be provided. Focus on helping the user internalize the vocabulary and structures naturally."""
 }
 
+# Appended to the free talk prompt when grammar issues are reported inline (see grammar_detector())
+GRAMMAR_TAG_INSTRUCTIONS = """
 
-async def call_llm_raw(prompt: str) -> str:
+When you detect a grammar issue, format it like this:
+[GRAMMAR_DETECTED: rule_name | brief_explanation]
+
+Then continue the conversation naturally. The app will use this to offer creating a grammar lesson."""
+
+
+async def call_llm_raw(prompt: str, kind: str = "raw", model: Optional[str] = None,
+                       json_output: bool = False, chat_id: Optional[str] = None) -> str:
     """
     Call LLM with a simple prompt string (no chat history).
     Used for utility tasks like transcription correction.
+    
+    `model` overrides the configured model (same provider); `json_output`
+    asks providers that support it for a JSON reply. `chat_id` attributes
+    the call's usage to a chat.
     """
     messages = [{"role": "user", "content": prompt}]
-    
-    if llm_config.provider == "ollama":
-        return await call_ollama(messages)
-    elif llm_config.provider == "openai":
-        return await call_openai(messages)
-    elif llm_config.provider == "anthropic":
-        return await call_anthropic(messages)
-    elif llm_config.provider == "gemini":
-        return await call_gemini(messages)
-    else:
-        raise HTTPException(status_code=400, detail=f"Unknown provider: {llm_config.provider}")
+    return await _call_provider(messages, kind, model, json_output, chat_id=chat_id)
 
 
-async def call_llm(messages: List[dict], mode: str = "free_talk", document_content: str = None) -> str:
-    """Call the configured LLM provider with chat context"""
+async def call_llm(messages: List[dict], mode: str = "free_talk", document_content: str = None,
+                   kind: Optional[str] = None, grammar_tags: bool = False, chat_id: Optional[str] = None) -> str:
+    """
+    Call the configured LLM provider with chat context (`kind` labels metrics, defaults to the mode).
+    
+    With `grammar_tags`, free talk replies report grammar issues as [GRAMMAR_DETECTED: ...] tags.
+    """
     
     system_prompt = SYSTEM_PROMPTS.get(mode, SYSTEM_PROMPTS["free_talk"])
+    if grammar_tags and mode == "free_talk":
+        system_prompt += GRAMMAR_TAG_INSTRUCTIONS
     if document_content:
         system_prompt += f"\n\n[DOCUMENT CONTENT]\n{document_content}"
     
     full_messages = [{"role": "system", "content": system_prompt}] + messages
+    return await _call_provider(full_messages, kind or mode, chat_id=chat_id, mode=mode)
+
+
+async def _call_provider(messages: List[dict], kind: str, model: Optional[str] = None,
+                         json_output: bool = False, chat_id: Optional[str] = None,
+                         mode: Optional[str] = None) -> str:
+    """Dispatch to the configured provider, recording latency, outcome and token usage"""
+    llm_config = get_llm_config()
+    provider = llm_config.provider
+    providers = {
+        "ollama": call_ollama,
+        "openai": call_openai,
+        "anthropic": call_anthropic,
+        "gemini": call_gemini,
+    }
+    if provider not in providers:
+        raise HTTPException(status_code=400, detail=f"Unknown provider: {provider}")
     
-    if llm_config.provider == "ollama":
-        return await call_ollama(full_messages)
-    elif llm_config.provider == "openai":
-        return await call_openai(full_messages)
-    elif llm_config.provider == "anthropic":
-        return await call_anthropic(full_messages)
-    elif llm_config.provider == "gemini":
-        return await call_gemini(full_messages)
-    else:
-        raise HTTPException(status_code=400, detail=f"Unknown provider: {llm_config.provider}")
+    model = model or llm_config.model
+    usage = {}
+    status = "error"
+    start = time.perf_counter()
+    try:
+        with span("llm.call", provider=provider, model=model, kind=kind), \
+                LLM_IN_PROGRESS.track_inprogress(provider), LLM_REQUEST_SECONDS.time(provider, model, kind):
+            response = await providers[provider](messages, model, json_output, usage)
+        status = "ok"
+    except asyncio.CancelledError:
+        status = "cancelled"
+        raise
+    finally:
+        LLM_REQUESTS.inc(provider, model, kind, status)
+        record_usage(provider, model, kind, chat_id, mode, status, usage, (time.perf_counter() - start) * 1000)
+    return response
 
 
-async def call_ollama(messages: List[dict]) -> str:
+async def call_ollama(messages: List[dict], model: Optional[str] = None, json_output: bool = False,
+                      usage: Optional[dict] = None) -> str:
     """Call Ollama API"""
+    llm_config = get_llm_config()
+    model = model or llm_config.model
+    num_ctx = plan_num_ctx(model, messages)
+    request_body = {
+        "model": model,
+        "messages": messages,
+        "stream": False,
+        # Without keep_alive every request would reset the model's timer to Ollama's 5 minute default
+        "keep_alive": keep_alive_for(model),
+        "options": {
+            "num_ctx": num_ctx
+        }
+    }
+    if json_output:
+        request_body["format"] = "json"
     async with httpx.AsyncClient(timeout=120.0) as client:
         try:
             response = await client.post(
                 f"{llm_config.base_url}/api/chat",
-                json={
-                    "model": llm_config.model,
-                    "messages": messages,
-                    "stream": False,
-                    "options": {
-                        "num_ctx": 8192  # Context window size (default is 2048)
-                    }
-                }
+                json=request_body
             )
             if response.status_code != 200:
                 raise HTTPException(
                     status_code=response.status_code, 
                     detail=f"Ollama API error: {response.text}"
                 )
-            return response.json()["message"]["content"]
+            body = response.json()
+            note_loaded(model, num_ctx)
+            record_ollama_timings(model, num_ctx, body)
+            if usage is not None:
+                usage.update(
+                    prompt_tokens=body.get("prompt_eval_count"),
+                    completion_tokens=body.get("eval_count"),
+                    # Server-side time to first token: loading the model plus reading the prompt
+                    ttft_ms=round((body.get("load_duration", 0) + body.get("prompt_eval_duration", 0)) / 1e6, 1),
+                )
+            return body["message"]["content"]
         except httpx.ConnectError:
             raise HTTPException(
                 status_code=503, 
@@ -114,27 +168,38 @@ async def call_ollama(messages: List[dict]) -> str:
             )
 
 
-async def call_openai(messages: List[dict]) -> str:
+async def call_openai(messages: List[dict], model: Optional[str] = None, json_output: bool = False,
+                      usage: Optional[dict] = None) -> str:
     """Call OpenAI-compatible API"""
+    llm_config = get_llm_config()
     api_key = llm_config.get_api_key()
+    request_body = {
+        "model": model or llm_config.model,
+        "messages": messages
+    }
+    if json_output:
+        request_body["response_format"] = {"type": "json_object"}
     
     async with httpx.AsyncClient(timeout=120.0) as client:
         headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
         response = await client.post(
             f"{llm_config.base_url}/v1/chat/completions",
             headers=headers,
-            json={
-                "model": llm_config.model,
-                "messages": messages
-            }
+            json=request_body
         )
         if response.status_code != 200:
             raise HTTPException(status_code=response.status_code, detail="OpenAI API error")
-        return response.json()["choices"][0]["message"]["content"]
+        body = response.json()
+        if usage is not None and body.get("usage"):
+            usage.update(prompt_tokens=body["usage"].get("prompt_tokens"),
+                         completion_tokens=body["usage"].get("completion_tokens"))
+        return body["choices"][0]["message"]["content"]
 
 
-async def call_anthropic(messages: List[dict]) -> str:
-    """Call Anthropic API"""
+async def call_anthropic(messages: List[dict], model: Optional[str] = None, json_output: bool = False,
+                         usage: Optional[dict] = None) -> str:
+    """Call Anthropic API (no JSON mode: JSON replies rely on the prompt)"""
+    llm_config = get_llm_config()
     api_key = llm_config.get_api_key()
     
     if not api_key:
@@ -154,14 +219,14 @@ async def call_anthropic(messages: List[dict]) -> str:
     
     async with httpx.AsyncClient(timeout=120.0) as client:
         response = await client.post(
-            "https://api.anthropic.com/v1/messages",
+            f"{ANTHROPIC_BASE_URL}/v1/messages",
             headers={
                 "x-api-key": api_key,
                 "anthropic-version": "2023-06-01",
                 "Content-Type": "application/json"
             },
             json={
-                "model": llm_config.model,
+                "model": model or llm_config.model,
                 "max_tokens": 4096,
                 "system": system.strip(),
                 "messages": chat_messages
@@ -169,12 +234,17 @@ async def call_anthropic(messages: List[dict]) -> str:
         )
         if response.status_code != 200:
             raise HTTPException(status_code=response.status_code, detail="Anthropic API error")
-        return response.json()["content"][0]["text"]
+        body = response.json()
+        if usage is not None and body.get("usage"):
+            usage.update(prompt_tokens=body["usage"].get("input_tokens"),
+                         completion_tokens=body["usage"].get("output_tokens"))
+        return body["content"][0]["text"]
 
 
-async def call_gemini(messages: List[dict]) -> str:
+async def call_gemini(messages: List[dict], model: Optional[str] = None, json_output: bool = False,
+                      usage: Optional[dict] = None) -> str:
     """Call Google Gemini API"""
-    
+    llm_config = get_llm_config()
     api_key = llm_config.get_api_key()
     
     if not api_key:
@@ -203,10 +273,10 @@ async def call_gemini(messages: List[dict]) -> str:
             })
     
     # Use model from config or default to gemini-2.0-flash
-    model = llm_config.model if llm_config.model else "gemini-2.0-flash-lite"
+    model = model or llm_config.model or "gemini-2.0-flash-lite"
     
     # Gemini API endpoint
-    api_url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
+    api_url = f"{GEMINI_BASE_URL}/v1beta/models/{model}:generateContent"
     
     async with httpx.AsyncClient(timeout=120.0) as client:
         request_body = {
@@ -218,6 +288,8 @@ async def call_gemini(messages: List[dict]) -> str:
                 "maxOutputTokens": 4096,
             }
         }
+        if json_output:
+            request_body["generationConfig"]["responseMimeType"] = "application/json"
         
         # Add system instruction if present
         if system_instruction.strip():
@@ -246,6 +318,9 @@ async def call_gemini(messages: List[dict]) -> str:
             )
         
         result = response.json()
+        if usage is not None and result.get("usageMetadata"):
+            usage.update(prompt_tokens=result["usageMetadata"].get("promptTokenCount"),
+                         completion_tokens=result["usageMetadata"].get("candidatesTokenCount"))
         
         # Extract text from response
         try:
@@ -0,0 +1,148 @@
+"""
+Prefetch service - speculative generation of the next tutor reply.
+
+In grammar and document chats the next step (the next exercise, the next
+quiz item) follows predictably from the learner's answer. While the learner
+types, the client sends the draft and the reply to history + draft is
+generated in the background, so the LLM call has often finished by the time
+the message is sent. send_message takes the result only if its key (history
+length, sent text, LLM settings version) still matches; an edited draft,
+another message in between, changed settings or expiry discard it and the
+reply is generated as before.
+
+Speculations run in their own tasks, at most PREFETCH_CONCURRENCY at a time,
+and a newer draft for the same chat cancels the older one. Entries live in
+this process only, so with several API workers a prefetch made on one worker
+is a miss on the others.
+"""
+
+import asyncio
+import contextvars
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from core.config import PREFETCH_TTL_S, PREFETCH_CONCURRENCY, PREFETCH_MAX_ENTRIES
+from core.metrics import LLM_PREFETCH
+
+OUTCOMES = ("started", "hit", "hit_pending", "miss", "stale", "expired", "failed", "replaced")
+
+_entries: Dict[str, "_Prefetch"] = {}
+_counts = {outcome: 0 for outcome in OUTCOMES}
+_slots: Optional[asyncio.Semaphore] = None
+_slots_loop = None
+
+
+class _Prefetch:
+    def __init__(self, key: tuple, task: asyncio.Task):
+        self.key = key
+        self.task = task
+        self.created = time.monotonic()
+
+    def expired(self) -> bool:
+        return time.monotonic() - self.created > PREFETCH_TTL_S
+
+
+def _count(outcome: str) -> None:
+    _counts[outcome] += 1
+    LLM_PREFETCH.inc(outcome)
+
+
+def _semaphore() -> asyncio.Semaphore:
+    global _slots, _slots_loop
+    loop = asyncio.get_running_loop()
+    if _slots_loop is not loop:
+        _slots, _slots_loop = asyncio.Semaphore(PREFETCH_CONCURRENCY), loop
+    return _slots
+
+
+def _discard(chat_id: str, outcome: str) -> None:
+    entry = _entries.pop(chat_id, None)
+    if entry:
+        entry.task.cancel()
+        _count(outcome)
+
+
+def _prune() -> None:
+    for chat_id in [c for c, entry in _entries.items() if entry.expired()]:
+        _discard(chat_id, "expired")
+    while len(_entries) > PREFETCH_MAX_ENTRIES:
+        _discard(next(iter(_entries)), "expired")
+
+
+def _consume_exception(task: asyncio.Task) -> None:
+    # Failures surface as a miss in take_prefetched(); don't log them as unretrieved
+    if not task.cancelled():
+        task.exception()
+
+
+async def _run(generate: Callable[[], Awaitable[str]]) -> str:
+    async with _semaphore():
+        return await generate()
+
+
+def start_prefetch(chat_id: str, key: tuple, generate: Callable[[], Awaitable[str]]) -> str:
+    """
+    Start generating a speculative reply for `chat_id` unless one for the same
+    key is already cached. Returns "pending", "ready" or "started".
+    """
+    _prune()
+    entry = _entries.get(chat_id)
+    if entry and entry.key == key:
+        return "ready" if entry.task.done() else "pending"
+    if entry:
+        _discard(chat_id, "replaced")
+    # A fresh context, so the speculation's spans don't land in the request trace that started it
+    task = asyncio.create_task(_run(generate), context=contextvars.Context())
+    task.add_done_callback(_consume_exception)
+    _entries[chat_id] = _Prefetch(key, task)
+    _count("started")
+    return "started"
+
+
+async def take_prefetched(chat_id: str, key: tuple) -> Optional[str]:
+    """The speculative reply for `chat_id` if it was made for `key`, waiting for it if still running"""
+    entry = _entries.pop(chat_id, None)
+    if entry is None:
+        _count("miss")
+        return None
+    if entry.key != key:
+        entry.task.cancel()
+        _count("stale")
+        return None
+    if entry.expired():
+        entry.task.cancel()
+        _count("expired")
+        return None
+
+    pending = not entry.task.done()
+    try:
+        response = await asyncio.shield(entry.task)
+    except asyncio.CancelledError:
+        if not entry.task.cancelled():
+            # The request itself was cancelled
+            entry.task.cancel()
+            raise
+        _count("failed")
+        return None
+    except Exception:
+        _count("failed")
+        return None
+    _count("hit_pending" if pending else "hit")
+    return response
+
+
+def discard_prefetch(chat_id: str) -> None:
+    """Drop a chat's speculation (e.g. the chat was deleted)"""
+    _discard(chat_id, "stale")
+
+
+def prefetch_stats() -> dict:
+    """Outcome counts since startup; hits include speculations that were still running when used"""
+    hits = _counts["hit"] + _counts["hit_pending"]
+    lookups = hits + _counts["miss"] + _counts["stale"] + _counts["expired"] + _counts["failed"]
+    return {
+        **_counts,
+        "cached": len(_entries),
+        "hit_rate": round(hits / lookups, 3) if lookups else None,
+        "used_rate": round(hits / _counts["started"], 3) if _counts["started"] else None,
+    }
@@ -0,0 +1,182 @@
+"""
+Readiness service - background probes of the app's dependencies, served from a cache by /ready
+"""
+
+import asyncio
+import importlib.util
+import shutil
+import sqlite3
+import time
+from typing import Dict, List
+from urllib.parse import urlparse
+
+import httpx
+
+from core.config import (
+    DB_PATH, AUDIO_UPLOAD_DIR, ANTHROPIC_BASE_URL, GEMINI_BASE_URL,
+    READY_PROBE_INTERVAL_S, READY_PROBE_TIMEOUT_S, READY_MIN_FREE_DISK_MB,
+)
+from core.runtime_config import get_llm_config, get_whisper_config
+from services.warmup_service import is_ready as warmup_finished
+
+# A probe result is only trusted for this long; a stuck prober makes the replica not ready
+PROBE_TTL_S = READY_PROBE_INTERVAL_S * 3
+# The hosted OpenAI API needs a key; other OpenAI-compatible base_urls may not
+OPENAI_API_HOST = "api.openai.com"
+
+_results: Dict[str, dict] = {}
+_tasks: List[asyncio.Task] = []
+
+
+class ProbeFailed(Exception):
+    pass
+
+
+class ProbeSkipped(Exception):
+    pass
+
+
+async def _probe_ollama() -> str:
+    llm_config = get_llm_config()
+    if llm_config.provider != "ollama":
+        raise ProbeSkipped(f"provider is {llm_config.provider}")
+    async with httpx.AsyncClient(timeout=READY_PROBE_TIMEOUT_S) as client:
+        response = await client.get(f"{llm_config.base_url}/api/tags")
+    if response.status_code != 200:
+        raise ProbeFailed(f"/api/tags returned {response.status_code}")
+    models = {m.get("name") for m in response.json().get("models", [])}
+    model = llm_config.model
+    if model not in models and f"{model}:latest" not in models:
+        raise ProbeFailed(f"model {model} not pulled")
+    return f"{len(models)} models"
+
+
+async def _probe_provider() -> str:
+    """
+    Hosted providers: the API host answers (any HTTP status below 500) and a key
+    is configured. OpenAI-compatible servers on another base_url (LM Studio,
+    vLLM, llama.cpp) may run without a key.
+    """
+    llm_config = get_llm_config()
+    provider = llm_config.provider
+    if provider == "ollama":
+        raise ProbeSkipped("covered by the ollama probe")
+    needs_key = provider != "openai" or urlparse(llm_config.base_url).hostname == OPENAI_API_HOST
+    if needs_key and not llm_config.get_api_key():
+        raise ProbeFailed(f"no API key for {provider}")
+    url = {"anthropic": ANTHROPIC_BASE_URL, "gemini": GEMINI_BASE_URL}.get(provider, llm_config.base_url)
+    async with httpx.AsyncClient(timeout=READY_PROBE_TIMEOUT_S) as client:
+        response = await client.get(url)
+    if response.status_code >= 500:
+        raise ProbeFailed(f"{url} returned {response.status_code}")
+    return url
+
+
+async def _probe_whisper() -> str:
+    if get_whisper_config().provider == "openai":
+        raise ProbeSkipped("transcription uses the OpenAI API")
+    from services.speech_service import call_speech_server, whisper_model_state
+    reply = await call_speech_server({"op": "ping"}, timeout=READY_PROBE_TIMEOUT_S)
+    if reply is not None:
+        return f"speech server, models: {', '.join(reply.get('models', [])) or 'none loaded'}"
+    if importlib.util.find_spec("faster_whisper") is None:
+        raise ProbeSkipped("faster-whisper not installed")
+    state, error = whisper_model_state()
+    if state == "failed":
+        raise ProbeFailed(f"model failed to load: {error}")
+    return state
+
+
+def _write_probe() -> str:
+    # Short busy timeout: a locked database should fail the probe, not hang it
+    conn = sqlite3.connect(DB_PATH, timeout=READY_PROBE_TIMEOUT_S)
+    try:
+        conn.execute(
+            "INSERT OR REPLACE INTO health_probes (name, checked_at) VALUES ('ready', ?)",
+            (time.time(),)
+        )
+        conn.commit()
+    except sqlite3.OperationalError as e:
+        raise ProbeFailed(str(e))
+    finally:
+        conn.close()
+    return "write ok"
+
+
+async def _probe_sqlite() -> str:
+    return await asyncio.to_thread(_write_probe)
+
+
+async def _probe_disk() -> str:
+    free_mb = (await asyncio.to_thread(shutil.disk_usage, AUDIO_UPLOAD_DIR)).free // (1024 * 1024)
+    if free_mb < READY_MIN_FREE_DISK_MB:
+        raise ProbeFailed(f"{free_mb} MB free, need {READY_MIN_FREE_DISK_MB} MB")
+    return f"{free_mb} MB free"
+
+
+PROBES = {
+    "ollama": _probe_ollama,
+    "provider": _probe_provider,
+    "whisper": _probe_whisper,
+    "sqlite": _probe_sqlite,
+    "disk": _probe_disk,
+}
+
+
+async def run_probe(name: str) -> dict:
+    """Run one probe and cache its result"""
+    start = time.perf_counter()
+    try:
+        detail = await PROBES[name]()
+        status = "ok"
+    except ProbeSkipped as e:
+        status, detail = "skipped", str(e)
+    except ProbeFailed as e:
+        status, detail = "failed", str(e)
+    except Exception as e:
+        status, detail = "failed", str(e) or type(e).__name__
+    result = {
+        "status": status,
+        "detail": detail,
+        "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+        "checked_at": time.time(),
+    }
+    _results[name] = result
+    return result
+
+
+async def _probe_loop(name: str) -> None:
+    while True:
+        await run_probe(name)
+        await asyncio.sleep(READY_PROBE_INTERVAL_S)
+
+
+def start_prober() -> None:
+    if not _tasks:
+        _tasks.extend(asyncio.create_task(_probe_loop(name)) for name in PROBES)
+
+
+def stop_prober() -> None:
+    for task in _tasks:
+        task.cancel()
+    _tasks.clear()
+
+
+def readiness() -> dict:
+    """Cached probe results; never touches a dependency"""
+    now = time.time()
+    checks = {}
+    for name in PROBES:
+        result = _results.get(name)
+        if result is None:
+            checks[name] = {"status": "pending"}
+            continue
+        age = now - result["checked_at"]
+        checks[name] = {**result, "age_s": round(age, 1)}
+        if age > PROBE_TTL_S:
+            checks[name]["status"] = "stale"
+    checks["warmup"] = {"status": "ok" if warmup_finished() else "pending"}
+    return {
+        "ready": all(check["status"] in ("ok", "skipped") for check in checks.values()),
+        "checks": checks,
+    }
@@ -0,0 +1,170 @@
+"""
+Search service - full-text search over chats, messages, documents and grammar rules
+"""
+
+import html
+import re
+from typing import List, Optional
+
+from fastapi import HTTPException
+
+from core.database import get_db, dict_from_row
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_END = "</mark>"
+# snippet() brackets matches with these control characters, which cannot occur in
+# stored text; the snippet is HTML-escaped before they become <mark> tags
+_MATCH_START = "\x02"
+_MATCH_END = "\x03"
+SNIPPET_TOKENS = 12
+
+_TERM_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+# Searchable sources: the FTS table to rank with and the query that loads the
+# details (including the highlighted snippet) for the rows of one result page.
+_SOURCES = {
+    "chat": ("chats_fts", """
+        SELECT chats_fts.rowid AS rowid, c.id AS id, c.id AS chat_id, NULL AS document_id,
+               c.title AS title, NULL AS role,
+               snippet(chats_fts, 0, :hl_start, :hl_end, '…', :tokens) AS snippet,
+               c.updated_at AS created_at
+        FROM chats_fts
+        JOIN chats c ON c.search_rowid = chats_fts.rowid
+    """),
+    "message": ("messages_fts", """
+        SELECT messages_fts.rowid AS rowid, m.id AS id, m.chat_id AS chat_id, NULL AS document_id,
+               c.title AS title, m.role AS role,
+               snippet(messages_fts, 0, :hl_start, :hl_end, '…', :tokens) AS snippet,
+               m.created_at AS created_at
+        FROM messages_fts
+        JOIN messages m ON m.search_rowid = messages_fts.rowid
+        JOIN chats c ON c.id = m.chat_id
+    """),
+    "document": ("documents_fts", """
+        SELECT documents_fts.rowid AS rowid, d.id AS id, NULL AS chat_id, d.id AS document_id,
+               d.filename AS title, NULL AS role,
+               snippet(documents_fts, 0, :hl_start, :hl_end, '…', :tokens) AS snippet,
+               d.created_at AS created_at
+        FROM documents_fts
+        JOIN documents d ON d.search_rowid = documents_fts.rowid
+    """),
+    "document_sentence": ("document_sentences_fts", """
+        SELECT document_sentences_fts.rowid AS rowid, d.id AS id, NULL AS chat_id, d.id AS document_id,
+               d.filename AS title, NULL AS role,
+               snippet(document_sentences_fts, 0, :hl_start, :hl_end, '…', :tokens) AS snippet,
+               d.created_at AS created_at
+        FROM document_sentences_fts
+        JOIN document_sentences s ON s.search_rowid = document_sentences_fts.rowid
+        JOIN documents d ON d.id = s.doc_id
+    """),
+    "grammar_rule": ("grammar_rules_fts", """
+        SELECT grammar_rules_fts.rowid AS rowid, g.id AS id, g.chat_id AS chat_id, NULL AS document_id,
+               g.name AS title, NULL AS role,
+               snippet(grammar_rules_fts, -1, :hl_start, :hl_end, '…', :tokens) AS snippet,
+               g.created_at AS created_at
+        FROM grammar_rules_fts
+        JOIN grammar_rules g ON g.search_rowid = grammar_rules_fts.rowid
+    """),
+}
+
+SEARCH_SCOPES = {
+    "chats": ["chat"],
+    "messages": ["message"],
+    "documents": ["document", "document_sentence"],
+    "grammar": ["grammar_rule"],
+}
+
+
+def build_match_query(text: str) -> Optional[str]:
+    """
+    Turn free user input into an FTS5 query.
+
+    Every word must match (AND); each word also matches as a prefix so that
+    "Dativ" finds "Dativobjekt". Quoting the terms keeps FTS5 syntax characters
+    in user input from being interpreted.
+    """
+    terms = _TERM_RE.findall(text)
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def _highlight(snippet: Optional[str]) -> Optional[str]:
+    """Escape a snippet's text as HTML and mark its matches"""
+    if snippet is None:
+        return None
+    escaped = html.escape(snippet, quote=False)
+    return escaped.replace(_MATCH_START, HIGHLIGHT_START).replace(_MATCH_END, HIGHLIGHT_END)
+
+
+def search(q: str, scopes: Optional[List[str]] = None, limit: int = 20, offset: int = 0) -> dict:
+    """
+    Search chats, documents and grammar rules.
+
+    Returns:
+        Dict with ranked results (HTML-escaped snippets with matches in <mark>) and pagination info
+    """
+    scopes = scopes or list(SEARCH_SCOPES)
+    unknown = set(scopes) - set(SEARCH_SCOPES)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown search scope: {', '.join(sorted(unknown))}")
+
+    match_query = build_match_query(q)
+    if not match_query:
+        return {"query": q, "results": [], "limit": limit, "offset": offset, "has_more": False}
+
+    sources = [source for scope in scopes for source in SEARCH_SCOPES[scope]]
+    params = {
+        "query": match_query,
+        "hl_start": _MATCH_START,
+        "hl_end": _MATCH_END,
+        "tokens": SNIPPET_TOKENS,
+    }
+    
+    conn = get_db()
+    
+    # Rank every match across sources, but only keep the requested page
+    ranking = " UNION ALL ".join(
+        f"SELECT '{source}' AS type, rowid, bm25({_SOURCES[source][0]}) AS rank "
+        f"FROM {_SOURCES[source][0]} WHERE {_SOURCES[source][0]} MATCH :query"
+        for source in sources
+    )
+    page = conn.execute(
+        f"SELECT type, rowid, rank FROM ({ranking}) ORDER BY rank LIMIT :limit OFFSET :offset",
+        {"query": match_query, "limit": limit + 1, "offset": offset}
+    ).fetchall()
+    has_more = len(page) > limit
+    page = page[:limit]
+    
+    # Snippets are comparatively expensive, so build them for the page rows only
+    details = {}
+    for source in {row["type"] for row in page}:
+        fts_table, detail_query = _SOURCES[source]
+        rowids = [row["rowid"] for row in page if row["type"] == source]
+        placeholders = ",".join(str(int(r)) for r in rowids)
+        rows = conn.execute(
+            f"{detail_query} WHERE {fts_table} MATCH :query AND {fts_table}.rowid IN ({placeholders})",
+            params
+        ).fetchall()
+        for row in rows:
+            details[(source, row["rowid"])] = row
+    
+    conn.close()
+    
+    results = []
+    for row in page:
+        detail = details.get((row["type"], row["rowid"]))
+        if detail is None:
+            continue
+        result = {"type": row["type"], **dict_from_row(detail), "rank": row["rank"]}
+        del result["rowid"]
+        result["snippet"] = _highlight(result["snippet"])
+        results.append(result)
+    
+    return {
+        "query": q,
+        "results": results,
+        "limit": limit,
+        "offset": offset,
+        "has_more": has_more,
+    }
@@ -0,0 +1,139 @@
+"""
+Sentence segmentation for German and English text.
+
+Rule based: a sentence ends at terminal punctuation followed by whitespace,
+unless the word before the period is a known abbreviation, an initial or an
+ordinal number ("3. Mai"), or the next word starts in lowercase. Blank lines
+always end a sentence.
+"""
+
+import re
+from typing import Iterable, Iterator, Tuple
+
+ABBREVIATIONS = frozenset({
+    # German
+    "z.b.", "z.t.", "u.a.", "d.h.", "u.u.", "o.ä.", "o.g.", "s.o.", "s.u.", "v.a.",
+    "usw.", "bzw.", "ca.", "vgl.", "evtl.", "ggf.", "inkl.", "exkl.", "ggü.", "bzgl.",
+    "dr.", "prof.", "hr.", "fr.", "hrn.", "nr.", "str.", "abs.", "abb.", "kap.", "s.",
+    "mio.", "mrd.", "jh.", "jhd.", "tel.", "max.", "min.", "zzgl.", "gem.", "geb.",
+    "etc.", "allg.", "bspw.", "eigtl.", "insb.", "sog.", "urspr.", "z.zt.",
+    # English
+    "e.g.", "i.e.", "mr.", "mrs.", "ms.", "st.", "vs.", "no.", "approx.", "dept.",
+    "fig.", "jr.", "sr.", "inc.", "ltd.", "co.", "cf.", "al.",
+})
+
+MONTHS = frozenset({
+    "januar", "jänner", "februar", "märz", "april", "mai", "juni", "juli", "august",
+    "september", "oktober", "november", "dezember",
+    "jan", "feb", "mär", "apr", "jun", "jul", "aug", "sep", "sept", "okt", "nov", "dez",
+})
+
+CHUNK_SIZE = 8192
+
+# Terminal punctuation plus closing quotes/brackets and the following whitespace,
+# or a blank line (paragraph break).
+_BOUNDARY_RE = re.compile(r"[.!?…]+[\"'»«“”‘’)\]]*\s+|\n[ \t]*\n\s*")
+_LAST_TOKEN_RE = re.compile(r"\S+$")
+_NEXT_WORD_RE = re.compile(r"[^\W\d_]+")
+_ORDINAL_RE = re.compile(r"\d{1,4}\.")
+_INITIAL_RE = re.compile(r"[^\W\d_]\.")
+_LEADING_PUNCT_RE = re.compile(r"^[(\[\"'„“‚‘»«]+")
+
+
+def _is_boundary(buf: str, sentence_start: int, match: "re.Match") -> bool:
+    """Decide whether a candidate boundary really ends a sentence."""
+    punct = match.group()
+    if punct[0] in "\r\n":
+        return True
+
+    next_char = buf[match.end()]
+    if next_char.islower():
+        return False
+
+    if not punct.startswith(".") or punct.startswith(".."):
+        return True
+
+    token = _LAST_TOKEN_RE.search(buf, sentence_start, match.start() + 1)
+    if not token:
+        return True
+    word = _LEADING_PUNCT_RE.sub("", token.group()).lower()
+
+    if word in ABBREVIATIONS or _INITIAL_RE.fullmatch(word):
+        return False
+
+    if _ORDINAL_RE.fullmatch(word):
+        next_word = _NEXT_WORD_RE.match(buf, match.end())
+        if next_word and next_word.group().lower().rstrip(".") in MONTHS:
+            return False
+
+    return True
+
+
+def _make_sentence(buf: str, base: int, start: int, end: int):
+    """Build a (start_offset, end_offset, text) tuple, or None for fragments without words."""
+    raw = buf[start:end]
+    stripped = raw.lstrip()
+    start += len(raw) - len(stripped)
+    stripped = stripped.rstrip()
+    end = start + len(stripped)
+    if not _NEXT_WORD_RE.search(stripped):
+        return None
+    return base + start, base + end, " ".join(stripped.split())
+
+
+def _scan(buf: str, base: int, final: bool):
+    """
+    Yield the complete sentences in a buffer.
+
+    Returns the offset in the buffer where the unfinished remainder starts.
+    Unless final, boundaries too close to the end of the buffer to judge are
+    left for the next round.
+    """
+    start = 0
+    pos = 0
+    while True:
+        match = _BOUNDARY_RE.search(buf, pos)
+        if not match or match.end() >= len(buf):
+            break
+        next_word = _NEXT_WORD_RE.match(buf, match.end())
+        if not final and next_word and next_word.end() >= len(buf):
+            break
+        pos = match.end()
+        if not _is_boundary(buf, start, match):
+            continue
+        sentence = _make_sentence(buf, base, start, match.end())
+        if sentence:
+            yield sentence
+        start = match.end()
+    return start
+
+
+def segment(chunks: Iterable[str]) -> Iterator[Tuple[int, int, str]]:
+    """
+    Split streamed text into sentences.
+
+    Args:
+        chunks: Consecutive pieces of the text (pages, reads, ...)
+
+    Yields:
+        (start_offset, end_offset, text) where offsets index into the
+        concatenated input and text has its whitespace collapsed
+    """
+    buf = ""
+    base = 0
+
+    for chunk in chunks:
+        buf += chunk
+        start = yield from _scan(buf, base, final=False)
+        buf = buf[start:]
+        base += start
+
+    start = yield from _scan(buf, base, final=True)
+    sentence = _make_sentence(buf, base, start, len(buf))
+    if sentence:
+        yield sentence
+
+
+def segment_text(text: str) -> Iterator[Tuple[int, int, str]]:
+    """Split a complete text into sentences, streaming it in fixed-size chunks."""
+    return segment(text[i:i + CHUNK_SIZE] for i in range(0, len(text), CHUNK_SIZE))
@@ -1,19 +1,33 @@
 """
 Speech-to-text service using faster-whisper or OpenAI Whisper API.
+
+With SPEECH_SERVER_SOCKET set, local transcription goes to the shared speech
+server (speech_server.py) and only falls back to a model loaded in this
+process when the server cannot be reached.
 """
 
+import asyncio
 import os
 import tempfile
+import threading
+import time
 from typing import Optional, Tuple
 from fastapi import HTTPException, UploadFile
-from core.config import whisper_config, AUDIO_UPLOAD_DIR
+from core.config import AUDIO_UPLOAD_DIR, WhisperConfig, SPEECH_SERVER_SOCKET, SPEECH_SERVER_TIMEOUT_S
+from core.ipc import request as ipc_request
+from core.runtime_config import get_whisper_config, on_config_change
+from core.metrics import TRANSCRIBE_SECONDS, TRANSCRIBE_IN_PROGRESS
+from core.tracing import span
+from core.workers import run_in_pool, whisper_pool
 
 _whisper_model = None
+_whisper_error: Optional[str] = None
 
 
 def get_whisper_model():
     """Lazy load faster-whisper model."""
-    global _whisper_model
+    global _whisper_model, _whisper_error
+    whisper_config = get_whisper_config()
     
     if _whisper_model is None:
         try:
@@ -23,13 +37,16 @@ def get_whisper_model():
                 device="cpu",
                 compute_type="int8"
             )
+            _whisper_error = None
             print(f"Loaded Whisper model: {whisper_config.model}")
         except ImportError:
+            _whisper_error = "faster-whisper not installed"
             raise HTTPException(
                 status_code=500,
                 detail="faster-whisper not installed. Run: pip install faster-whisper"
             )
         except Exception as e:
+            _whisper_error = str(e)
             raise HTTPException(
                 status_code=500,
                 detail=f"Failed to load Whisper model: {str(e)}"
@@ -38,6 +55,24 @@ def get_whisper_model():
     return _whisper_model
 
 
+def _on_whisper_config_change(old: WhisperConfig, new: WhisperConfig) -> None:
+    """Drop the loaded model when another one is configured; the next transcription loads it"""
+    global _whisper_model, _whisper_error
+    if old.model != new.model:
+        _whisper_model = None
+        _whisper_error = None
+
+
+on_config_change("whisper", _on_whisper_config_change)
+
+
+def whisper_model_state() -> Tuple[str, Optional[str]]:
+    """("loaded" | "failed" | "not_loaded", last load error)"""
+    if _whisper_model is not None:
+        return "loaded", None
+    return ("failed" if _whisper_error else "not_loaded"), _whisper_error
+
+
 async def correct_transcription(text: str, language: str = "German", chat_history: list = None) -> str:
     """Use LLM to correct transcription errors using chat context."""
     from services.llm_service import call_llm_raw
@@ -95,11 +130,13 @@ async def transcribe_audio(
     chat_history: list = None
 ) -> Tuple[str, str, Optional[str], Optional[float]]:
     """Transcribe audio file to text with optional LLM correction."""
+    whisper_config = get_whisper_config()
     
-    if whisper_config.provider == "openai":
-        original_text, lang, conf = await transcribe_with_openai(audio_file, language)
-    else:
-        original_text, lang, conf = await transcribe_with_faster_whisper(audio_file, language)
+    with span("transcribe", provider=whisper_config.provider, model=whisper_config.model):
+        if whisper_config.provider == "openai":
+            original_text, lang, conf = await transcribe_with_openai(audio_file, language)
+        else:
+            original_text, lang, conf = await transcribe_with_faster_whisper(audio_file, language)
     
     corrected_text = original_text
     
@@ -110,42 +147,117 @@ async def transcribe_audio(
             "ru": "Russian", "ja": "Japanese", "zh": "Chinese", "ko": "Korean",
         }
         lang_name = lang_names.get(lang or language or whisper_config.language, "German")
-        corrected_text = await correct_transcription(original_text, lang_name, chat_history)
+        with span("transcription.correct", language=lang_name):
+            corrected_text = await correct_transcription(original_text, lang_name, chat_history)
     
     return corrected_text, original_text, lang, conf
 
 
+def decode_audio(model, source, language: Optional[str], stop: Optional[threading.Event] = None):
+    """
+    Run Whisper on a file path or file object (blocking; called in a Whisper pool).
+    Setting `stop` (the request was cancelled) ends decoding after the current segment.
+    """
+    if stop is not None and stop.is_set():
+        return [], None
+    segments, info = model.transcribe(
+        source,
+        language=language if language else None,
+        task="transcribe",
+        beam_size=5,
+        vad_filter=True,
+        vad_parameters=dict(min_silence_duration_ms=500)
+    )
+    # Segments are decoded lazily, so iterate here rather than on the event loop
+    text_parts = []
+    for segment in segments:
+        text_parts.append(segment.text.strip())
+        if stop is not None and stop.is_set():
+            break
+    return text_parts, info
+
+
+async def call_speech_server(header: dict, timeout: float, payload: Optional[bytes] = None) -> Optional[dict]:
+    """Send a request to the shared speech server; None if it is not configured or not reachable"""
+    if not SPEECH_SERVER_SOCKET:
+        return None
+    try:
+        reply, _ = await ipc_request(SPEECH_SERVER_SOCKET, header, payload, timeout=timeout)
+    except (OSError, asyncio.IncompleteReadError):
+        # Not running (no socket / refused) or went away mid-request
+        return None
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Speech server timed out")
+    return reply
+
+
+def _read_bytes(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+async def _transcribe_remote(path: str, language: Optional[str], model: str) -> Optional[Tuple[str, Optional[str], Optional[float]]]:
+    header = {"op": "transcribe", "path": path, "language": language, "model": model}
+    with span("speech_server.transcribe", model=model):
+        start = time.perf_counter()
+        reply = await call_speech_server(header, SPEECH_SERVER_TIMEOUT_S)
+        if reply is not None and reply.get("code") == "path_unreadable":
+            # The server does not share our filesystem: send the audio itself
+            audio = await asyncio.to_thread(_read_bytes, path)
+            reply = await call_speech_server({**header, "path": None}, SPEECH_SERVER_TIMEOUT_S, audio)
+    if reply is None:
+        return None
+    if not reply.get("ok"):
+        raise HTTPException(status_code=500, detail=f"Transcription failed: {reply.get('error')}")
+    TRANSCRIBE_SECONDS.observe(time.perf_counter() - start, model)
+    return reply["text"], reply["language"], reply["probability"]
+
+
 async def transcribe_with_faster_whisper(
     audio_file: UploadFile,
     language: Optional[str] = None
 ) -> Tuple[str, Optional[str], Optional[float]]:
     """Transcribe using local faster-whisper."""
+    whisper_config = get_whisper_config()
     temp_path = None
     try:
-        content = await audio_file.read()
-        ext = os.path.splitext(audio_file.filename or "audio.wav")[1] or ".wav"
+        with span("audio.upload"):
+            content = await audio_file.read()
+            ext = os.path.splitext(audio_file.filename or "audio.wav")[1] or ".wav"
+            
+            with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as temp_file:
+                temp_file.write(content)
+                temp_path = temp_file.name
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as temp_file:
-            temp_file.write(content)
-            temp_path = temp_file.name
-        
-        model = get_whisper_model()
         transcribe_language = language or whisper_config.language
         
-        segments, info = model.transcribe(
-            temp_path,
-            language=transcribe_language if transcribe_language else None,
-            task="transcribe",
-            beam_size=5,
-            vad_filter=True,
-            vad_parameters=dict(min_silence_duration_ms=500)
-        )
+        # The server reads the temp file itself, so the audio is not copied over the socket
+        with TRANSCRIBE_IN_PROGRESS.track_inprogress():
+            remote = await _transcribe_remote(temp_path, transcribe_language, whisper_config.model)
+        if remote is not None:
+            return remote
+        
+        with span("whisper.load_model"):
+            model = await run_in_pool(whisper_pool, get_whisper_model)
         
-        text_parts = [segment.text.strip() for segment in segments]
+        stop = threading.Event()
+        with span("whisper.decode", bytes=len(content)), TRANSCRIBE_IN_PROGRESS.track_inprogress(), \
+                TRANSCRIBE_SECONDS.time(whisper_config.model):
+            try:
+                text_parts, info = await run_in_pool(
+                    whisper_pool, decode_audio, model, temp_path, transcribe_language, stop
+                )
+            except asyncio.CancelledError:
+                # The pool thread can't be interrupted; it stops after the segment it is decoding
+                stop.set()
+                raise
         full_text = " ".join(text_parts)
         
         return full_text, info.language, info.language_probability
         
+    except HTTPException:
+        # Already carries the right status (e.g. 504 from the speech server)
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Transcription failed: {str(e)}")
     finally:
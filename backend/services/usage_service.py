@@ -0,0 +1,192 @@
+"""
+Usage service - token, latency and cost accounting for LLM calls.
+
+Every provider call records one row: provider, model, kind (chat mode,
+"grammar", "grading", ...), the chat it was made for, prompt and completion
+tokens as reported by the provider, total latency and time to first token.
+Time to first token is only known for Ollama, which reports its load and
+prompt evaluation time; the hosted APIs are called without streaming, so
+their rows leave it empty and their latency is the only comparable figure.
+
+Rows are buffered in memory and written in one transaction every
+USAGE_FLUSH_S, or as soon as USAGE_BATCH_SIZE are pending, by a background
+task, so a chat request never waits for the insert. A clean shutdown flushes
+the buffer; rows of a killed worker are lost.
+
+Costs are estimated when querying, from LLM_PRICES (local Ollama models are
+free), so updating a price also updates past figures.
+"""
+
+import asyncio
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from fastapi import HTTPException
+
+from core.config import USAGE_FLUSH_S, USAGE_BATCH_SIZE, LLM_PRICES
+from core.database import get_db
+from core.metrics import LLM_TOKENS
+
+GROUPS = {
+    "chat": "chat_id",
+    "mode": "mode",
+    "provider": "provider",
+    "model": "model",
+    "kind": "kind",
+    "day": "substr(created_at, 1, 10)",
+}
+
+_pending: List[tuple] = []
+_pending_lock = threading.Lock()
+_wake: Optional[asyncio.Event] = None
+_writer: Optional[asyncio.Task] = None
+
+
+def _utc_timestamp(moment: datetime) -> str:
+    """Same format as the CURRENT_TIMESTAMP defaults of the other tables"""
+    return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def record_usage(provider: str, model: str, kind: str, chat_id: Optional[str], mode: Optional[str],
+                 status: str, usage: dict, latency_ms: float) -> None:
+    """Queue one LLM call for the usage table (`usage` holds what the provider reported)"""
+    prompt_tokens = usage.get("prompt_tokens")
+    completion_tokens = usage.get("completion_tokens")
+    if prompt_tokens:
+        LLM_TOKENS.inc(provider, model, kind, "prompt", amount=prompt_tokens)
+    if completion_tokens:
+        LLM_TOKENS.inc(provider, model, kind, "completion", amount=completion_tokens)
+    row = (
+        _utc_timestamp(datetime.now(timezone.utc)), provider, model, kind, chat_id, mode, chat_id, status,
+        prompt_tokens, completion_tokens, round(latency_ms, 1), usage.get("ttft_ms")
+    )
+    with _pending_lock:
+        _pending.append(row)
+        full = len(_pending) >= USAGE_BATCH_SIZE
+    if full and _wake is not None:
+        _wake.set()
+
+
+def flush_usage() -> int:
+    """Write the buffered rows in one transaction; returns how many were written"""
+    with _pending_lock:
+        rows = _pending[:]
+        del _pending[:]
+    if not rows:
+        return 0
+    conn = get_db()
+    try:
+        # Calls made outside send_message (e.g. the grammar check) take their chat's mode
+        conn.executemany(
+            """INSERT INTO llm_usage (created_at, provider, model, kind, chat_id, mode, status,
+                                      prompt_tokens, completion_tokens, latency_ms, ttft_ms)
+               VALUES (?, ?, ?, ?, ?, COALESCE(?, (SELECT mode FROM chats WHERE id = ?)), ?, ?, ?, ?, ?)""",
+            rows
+        )
+        conn.commit()
+    except sqlite3.Error as e:
+        # Keep them for the next flush rather than losing them (e.g. the database was locked)
+        print(f"Could not write {len(rows)} LLM usage rows: {e}")
+        with _pending_lock:
+            _pending[:0] = rows
+        return 0
+    finally:
+        conn.close()
+    return len(rows)
+
+
+async def _write_loop() -> None:
+    while True:
+        try:
+            await asyncio.wait_for(_wake.wait(), USAGE_FLUSH_S)
+        except asyncio.TimeoutError:
+            pass
+        _wake.clear()
+        await asyncio.to_thread(flush_usage)
+
+
+def start_usage_writer() -> None:
+    global _writer, _wake
+    if _writer is None:
+        _wake = asyncio.Event()
+        _writer = asyncio.create_task(_write_loop())
+
+
+def stop_usage_writer() -> None:
+    global _writer, _wake
+    if _writer is not None:
+        _writer.cancel()
+        _writer = _wake = None
+    flush_usage()
+
+
+def _cost(provider: str, model: str, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+    if provider == "ollama":
+        return 0.0
+    prices = LLM_PRICES.get(model)
+    if not prices:
+        return None
+    return (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1_000_000
+
+
+async def get_usage(group_by: str = "day", days: int = 30, chat_id: Optional[str] = None) -> dict:
+    """
+    Calls, tokens, latency and estimated cost over the last `days` (UTC), grouped
+    by chat, mode, provider, model, kind or day (optionally for one chat only).
+    """
+    if group_by not in GROUPS:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of: {', '.join(GROUPS)}")
+    # Include this worker's buffered calls (a write, so off the event loop)
+    await asyncio.to_thread(flush_usage)
+    since = _utc_timestamp(datetime.now(timezone.utc) - timedelta(days=days))
+    where, params = "created_at >= ?", [since]
+    if chat_id:
+        where += " AND chat_id = ?"
+        params.append(chat_id)
+
+    conn = get_db()
+    rows = conn.execute(
+        f"""SELECT {GROUPS[group_by]} AS key, provider, model, COUNT(*) AS calls,
+                   SUM(status != 'ok') AS errors,
+                   COALESCE(SUM(prompt_tokens), 0) AS prompt_tokens,
+                   COALESCE(SUM(completion_tokens), 0) AS completion_tokens,
+                   SUM(latency_ms) AS latency_ms, SUM(ttft_ms) AS ttft_ms, COUNT(ttft_ms) AS ttft_calls
+            FROM llm_usage WHERE {where}
+            GROUP BY key, provider, model""",
+        params
+    ).fetchall()
+    conn.close()
+
+    # Costs depend on the model, so rows come per (key, provider, model) and are summed here
+    groups = {}
+    for row in rows:
+        group = groups.setdefault(row["key"], {
+            "key": row["key"], "calls": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0,
+            "latency_ms": 0.0, "ttft_ms": 0.0, "ttft_calls": 0, "cost_usd": None, "unpriced_tokens": 0,
+        })
+        for field in ("calls", "errors", "prompt_tokens", "completion_tokens", "latency_ms", "ttft_calls"):
+            group[field] += row[field]
+        group["ttft_ms"] += row["ttft_ms"] or 0.0
+        cost = _cost(row["provider"], row["model"], row["prompt_tokens"], row["completion_tokens"])
+        if cost is None:
+            group["unpriced_tokens"] += row["prompt_tokens"] + row["completion_tokens"]
+        else:
+            group["cost_usd"] = (group["cost_usd"] or 0.0) + cost
+
+    result = []
+    for group in groups.values():
+        latency, ttft = group.pop("latency_ms"), group.pop("ttft_ms")
+        group["total_tokens"] = group["prompt_tokens"] + group["completion_tokens"]
+        group["avg_latency_ms"] = round(latency / group["calls"], 1)
+        # Only Ollama calls have a time to first token; ttft_calls says how many calls it covers
+        group["avg_ttft_ms"] = round(ttft / group["ttft_calls"], 1) if group["ttft_calls"] else None
+        if group["cost_usd"] is not None:
+            group["cost_usd"] = round(group["cost_usd"], 6)
+        result.append(group)
+    if group_by == "day":
+        result.sort(key=lambda g: g["key"])
+    else:
+        result.sort(key=lambda g: g["total_tokens"], reverse=True)
+    return {"group_by": group_by, "since": since, "groups": result}
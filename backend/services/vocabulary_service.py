@@ -0,0 +1,66 @@
+"""
+Vocabulary service - tokenization and frequency ranking of document words.
+"""
+
+import re
+from collections import Counter
+from typing import Iterator, List, Tuple
+
+# Letters only (umlauts and ß included via \w minus digits/underscore),
+# hyphenated compounds such as "E-Mail" or "Deutsch-Kurs" stay one token.
+_WORD_RE = re.compile(r"[^\W\d_]+(?:-[^\W\d_]+)*")
+
+# Words split across lines by PDF hyphenation: "Wör-\nterbuch" -> "Wörterbuch"
+_LINE_HYPHEN_RE = re.compile(r"(?<=[^\W\d_])-\s*\n\s*(?=[^\W\d_])")
+
+MIN_WORD_LENGTH = 3
+
+
+def tokenize(text: str) -> Iterator[Tuple[str, int]]:
+    """
+    Yield (word, offset) pairs for every word in the text.
+
+    Words are lowercased; offsets point into the original text. Words that were
+    hyphenated across a line break are joined and reported at their first part.
+    """
+    pos = 0
+    while True:
+        match = _WORD_RE.search(text, pos)
+        if not match:
+            return
+        word = match.group()
+        end = match.end()
+        # Re-join line-break hyphenation without copying the whole text
+        while True:
+            joint = _LINE_HYPHEN_RE.match(text, end)
+            if not joint:
+                break
+            rest = _WORD_RE.match(text, joint.end())
+            if not rest:
+                break
+            word += rest.group()
+            end = rest.end()
+        pos = end
+        if len(word) >= MIN_WORD_LENGTH:
+            yield word.lower(), match.start()
+
+
+def rank_words(text: str) -> List[Tuple[str, int, int]]:
+    """
+    Count words in the text.
+
+    Returns:
+        List of (word, count, first_offset), most frequent first; ties keep
+        the order in which the words first appear.
+    """
+    counts: Counter = Counter()
+    first_offsets = {}
+    for word, offset in tokenize(text):
+        counts[word] += 1
+        if word not in first_offsets:
+            first_offsets[word] = offset
+
+    return sorted(
+        ((word, count, first_offsets[word]) for word, count in counts.items()),
+        key=lambda item: (-item[1], item[2])
+    )
@@ -0,0 +1,137 @@
+"""
+Warm-up service - preload models and caches after startup so the first user requests are not the slow ones
+"""
+
+import asyncio
+import importlib.util
+import json
+import time
+from typing import Optional
+
+import httpx
+
+from core.config import (
+    DOCUMENT_CACHE_SIZE, OLLAMA_CTX_BUCKETS, OLLAMA_PRELOAD_CTX,
+    WARMUP_ENABLED, WARMUP_WHISPER, WARMUP_OLLAMA, WARMUP_CACHES,
+)
+from core.database import get_db
+from core.runtime_config import get_llm_config, get_whisper_config
+from core.workers import run_in_pool, whisper_pool
+from services.context_planner import preload_request, note_loaded
+
+_state = {
+    "ready": False,
+    "started_at": None,
+    "finished_at": None,
+    "startup": {},
+    "steps": {},
+}
+
+
+class SkipStep(Exception):
+    """Raised by a warm-up step that does not apply to the current configuration"""
+
+
+def warmup_status() -> dict:
+    """Readiness and per-step warm-up results (for /health)"""
+    return {**_state, "startup": dict(_state["startup"]), "steps": dict(_state["steps"])}
+
+
+def is_ready() -> bool:
+    return _state["ready"]
+
+
+def record_startup_phase(name: str, seconds: float) -> None:
+    _state["startup"][name] = round(seconds, 3)
+
+
+async def _preload_whisper() -> str:
+    whisper_config = get_whisper_config()
+    if whisper_config.provider == "openai":
+        raise SkipStep("transcription uses the OpenAI API")
+    from services.speech_service import get_whisper_model, call_speech_server
+    reply = await call_speech_server({"op": "load", "model": whisper_config.model}, timeout=300.0)
+    if reply is not None:
+        if not reply.get("ok"):
+            raise RuntimeError(f"speech server: {reply.get('error')}")
+        return f"{whisper_config.model} (speech server)"
+    if importlib.util.find_spec("faster_whisper") is None:
+        raise SkipStep("faster-whisper not installed")
+    await run_in_pool(whisper_pool, get_whisper_model)
+    return whisper_config.model
+
+
+async def _preload_ollama() -> str:
+    llm_config = get_llm_config()
+    if llm_config.provider != "ollama":
+        raise SkipStep(f"provider is {llm_config.provider}")
+    models = {llm_config.model: OLLAMA_PRELOAD_CTX}
+    if llm_config.grammar_model and llm_config.grammar_model != llm_config.model:
+        # Grammar prompts are a single message; they fit the smallest bucket
+        models[llm_config.grammar_model] = OLLAMA_CTX_BUCKETS[0]
+    # A generate request without a prompt only loads the model (with this context size and keep-alive)
+    async with httpx.AsyncClient(timeout=300.0) as client:
+        for model, num_ctx in models.items():
+            response = await client.post(
+                f"{llm_config.base_url}/api/generate", json=preload_request(model, num_ctx)
+            )
+            if response.status_code != 200:
+                raise RuntimeError(f"Ollama returned {response.status_code}: {response.text[:200]}")
+            note_loaded(model, num_ctx)
+    return ", ".join(models)
+
+
+def _prime_document_caches() -> str:
+    """Load the documents of the most recently used document-mode chats into the content cache"""
+    from services.document_service import get_document_content
+
+    conn = get_db()
+    rows = conn.execute(
+        "SELECT metadata FROM chats WHERE mode = 'document' AND metadata IS NOT NULL ORDER BY updated_at DESC LIMIT ?",
+        (DOCUMENT_CACHE_SIZE,)
+    ).fetchall()
+    conn.close()
+
+    doc_ids = []
+    for row in rows:
+        doc_id = json.loads(row["metadata"]).get("document_id")
+        if doc_id and doc_id not in doc_ids:
+            doc_ids.append(doc_id)
+    loaded = sum(1 for doc_id in doc_ids if get_document_content(doc_id) is not None)
+    return f"{loaded} documents"
+
+
+async def _prime_caches() -> str:
+    return await asyncio.to_thread(_prime_document_caches)
+
+
+async def _run_step(name: str, enabled: bool, step) -> None:
+    if not enabled:
+        _state["steps"][name] = {"status": "disabled"}
+        return
+    _state["steps"][name] = {"status": "running"}
+    start = time.perf_counter()
+    detail: Optional[str]
+    try:
+        detail = await step()
+        status = "ok"
+    except SkipStep as e:
+        status, detail = "skipped", str(e)
+    except Exception as e:
+        # A failed warm-up only means the first real request pays the cost
+        status = "error"
+        detail = getattr(e, "detail", None) or str(e) or type(e).__name__
+    _state["steps"][name] = {"status": status, "detail": detail, "seconds": round(time.perf_counter() - start, 3)}
+
+
+async def warm_up() -> None:
+    """Run the enabled warm-up steps concurrently, then mark the app ready"""
+    _state["started_at"] = time.time()
+    if WARMUP_ENABLED:
+        await asyncio.gather(
+            _run_step("whisper", WARMUP_WHISPER, _preload_whisper),
+            _run_step("ollama", WARMUP_OLLAMA, _preload_ollama),
+            _run_step("caches", WARMUP_CACHES, _prime_caches),
+        )
+    _state["finished_at"] = time.time()
+    _state["ready"] = True
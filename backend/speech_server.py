@@ -0,0 +1,164 @@
+"""
+Shared speech-to-text server.
+
+One process owns the Whisper models for all API workers, so model memory and
+the cold start no longer grow with `uvicorn --workers N`. Workers reach it
+over a Unix socket (framing in core/ipc.py) when SPEECH_SERVER_SOCKET is set,
+and fall back to in-process inference while it is not reachable.
+
+A transcription request names the temp file the API worker already wrote,
+so the audio is not copied over the socket; clients that do not share the
+filesystem send the audio as the frame payload instead. Requests from all
+workers are queued onto SPEECH_SERVER_WORKERS decoding threads that share one
+model per model name (CTranslate2 runs the concurrent calls in parallel).
+
+Run from backend/:  python speech_server.py [--socket PATH] [--workers N] [--no-preload]
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import signal
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from core.config import SPEECH_SERVER_SOCKET, SPEECH_SERVER_WORKERS, SPEECH_SERVER_MAX_MODELS
+from core.ipc import read_frame, write_frame
+from core.runtime_config import get_whisper_config, refresh_config
+from services.speech_service import decode_audio
+
+DEFAULT_SOCKET = "/tmp/language-teacher-speech.sock"
+
+
+class SpeechServer:
+    def __init__(self, workers: int, max_models: int):
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="whisper")
+        self.workers = workers
+        self.max_models = max_models
+        self.models = OrderedDict()
+        self.load_lock = threading.Lock()
+        self.stats = {"served": 0, "errors": 0, "pending": 0, "cancelled": 0}
+
+    def model(self, name: str):
+        """The loaded model for `name`, loading it (and evicting the least recently used) if needed"""
+        with self.load_lock:
+            if name in self.models:
+                self.models.move_to_end(name)
+                return self.models[name]
+            from faster_whisper import WhisperModel
+            model = WhisperModel(name, device="cpu", compute_type="int8", num_workers=self.workers)
+            self.models[name] = model
+            while len(self.models) > self.max_models:
+                self.models.popitem(last=False)
+            print(f"Loaded Whisper model: {name}")
+            return model
+
+    def transcribe(self, header: dict, payload, stop: threading.Event) -> dict:
+        if stop.is_set():
+            return {"ok": False, "error": "cancelled"}
+        model = self.model(header["model"])
+        source = header["path"] if header.get("path") else io.BytesIO(payload)
+        text_parts, info = decode_audio(model, source, header.get("language"), stop)
+        if stop.is_set():
+            return {"ok": False, "error": "cancelled"}
+        return {
+            "ok": True,
+            "text": " ".join(text_parts),
+            "language": info.language,
+            "probability": info.language_probability,
+        }
+
+    async def dispatch(self, header: dict, payload, stop: threading.Event) -> dict:
+        loop = asyncio.get_running_loop()
+        op = header.get("op")
+        if op == "ping":
+            return {"ok": True, "models": list(self.models), "workers": self.workers, **self.stats}
+        if op == "load":
+            await loop.run_in_executor(self.pool, self.model, header["model"])
+            return {"ok": True, "models": list(self.models)}
+        if op == "transcribe":
+            path = header.get("path")
+            if path and not os.access(path, os.R_OK):
+                return {"ok": False, "code": "path_unreadable", "error": f"cannot read {path}"}
+            if not path and not payload:
+                return {"ok": False, "error": "no audio"}
+            self.stats["pending"] += 1
+            try:
+                reply = await loop.run_in_executor(self.pool, self.transcribe, header, payload, stop)
+            finally:
+                self.stats["pending"] -= 1
+            self.stats["served"] += 1
+            return reply
+        return {"ok": False, "error": f"unknown op: {op}"}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            header, payload = await read_frame(reader)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            writer.close()
+            return
+        # A client whose request is cancelled closes the connection: stop decoding for it
+        stop = threading.Event()
+        work = asyncio.create_task(self.dispatch(header, payload, stop))
+        hangup = asyncio.create_task(reader.read(1))
+        await asyncio.wait({work, hangup}, return_when=asyncio.FIRST_COMPLETED)
+        hangup.cancel()
+        if not work.done():
+            stop.set()
+            self.stats["cancelled"] += 1
+        try:
+            reply = await work
+        except Exception as e:
+            self.stats["errors"] += 1
+            reply = {"ok": False, "error": str(e) or type(e).__name__}
+        if stop.is_set():
+            writer.close()
+            return
+        try:
+            await write_frame(writer, reply)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(socket_path: str, workers: int, max_models: int, preload: bool) -> None:
+    server = SpeechServer(workers, max_models)
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    unix_server = await asyncio.start_unix_server(server.handle, path=socket_path)
+    # Only processes of the same user may submit work
+    os.chmod(socket_path, 0o600)
+    print(f"Speech server listening on {socket_path} ({workers} workers)")
+
+    if preload:
+        # The model configured through /api/config, if any
+        refresh_config()
+        model = get_whisper_config().model
+        try:
+            await asyncio.get_running_loop().run_in_executor(server.pool, server.model, model)
+        except Exception as e:
+            print(f"Could not preload Whisper model {model}: {e}")
+
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        asyncio.get_running_loop().add_signal_handler(sig, stop.set)
+    async with unix_server:
+        await stop.wait()
+    os.unlink(socket_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--socket", default=SPEECH_SERVER_SOCKET or DEFAULT_SOCKET)
+    parser.add_argument("--workers", type=int, default=SPEECH_SERVER_WORKERS, help="concurrent decodes")
+    parser.add_argument("--max-models", type=int, default=SPEECH_SERVER_MAX_MODELS)
+    parser.add_argument("--no-preload", action="store_true", help="load the configured model on first use")
+    args = parser.parse_args()
+    asyncio.run(serve(args.socket, args.workers, args.max_models, not args.no_preload))
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,10 @@ export interface Chat {
   created_at: string;
   updated_at: string;
   metadata?: string;
+  message_count?: number;
+  last_message_preview?: string | null;
+  last_message_role?: string | null;
+  last_message_at?: string | null;
 }
 
 export interface Message {
@@ -36,6 +40,22 @@ export interface Document {
   created_at: string;
 }
 
+export interface Exercise {
+  id: number;
+  doc_id: string;
+  kind: 'cloze' | 'vocab';
+  prompt: string;
+  options: string[] | null;
+  hint: string | null;
+}
+
+export interface ExerciseResult {
+  correct: boolean;
+  expected: string | null;
+  feedback: string | null;
+  graded_by: 'match' | 'llm';
+}
+
 export interface GrammarRule {
   id: string;
   name: string;
@@ -48,6 +68,7 @@ export interface GrammarRule {
 export interface LLMConfig {
   provider: 'ollama' | 'openai' | 'anthropic' | 'gemini';
   model: string;
+  grammar_model?: string;
   base_url: string;
   api_key?: string;
   has_api_key?: boolean;
@@ -71,6 +92,14 @@ export interface TranscriptionResponse {
   was_corrected: boolean;
 }
 
+export interface ChangeEvent {
+  id: number;
+  type: string;
+  chat_id: string | null;
+  data: any;
+  created_at: number;
+}
+
 export interface TranscribeAndSendResponse {
   transcription: TranscriptionResponse;
   chat_response: ChatResponse;
@@ -132,6 +161,15 @@ class ApiClient {
     return this.fetch(`/api/chats${query}`);
   }
 
+  // Chats with message count and last message preview, for the sidebar
+  async getChatSummaries(mode?: string, categoryId?: string): Promise<Chat[]> {
+    const params = new URLSearchParams();
+    if (mode) params.append('mode', mode);
+    if (categoryId) params.append('category_id', categoryId);
+    const query = params.toString() ? `?${params}` : '';
+    return this.fetch(`/api/chats/summary${query}`);
+  }
+
   async createChat(title: string, mode: 'free_talk' | 'grammar' | 'document', categoryId?: string, documentId?: string): Promise<Chat> {
     return this.fetch('/api/chats', {
       method: 'POST',
@@ -155,6 +193,14 @@ class ApiClient {
     });
   }
 
+  // Ask the server to prepare the reply to a draft (grammar and document chats)
+  async prefetchReply(chatId: string, content: string): Promise<{ status: string }> {
+    return this.fetch(`/api/chats/${chatId}/prefetch`, {
+      method: 'POST',
+      body: JSON.stringify({ content }),
+    });
+  }
+
   // Audio transcription
   async transcribeAudio(audioBlob: Blob, language?: string): Promise<TranscriptionResponse> {
     const formData = new FormData();
@@ -233,6 +279,18 @@ class ApiClient {
     return this.fetch(`/api/documents/${id}`, { method: 'DELETE' });
   }
 
+  // Pre-generated exercises; pass the last exercise id as `after` to move on
+  async getNextExercise(docId: string, kind: 'cloze' | 'vocab' = 'cloze', after = 0): Promise<Exercise> {
+    return this.fetch(`/api/documents/${docId}/exercises/next?kind=${kind}&after=${after}`);
+  }
+
+  async answerExercise(docId: string, exerciseId: number, answer: string): Promise<ExerciseResult> {
+    return this.fetch(`/api/documents/${docId}/exercises/${exerciseId}/answer`, {
+      method: 'POST',
+      body: JSON.stringify({ answer }),
+    });
+  }
+
   // Grammar Rules
   async getGrammarRules(): Promise<GrammarRule[]> {
     return this.fetch('/api/grammar-rules');
@@ -245,6 +303,37 @@ class ApiClient {
     return this.fetch(`/api/grammar-rules?${params}`, { method: 'POST' });
   }
 
+  // Push events; reconnects from the last cursor seen, so no change is missed
+  subscribeEvents(onEvent: (event: ChangeEvent) => void, onReset: () => void): () => void {
+    let cursor: number | null = null;
+    let socket: WebSocket | null = null;
+    let closed = false;
+
+    const connect = () => {
+      const query = cursor === null ? '' : `?cursor=${cursor}`;
+      socket = new WebSocket(`${API_BASE.replace(/^http/, 'ws')}/api/events${query}`);
+      socket.onmessage = (message) => {
+        const frame = JSON.parse(message.data);
+        if ('id' in frame) {
+          cursor = frame.id;
+          onEvent(frame);
+          return;
+        }
+        if (frame.type === 'reset') onReset();
+        cursor = frame.cursor;
+      };
+      socket.onclose = () => {
+        if (!closed) setTimeout(connect, 2000);
+      };
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      socket?.close();
+    };
+  }
+
   // Health
   async healthCheck(): Promise<{ status: string; timestamp: string }> {
     return this.fetch('/health');
@@ -1,5 +1,6 @@
-import { writable, derived } from 'svelte/store';
-import type { Chat, Message, Category, Document, LLMConfig, GrammarDetected } from './api';
+import { writable, derived, get } from 'svelte/store';
+import { api } from './api';
+import type { Chat, Message, Category, Document, LLMConfig, GrammarDetected, ChangeEvent } from './api';
 
 // App state
 export const currentMode = writable<'free_talk' | 'grammar' | 'document' | null>(null);
@@ -54,6 +55,63 @@ export const currentChat = derived([chats, currentChatId], ([$chats, $currentCha
 // Settings
 export const settingsOpen = writable(false);
 
+// Insert or move an item to the front, replacing any copy with the same id
+export function upsert<T extends { id: string }>(items: T[], item: T): T[] {
+  return [item, ...items.filter(i => i.id !== item.id)];
+}
+
+// Append messages not already in the list (a send's response and its events can arrive in any order)
+export function appendMessages(items: Message[], added: Message[]): Message[] {
+  const known = new Set(items.map(m => m.id));
+  return [...items, ...added.filter(m => !known.has(m.id))];
+}
+
+// Apply a change event pushed by the backend
+export function applyEvent(event: ChangeEvent) {
+  const data = event.data;
+  switch (event.type) {
+    case 'chat.created':
+      chats.update(c => upsert(c, data));
+      break;
+    case 'chat.updated':
+      chats.update(c => {
+        const chat = c.find(item => item.id === data.id);
+        return chat ? upsert(c, { ...chat, ...data }) : c;
+      });
+      break;
+    case 'chat.deleted':
+      chats.update(c => c.filter(chat => chat.id !== data.id));
+      break;
+    case 'message.appended':
+      if (get(currentChatId) === event.chat_id) {
+        messages.update(m => appendMessages(m, [data]));
+      }
+      break;
+    case 'message.deleted':
+      // A send that was cancelled before the reply (the sending client disconnected)
+      if (get(currentChatId) === event.chat_id) {
+        messages.update(m => m.filter(message => message.id !== data.id));
+      }
+      break;
+    case 'category.created':
+      categories.update(c => upsert(c, data));
+      break;
+    case 'category.deleted':
+      categories.update(c => c.filter(category => category.id !== data.id));
+      break;
+    case 'document.ingested':
+      documents.update(d => upsert(d, data));
+      break;
+    case 'document.deleted':
+      documents.update(d => d.filter(doc => doc.id !== data.id));
+      break;
+    case 'config.updated':
+      // Settings changed in another tab or worker
+      api.getConfig().then(config => llmConfig.set(config.llm)).catch(() => {});
+      break;
+  }
+}
+
 // Clear error after 5 seconds
 error.subscribe(value => {
   if (value) {